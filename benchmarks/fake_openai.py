@@ -0,0 +1,380 @@
+"""
+Local OpenAI-compatible stand-in for load tests.
+
+Serves /v1/chat/completions and /v1/embeddings with:
+
+- latency drawn from a configurable distribution (time to first token),
+  plus completion tokens / --tokens-per-second to simulate generation;
+- injected 429 (with retry-after) and 500 errors at configurable rates;
+- bodies that validate against what each call site expects: the
+  json_schema response format or forced tool's parameters when the request
+  carries one, otherwise the response model of the prompt_registry prompt
+  (or known builder prompt) the system message starts with;
+- `finish_reason: "length"` truncation when the output exceeds max_tokens.
+
+Point the app at it with OPENAI_BASE_URL=http://127.0.0.1:<port>/v1:
+
+    python benchmarks/fake_openai.py --port 8765 --latency lognormal:0.4,0.5 \\
+        --tokens-per-second 80 --rate-429 0.02 --rate-500 0.01
+
+Latency specs are described in benchmarks/latency.py. GET /fake/stats reports
+requests per section, injected errors and peak concurrency. Streaming is not simulated.
+"""
+import argparse
+import asyncio
+import hashlib
+import itertools
+import json
+import math
+import os
+import random
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+import llm_tokens
+import prompt_registry
+from benchmarks.latency import LatencyDistribution
+from interview_prep_v2_models import (
+    CaseStudyPrompt,
+    InsiderCheatSheetSectionModel,
+    QuestionsToAskSectionModel,
+    RoleSuccessFactorsSection,
+    TechnicalCasePrepSectionModel,
+)
+
+
+# --- Response shapes for prompts without a registered response model ---
+
+class _PromptBResponse(BaseModel):
+    role_success_factors: RoleSuccessFactorsSection
+    section_6_technical_case_prep: TechnicalCasePrepSectionModel
+    section_9_questions_to_ask: QuestionsToAskSectionModel
+
+
+class _TechnicalCasePrepResponse(BaseModel):
+    key_concepts: List[str]
+    prompts: List[CaseStudyPrompt]
+    sample_case_walkthrough: str
+    key_terms_glossary: Dict[str, str]
+    preparation_tips: List[str]
+
+
+_RESPONSE_MODEL_OVERRIDES: Dict[str, Type[BaseModel]] = {
+    "prompt_b": _PromptBResponse,
+    "technical_case_prep": _TechnicalCasePrepResponse,
+}
+
+# System-prompt prefixes of builder prompts that are not in prompt_registry.
+_EXTRA_SIGNATURES: List[Tuple[str, str, Optional[Type[BaseModel]]]] = [
+    ("insider_cheat_sheet", "You are a seasoned industry analyst.", InsiderCheatSheetSectionModel),
+    ("company_profile", "You are a razor-sharp corporate researcher.", None),
+]
+
+_TEXT_FIXTURES = {
+    "company_profile": (
+        "1. {sentence} {sentence}\n"
+        "2. Cultural values:\n- Customer obsession\n- Ownership\n- Bias for action\n"
+        "3. Recent developments:\n- {sentence}\n- {sentence}\n- {sentence}"
+    ),
+}
+
+SIGNATURE_CHARS = 120
+_FILLER = "candidates should connect their experience to measurable outcomes the team cares about".split()
+
+
+# --- Config ---
+
+@dataclass
+class FakeOpenAIConfig:
+    latency: LatencyDistribution = field(default_factory=LatencyDistribution)
+    tokens_per_second: float = 0.0  # 0 disables generation time
+    rate_429: float = 0.0
+    rate_500: float = 0.0
+    retry_after: float = 1.0
+    seed: int = 0
+    array_items: int = 3
+    string_words: int = 12
+    text_words: int = 60
+    embedding_dim: int = 1536
+
+
+# --- Schema-driven bodies ---
+
+def _words(label: str, index: int, count: int) -> str:
+    head = f"{label.replace('_', ' ').strip().capitalize() or 'Value'} {index + 1}:"
+    filler = list(itertools.islice(itertools.cycle(_FILLER), max(0, count - 2)))
+    return " ".join([head] + filler) + "."
+
+
+def example_from_schema(schema: Dict[str, Any], config: FakeOpenAIConfig, root: Optional[Dict[str, Any]] = None,
+                        label: str = "value", index: int = 0) -> Any:
+    """A deterministic instance of `schema` (JSON Schema as emitted by Pydantic v2)."""
+    root = root if root is not None else schema
+    if "$ref" in schema:
+        target: Any = root
+        for part in schema["$ref"].lstrip("#/").split("/"):
+            target = target[part]
+        return example_from_schema(target, config, root, label, index)
+    if "const" in schema:
+        return schema["const"]
+    if schema.get("enum"):
+        return schema["enum"][index % len(schema["enum"])]
+    for combinator in ("anyOf", "oneOf"):
+        if combinator in schema:
+            options = [o for o in schema[combinator] if o.get("type") != "null"] or schema[combinator]
+            return example_from_schema(options[0], config, root, label, index)
+    if "allOf" in schema:
+        return example_from_schema(schema["allOf"][0], config, root, label, index)
+
+    kind = schema.get("type")
+    if isinstance(kind, list):
+        kind = next((k for k in kind if k != "null"), "null")
+    if kind == "object" or "properties" in schema:
+        properties = schema.get("properties")
+        if properties:
+            return {name: example_from_schema(prop, config, root, name, index) for name, prop in properties.items()}
+        values = schema.get("additionalProperties")
+        if isinstance(values, dict):
+            return {
+                f"{label.replace('_', ' ')} {i + 1}": example_from_schema(values, config, root, label, i)
+                for i in range(config.array_items)
+            }
+        return {}
+    if kind == "array":
+        count = max(schema.get("minItems", 0), min(config.array_items, schema.get("maxItems", config.array_items)))
+        items = schema.get("items", {"type": "string"})
+        return [example_from_schema(items, config, root, label.rstrip("s") or label, i) for i in range(count)]
+    if kind in ("integer", "number"):
+        low, high = schema.get("minimum", 1), schema.get("maximum", 10)
+        value = high - (index % max(1, int(high - low) + 1))
+        return int(value) if kind == "integer" else float(value)
+    if kind == "boolean":
+        return index % 2 == 0
+    if kind == "null":
+        return None
+    if schema.get("format") == "date":
+        return f"2024-01-{index % 28 + 1:02d}"
+    if schema.get("format") == "date-time":
+        return f"2024-01-{index % 28 + 1:02d}T09:00:00Z"
+    if schema.get("format") in ("uri", "url") or "url" in label or "link" in label:
+        return f"https://example.com/{label}/{index + 1}"
+    return _words(label, index, config.string_words)
+
+
+def _signatures() -> List[Tuple[str, str, Optional[Type[BaseModel]]]]:
+    signatures = []
+    for name in prompt_registry.versions():
+        prompt = prompt_registry.get(name)
+        prefix = prompt.text.strip()[:SIGNATURE_CHARS]
+        signatures.append((name, prefix, _RESPONSE_MODEL_OVERRIDES.get(name, prompt.response_model)))
+    return signatures + _EXTRA_SIGNATURES
+
+
+def _system_text(messages: List[Dict[str, Any]]) -> str:
+    for message in messages:
+        if message.get("role") == "system" and isinstance(message.get("content"), str):
+            return message["content"].strip()
+    return ""
+
+
+class FakeOpenAI:
+    def __init__(self, config: FakeOpenAIConfig):
+        self.config = config
+        self.rng = random.Random(config.seed)
+        self.signatures = _signatures()
+        self.ids = itertools.count(1)
+        self.in_flight = 0
+        self.stats: Dict[str, Any] = {
+            "requests": 0, "in_flight_max": 0, "injected_429": 0, "injected_500": 0,
+            "truncated": 0, "by_section": {}, "completion_tokens": 0,
+        }
+
+    def section_for(self, messages: List[Dict[str, Any]]) -> Tuple[str, Optional[Type[BaseModel]]]:
+        system = _system_text(messages)
+        for name, prefix, model_cls in self.signatures:
+            if system.startswith(prefix):
+                return name, model_cls
+        return "unknown", None
+
+    def _text(self, section: str) -> str:
+        template = _TEXT_FIXTURES.get(section)
+        sentence = _words("sample", 0, self.config.string_words)
+        if template:
+            return template.format(sentence=sentence)
+        return _words("answer", 0, self.config.text_words)
+
+    def completion_body(self, body: Dict[str, Any]) -> Tuple[Dict[str, Any], str, int]:
+        """The chat.completion payload for `body`, its section and completion tokens."""
+        messages = body.get("messages", [])
+        section, model_cls = self.section_for(messages)
+        message: Dict[str, Any] = {"role": "assistant", "content": None}
+        finish_reason = "stop"
+
+        tool_choice = body.get("tool_choice")
+        response_format = body.get("response_format") or {}
+        if isinstance(tool_choice, dict) and body.get("tools"):
+            name = tool_choice["function"]["name"]
+            tool = next(t for t in body["tools"] if t["function"]["name"] == name)
+            arguments = json.dumps(example_from_schema(tool["function"].get("parameters", {}), self.config))
+            message["tool_calls"] = [{
+                "id": f"call_fake_{next(self.ids)}", "type": "function",
+                "function": {"name": name, "arguments": arguments},
+            }]
+            finish_reason, text = "tool_calls", arguments
+        elif response_format.get("type") == "json_schema":
+            text = json.dumps(example_from_schema(response_format["json_schema"]["schema"], self.config))
+        elif model_cls is not None:
+            text = json.dumps(example_from_schema(model_cls.model_json_schema(), self.config))
+        elif response_format.get("type") == "json_object":
+            text = json.dumps({"result": _words(section, 0, self.config.string_words)})
+        else:
+            text = self._text(section)
+
+        completion_tokens = llm_tokens.count_tokens(text)
+        max_tokens = body.get("max_completion_tokens") or body.get("max_tokens")
+        if max_tokens and completion_tokens > max_tokens and "tool_calls" not in message:
+            # Roughly max_tokens worth of characters, like a real cut-off.
+            text = text[: int(len(text) * max_tokens / completion_tokens)]
+            completion_tokens, finish_reason = max_tokens, "length"
+            self.stats["truncated"] += 1
+        if "tool_calls" not in message:
+            message["content"] = text
+
+        prompt_tokens = sum(llm_tokens.count_tokens(m.get("content") or "") for m in messages if isinstance(m.get("content"), str))
+        payload = {
+            "id": f"chatcmpl-fake-{next(self.ids)}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "gpt-fake"),
+            "choices": [{"index": 0, "message": message, "finish_reason": finish_reason, "logprobs": None}],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+        return payload, section, completion_tokens
+
+    def embedding(self, text: Any) -> List[float]:
+        seed = int(hashlib.sha256(json.dumps(text).encode("utf-8")).hexdigest()[:16], 16)
+        rng = random.Random(seed)
+        vector = [rng.gauss(0.0, 1.0) for _ in range(self.config.embedding_dim)]
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    def injected_error(self) -> Optional[JSONResponse]:
+        roll = self.rng.random()
+        if roll < self.config.rate_429:
+            self.stats["injected_429"] += 1
+            return JSONResponse(
+                status_code=429,
+                headers={"retry-after": str(self.config.retry_after)},
+                content={"error": {"message": "Rate limit reached (injected).", "type": "requests", "param": None, "code": "rate_limit_exceeded"}},
+            )
+        if roll < self.config.rate_429 + self.config.rate_500:
+            self.stats["injected_500"] += 1
+            return JSONResponse(
+                status_code=500,
+                content={"error": {"message": "The server had an error (injected).", "type": "server_error", "param": None, "code": None}},
+            )
+        return None
+
+
+def create_app(config: Optional[FakeOpenAIConfig] = None) -> FastAPI:
+    fake = FakeOpenAI(config or FakeOpenAIConfig())
+    app = FastAPI(title="Fake OpenAI")
+    app.state.fake = fake
+
+    async def simulate(completion_tokens: int) -> None:
+        delay = fake.config.latency.sample(fake.rng)
+        if fake.config.tokens_per_second > 0:
+            delay += completion_tokens / fake.config.tokens_per_second
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        if body.get("stream"):
+            return JSONResponse(status_code=400, content={"error": {"message": "Streaming is not simulated.", "type": "invalid_request_error"}})
+        fake.stats["requests"] += 1
+        fake.in_flight += 1
+        fake.stats["in_flight_max"] = max(fake.stats["in_flight_max"], fake.in_flight)
+        try:
+            error = fake.injected_error()
+            if error is not None:
+                await simulate(0)
+                return error
+            payload, section, completion_tokens = fake.completion_body(body)
+            fake.stats["by_section"][section] = fake.stats["by_section"].get(section, 0) + 1
+            fake.stats["completion_tokens"] += completion_tokens
+            await simulate(completion_tokens)
+            return payload
+        finally:
+            fake.in_flight -= 1
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request):
+        body = await request.json()
+        inputs = body.get("input", [])
+        inputs = inputs if isinstance(inputs, list) and inputs and not isinstance(inputs[0], int) else [inputs]
+        fake.stats["requests"] += 1
+        fake.stats["by_section"]["embeddings"] = fake.stats["by_section"].get("embeddings", 0) + 1
+        error = fake.injected_error()
+        await simulate(0)
+        if error is not None:
+            return error
+        tokens = sum(llm_tokens.count_tokens(text if isinstance(text, str) else json.dumps(text)) for text in inputs)
+        return {
+            "object": "list",
+            "model": body.get("model", "text-embedding-3-small"),
+            "data": [{"object": "embedding", "index": i, "embedding": fake.embedding(text)} for i, text in enumerate(inputs)],
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        }
+
+    @app.get("/fake/stats")
+    async def fake_stats():
+        return {**fake.stats, "in_flight": fake.in_flight}
+
+    return app
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", default="constant:0.3", help="Time-to-first-token distribution.")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0)
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--rate-500", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--array-items", type=int, default=3)
+    parser.add_argument("--string-words", type=int, default=12)
+    args = parser.parse_args()
+    config = FakeOpenAIConfig(
+        latency=LatencyDistribution.parse(args.latency),
+        tokens_per_second=args.tokens_per_second,
+        rate_429=args.rate_429,
+        rate_500=args.rate_500,
+        retry_after=args.retry_after,
+        seed=args.seed,
+        array_items=args.array_items,
+        string_words=args.string_words,
+    )
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+"""
+Local SerpAPI stand-in for benchmarks and load tests.
+
+Serves /search and /search.json for the engines the app uses:
+
+- `google_jobs`: jobs from a corpus matched against `q` and `location`,
+  10 per page with `next_page_token` pagination (in
+  `serpapi_pagination` and, where job_search_pipeline reads it,
+  `search_metadata.serpapi_pagination`), `google_jobs_filters` metadata
+  whose `serpapi_link`s apply `chips` (date posted, job type, on-site), and
+  the `no results` error SerpAPI returns for an empty query;
+- `google` with `tbm=nws` (serpapi_news_fetcher) and `google_news`
+  (company_rag): `news_results` for the company named in `q`.
+
+The corpus is generated from --seed (--jobs listings) unless --corpus points
+at a JSON file with `jobs` (SerpAPI `jobs_results` items) and `news`
+(items with a `company` key). Requests without `api_key` get a 401; latency
+and 429 errors can be injected. Point the app at it with SERPAPI_BASE_URL:
+
+    python benchmarks/fake_serpapi.py --port 8766 --latency lognormal:0.8,0.3
+    SERPAPI_BASE_URL=http://127.0.0.1:8766 SERPAPI_API_KEY=fake uvicorn main:app
+
+GET /fake/stats reports requests per engine, pages served and requests
+filtered by chips.
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import random
+import sys
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlencode
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from benchmarks.latency import LatencyDistribution
+
+PAGE_SIZE = 10
+NO_RESULTS = "Google hasn't returned any results for this query."
+
+_TITLES = [
+    "Software Engineer", "Senior Software Engineer", "Backend Engineer", "Data Engineer", "Data Scientist",
+    "Machine Learning Engineer", "Product Manager", "Business Analyst", "DevOps Engineer", "Engineering Manager",
+]
+_COMPANIES = ["Innovatech", "Acme Corp", "Globex", "Initech", "Umbrella Health", "Stark Industries", "Wayne Financial", "Hooli"]
+_LOCATIONS = ["Chicago, IL", "New York, NY", "San Francisco, CA", "Austin, TX", "Seattle, WA", "Remote"]
+_SKILLS = ["Python", "FastAPI", "SQL", "AWS", "Kubernetes", "React", "Spark", "Terraform", "Go", "Tableau"]
+_SCHEDULES = [("Full-time", "FULLTIME"), ("Contractor", "CONTRACTOR"), ("Part-time", "PARTTIME")]
+_POSTED = [("1 day ago", 1), ("3 days ago", 3), ("6 days ago", 6), ("2 weeks ago", 14), ("3 weeks ago", 21), ("1 month ago", 30), ("2 months ago", 60)]
+_DATE_CHIPS = [("Past day", "today", 1), ("Past 3 days", "3days", 3), ("Past week", "week", 7), ("Past month", "month", 31)]
+
+
+# --- Corpus ---
+
+def generate_corpus(jobs: int = 300, seed: int = 0) -> Dict[str, List[Dict[str, Any]]]:
+    rng = random.Random(seed)
+    listings = []
+    for i in range(jobs):
+        title, company, location = rng.choice(_TITLES), rng.choice(_COMPANIES), rng.choice(_LOCATIONS)
+        skills = rng.sample(_SKILLS, 4)
+        schedule, schedule_chip = rng.choice(_SCHEDULES)
+        posted, days = rng.choice(_POSTED)
+        job_id = base64.urlsafe_b64encode(f"fake-job-{seed}-{i}".encode()).decode()
+        link = f"https://careers.example.com/{company.lower().replace(' ', '-')}/{i}"
+        listings.append({
+            "title": title,
+            "company_name": company,
+            "location": "Anywhere" if location == "Remote" else location,
+            "via": "via LinkedIn",
+            "share_link": f"https://www.google.com/search?q=jobs&ibp=htl;jobs#htidocid={job_id}",
+            "description": (
+                f"{company} is hiring a {title}. You will build and operate production systems with "
+                f"{', '.join(skills[:3])} and {skills[3]}, work with product and design, and mentor teammates."
+            ),
+            "job_highlights": [
+                {"title": "Qualifications", "items": [f"{rng.randint(2, 8)}+ years of experience", f"Strong {skills[0]} skills"]},
+                {"title": "Responsibilities", "items": ["Design and ship features end to end", "Collaborate across teams"]},
+            ],
+            "related_links": [{"link": link, "text": "See web results"}],
+            "apply_options": [{"title": "Company site", "link": link}],
+            "extensions": [posted, schedule] + (["Work from home"] if location == "Remote" else []),
+            "detected_extensions": {
+                "posted_at": posted, "schedule_type": schedule, **({"work_from_home": True} if location == "Remote" else {}),
+            },
+            "job_id": job_id,
+            "_posted_days": days,
+            "_schedule_chip": schedule_chip,
+            "_remote": location == "Remote",
+        })
+    news = []
+    for company in _COMPANIES:
+        for n in range(8):
+            news.append({
+                "company": company,
+                "title": f"{company} {rng.choice(['announces', 'expands', 'reports', 'launches'])} {rng.choice(['new platform', 'quarterly results', 'partnership', 'AI initiative'])}",
+                "link": f"https://news.example.com/{company.lower().replace(' ', '-')}/{n}",
+                "source": rng.choice(["Reuters", "Bloomberg", "TechCrunch", "The Verge"]),
+                "date": f"{n + 1} days ago",
+                "snippet": f"{company} shared an update on its strategy, hiring plans and customer growth.",
+            })
+    return {"jobs": listings, "news": news}
+
+
+# --- Config ---
+
+@dataclass
+class FakeSerpAPIConfig:
+    latency: LatencyDistribution = field(default_factory=LatencyDistribution)
+    rate_429: float = 0.0
+    seed: int = 0
+    jobs: int = 300
+    corpus_path: Optional[str] = None
+    require_api_key: bool = True
+
+
+class FakeSerpAPI:
+    def __init__(self, config: FakeSerpAPIConfig):
+        self.config = config
+        self.rng = random.Random(config.seed)
+        if config.corpus_path:
+            with open(config.corpus_path, encoding="utf-8") as f:
+                self.corpus = json.load(f)
+        else:
+            self.corpus = generate_corpus(config.jobs, config.seed)
+        self.stats: Dict[str, Any] = {"requests": 0, "by_engine": {}, "pages": 0, "filtered_requests": 0, "injected_429": 0, "errors": 0}
+
+    # --- google_jobs ---
+
+    def match_jobs(self, q: str, location: Optional[str], chips: str) -> List[Dict[str, Any]]:
+        terms = [t for t in q.lower().replace("(", " ").replace(")", " ").split() if t not in ("or", "and", "remote")]
+        remote_query = "remote" in q.lower() or (location or "").lower() == "remote"
+        chip_map = dict(chip.split(":", 1) for chip in chips.split(",") if ":" in chip) if chips else {}
+        max_days = next((days for _, value, days in _DATE_CHIPS if chip_map.get("date_posted") == value), None)
+        matched = []
+        for job in self.corpus["jobs"]:
+            text = f"{job['title']} {job['company_name']} {job['description']}".lower()
+            if terms and not any(term in text for term in terms):
+                continue
+            if remote_query and not job.get("_remote"):
+                continue
+            if location and location.lower() != "remote" and not remote_query:
+                city = location.split(",")[0].strip().lower()
+                if city not in job["location"].lower() and not job.get("_remote"):
+                    continue
+            if max_days is not None and job.get("_posted_days", 0) > max_days:
+                continue
+            if "employment_type" in chip_map and job.get("_schedule_chip") != chip_map["employment_type"]:
+                continue
+            if chip_map.get("work_arrangement") == "on_site" and job.get("_remote"):
+                continue
+            # Titles matching every term rank first, as a search engine would.
+            matched.append((sum(term in job["title"].lower() for term in terms), job))
+        matched.sort(key=lambda pair: -pair[0])
+        return [job for _, job in matched]
+
+    def filters(self, base: str, params: Dict[str, str]) -> List[Dict[str, Any]]:
+        query = {k: v for k, v in params.items() if k in ("engine", "q", "location", "hl", "gl")}
+
+        def option(name: str, chip: str) -> Dict[str, Any]:
+            return {"name": name, "text": name, "value": chip,
+                    "serpapi_link": f"{base}search.json?{urlencode({**query, 'chips': chip})}"}
+
+        return [
+            {"name": "Date posted", "options": [option(name, f"date_posted:{value}") for name, value, _ in _DATE_CHIPS]},
+            {"name": "Type", "options": [option(name, f"employment_type:{chip}") for name, chip in _SCHEDULES]
+                + [option("On-site", "work_arrangement:on_site")]},
+        ]
+
+    def google_jobs(self, base: str, params: Dict[str, str]) -> Dict[str, Any]:
+        offset = 0
+        token = params.get("next_page_token")
+        if token:
+            try:
+                state = json.loads(base64.urlsafe_b64decode(token.encode()).decode())
+                offset = int(state["offset"])
+            except (ValueError, KeyError):
+                return {"error": "Invalid next_page_token."}
+        jobs = self.match_jobs(params.get("q", ""), params.get("location"), params.get("chips", ""))
+        page = jobs[offset:offset + PAGE_SIZE]
+        metadata: Dict[str, Any] = {"status": "Success", "google_jobs_filters": self.filters(base, params)}
+        if not page:
+            return {"search_metadata": metadata, "error": NO_RESULTS}
+        body: Dict[str, Any] = {
+            "search_metadata": metadata,
+            "search_parameters": {k: v for k, v in params.items() if k != "api_key"},
+            "jobs_results": [{k: v for k, v in job.items() if not k.startswith("_")} for job in page],
+            "filters": metadata["google_jobs_filters"],
+        }
+        if offset + PAGE_SIZE < len(jobs):
+            next_token = base64.urlsafe_b64encode(json.dumps({"offset": offset + PAGE_SIZE}).encode()).decode()
+            next_params = {k: v for k, v in params.items() if k != "api_key"} | {"next_page_token": next_token}
+            pagination = {"next_page_token": next_token, "next": f"{base}search.json?{urlencode(next_params)}"}
+            body["serpapi_pagination"] = pagination
+            metadata["serpapi_pagination"] = pagination
+        self.stats["pages"] += 1
+        return body
+
+    # --- news ---
+
+    def news(self, params: Dict[str, str]) -> Dict[str, Any]:
+        q = params.get("q", "").lower()
+        limit = int(params.get("num") or 10)
+        items = [item for item in self.corpus["news"] if item["company"].lower() in q][:limit]
+        results = [{"position": i + 1, **{k: v for k, v in item.items() if k != "company"}} for i, item in enumerate(items)]
+        if params.get("engine") == "google_news":
+            for result in results:
+                result["source"] = {"name": result["source"]}
+        return {"search_metadata": {"status": "Success"}, "news_results": results}
+
+    def respond(self, base: str, params: Dict[str, str]) -> JSONResponse:
+        engine = params.get("engine", "google")
+        self.stats["requests"] += 1
+        self.stats["by_engine"][engine] = self.stats["by_engine"].get(engine, 0) + 1
+        if self.config.require_api_key and not params.get("api_key"):
+            self.stats["errors"] += 1
+            return JSONResponse(status_code=401, content={"error": "Invalid API key. Your API key should be here: https://serpapi.com/manage-api-key"})
+        if self.rng.random() < self.config.rate_429:
+            self.stats["injected_429"] += 1
+            return JSONResponse(status_code=429, content={"error": "Your account has run out of searches."})
+        if "chips" in params and "next_page_token" not in params:
+            self.stats["filtered_requests"] += 1
+        if engine == "google_jobs":
+            return JSONResponse(self.google_jobs(base, params))
+        if engine == "google_news" or (engine == "google" and params.get("tbm") == "nws"):
+            return JSONResponse(self.news(params))
+        self.stats["errors"] += 1
+        return JSONResponse(status_code=400, content={"error": f"Unsupported engine '{engine}' in the fake SerpAPI."})
+
+
+def create_app(config: Optional[FakeSerpAPIConfig] = None) -> FastAPI:
+    fake = FakeSerpAPI(config or FakeSerpAPIConfig())
+    app = FastAPI(title="Fake SerpAPI")
+    app.state.fake = fake
+
+    async def search(request: Request):
+        delay = fake.config.latency.sample(fake.rng)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return fake.respond(str(request.base_url), dict(request.query_params))
+
+    app.add_api_route("/search", search, methods=["GET"])
+    app.add_api_route("/search.json", search, methods=["GET"])
+
+    @app.get("/fake/stats")
+    async def fake_stats():
+        return fake.stats
+
+    return app
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--latency", default="constant:0.5", help="Response latency distribution (see benchmarks/latency.py).")
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--jobs", type=int, default=300, help="Size of the generated job corpus.")
+    parser.add_argument("--corpus", help="JSON corpus with 'jobs' and 'news' lists instead of the generated one.")
+    args = parser.parse_args()
+    config = FakeSerpAPIConfig(
+        latency=LatencyDistribution.parse(args.latency),
+        rate_429=args.rate_429,
+        seed=args.seed,
+        jobs=args.jobs,
+        corpus_path=args.corpus,
+    )
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
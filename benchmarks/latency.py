@@ -0,0 +1,33 @@
+"""
+Latency distributions for the local API stand-ins (fake_openai, fake_serpapi).
+
+Specs are `constant:S`, `uniform:LOW,HIGH`, `lognormal:MEDIAN,SIGMA` or
+`exponential:MEAN`, in seconds.
+"""
+import math
+import random
+from dataclasses import dataclass
+
+
+@dataclass
+class LatencyDistribution:
+    kind: str = "constant"
+    a: float = 0.0
+    b: float = 0.0
+
+    @classmethod
+    def parse(cls, spec: str) -> "LatencyDistribution":
+        kind, _, params = spec.partition(":")
+        values = [float(v) for v in params.split(",") if v] or [0.0]
+        if kind not in ("constant", "uniform", "lognormal", "exponential"):
+            raise ValueError(f"Unknown latency distribution '{kind}'.")
+        return cls(kind, values[0], values[1] if len(values) > 1 else 0.0)
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "uniform":
+            return rng.uniform(self.a, self.b)
+        if self.kind == "lognormal":
+            return rng.lognormvariate(math.log(self.a), self.b) if self.a > 0 else 0.0
+        if self.kind == "exponential":
+            return rng.expovariate(1 / self.a) if self.a > 0 else 0.0
+        return self.a
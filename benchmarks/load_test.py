@@ -0,0 +1,223 @@
+"""
+Open-loop load generator for a running `main:app`.
+
+Sends a weighted mix of guide generation, follow-up Q&A and job search
+requests at a target rate (requests are started on schedule whether or not
+earlier ones have finished, so a saturated app shows up as growing latency
+and errors rather than a lower send rate) and reports per-scenario latency
+percentiles, error rates, and event-loop lag both for the app (sampled from
+/api/metrics while the test runs) and for this generator.
+
+Typical setup, everything local:
+
+    python benchmarks/fake_openai.py --port 8765 --latency lognormal:0.4,0.5 --tokens-per-second 80 &
+    OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=fake uvicorn main:app --port 8000 &
+    python benchmarks/load_test.py --rps 5 --duration 60 --mix generate=1,follow_up=3,job_search=1
+
+Job search also calls SerpAPI: run benchmarks/fake_serpapi.py and set
+SERPAPI_BASE_URL for the app, or leave job_search out of the mix.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import loop_lag
+
+DEFAULT_INPUTS = os.path.join(ROOT, "benchmarks", "inputs.json")
+SCENARIOS = ("generate", "follow_up", "job_search")
+PERCENTILES = (0.5, 0.9, 0.95, 0.99)
+METRICS_INTERVAL = 1.0
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--rps", type=float, default=2.0, help="Target request rate across all scenarios.")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to keep sending.")
+    parser.add_argument("--mix", default="generate=1,follow_up=1", help="Scenario weights, e.g. generate=1,follow_up=3,job_search=1.")
+    parser.add_argument("--arrival", choices=("uniform", "poisson"), default="poisson")
+    parser.add_argument("--timeout", type=float, default=180.0, help="Per-request timeout in seconds.")
+    parser.add_argument("--use-cache", action="store_true", help="Let /generate serve cached guides.")
+    parser.add_argument("--inputs", default=DEFAULT_INPUTS)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON.")
+    return parser.parse_args()
+
+
+def _parse_mix(spec: str) -> Dict[str, float]:
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in SCENARIOS:
+            raise SystemExit(f"Unknown scenario '{name}'; expected one of {', '.join(SCENARIOS)}.")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def _requests(inputs: Dict[str, Any], use_cache: bool) -> Dict[str, Dict[str, Any]]:
+    job_search = inputs["job_search"]
+    return {
+        "generate": {"url": "/api/interview-v2/generate", "json": {**inputs["generate"], "bypass_cache": not use_cache}},
+        "follow_up": {"url": "/api/follow-up/", "json": inputs["follow_up"]},
+        "job_search": {"url": "/api/job-search", "json": {"resume_text": job_search["resume_text"], "preferences": job_search["preferences"]}},
+    }
+
+
+def _percentiles(values: List[float]) -> Dict[str, Optional[float]]:
+    if not values:
+        return {f"p{int(q * 100)}": None for q in PERCENTILES} | {"max": None}
+    ordered = sorted(values)
+    result = {f"p{int(q * 100)}": round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 1) for q in PERCENTILES}
+    result["max"] = round(ordered[-1] * 1000, 1)
+    return result
+
+
+class LoadTest:
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        with open(args.inputs, encoding="utf-8") as f:
+            self.requests = _requests(json.load(f), args.use_cache)
+        self.mix = _parse_mix(args.mix)
+        self.rng = random.Random(args.seed)
+        self.latencies: Dict[str, List[float]] = {name: [] for name in self.mix}
+        self.outcomes: Dict[str, Counter] = {name: Counter() for name in self.mix}
+        self.send_lag: List[float] = []
+        self.app_lag: List[Dict[str, Any]] = []
+        self.in_flight = 0
+        self.in_flight_max = 0
+
+    async def _send(self, client: httpx.AsyncClient, scenario: str) -> None:
+        request = self.requests[scenario]
+        self.in_flight += 1
+        self.in_flight_max = max(self.in_flight_max, self.in_flight)
+        start = time.perf_counter()
+        try:
+            response = await client.post(request["url"], json=request["json"])
+            outcome = str(response.status_code)
+            # The follow-up endpoint reports upstream failures in a 200 body.
+            if response.status_code == 200 and scenario == "follow_up" and "error" in response.json():
+                outcome = "200_error"
+        except httpx.TimeoutException:
+            outcome = "timeout"
+        except httpx.HTTPError as e:
+            outcome = type(e).__name__
+        finally:
+            self.in_flight -= 1
+        elapsed = time.perf_counter() - start
+        self.outcomes[scenario][outcome] += 1
+        if outcome == "200":
+            self.latencies[scenario].append(elapsed)
+
+    async def _sample_app_lag(self, client: httpx.AsyncClient, stop: asyncio.Event) -> None:
+        while not stop.is_set():
+            try:
+                response = await client.get("/api/metrics", timeout=10)
+                self.app_lag.append(response.json().get("event_loop_lag", {}))
+            except (httpx.HTTPError, ValueError):
+                pass
+            try:
+                await asyncio.wait_for(stop.wait(), METRICS_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+    async def run(self) -> Dict[str, Any]:
+        args = self.args
+        names, weights = list(self.mix), list(self.mix.values())
+        limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+        tasks: List[asyncio.Task] = []
+        stop = asyncio.Event()
+        loop_lag.start()
+        async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+            sampler = asyncio.create_task(self._sample_app_lag(client, stop))
+            start = time.perf_counter()
+            next_at = 0.0
+            while next_at < args.duration:
+                delay = start + next_at - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                self.send_lag.append(max(0.0, time.perf_counter() - start - next_at))
+                tasks.append(asyncio.create_task(self._send(client, self.rng.choices(names, weights)[0])))
+                gap = 1.0 / args.rps
+                next_at += self.rng.expovariate(args.rps) if args.arrival == "poisson" else gap
+            sent_in = time.perf_counter() - start
+            await asyncio.gather(*tasks)
+            total = time.perf_counter() - start
+            stop.set()
+            await sampler
+        generator_lag = loop_lag.stats()
+        await loop_lag.stop()
+        return self._report(len(tasks), sent_in, total, generator_lag)
+
+    def _report(self, sent: int, sent_in: float, total: float, generator_lag: Dict[str, Any]) -> Dict[str, Any]:
+        scenarios = {}
+        for name in self.mix:
+            outcomes = self.outcomes[name]
+            count = sum(outcomes.values())
+            errors = count - outcomes["200"]
+            scenarios[name] = {
+                "requests": count,
+                "error_rate": round(errors / count, 3) if count else None,
+                "outcomes": dict(outcomes),
+                "latency_ms": _percentiles(self.latencies[name]),
+            }
+        app_lag = [sample for sample in self.app_lag if sample.get("samples")]
+        return {
+            "target_rps": self.args.rps,
+            "sent": sent,
+            "achieved_send_rps": round(sent / sent_in, 2) if sent_in else None,
+            "completed_in_s": round(total, 1),
+            "in_flight_max": self.in_flight_max,
+            "scenarios": scenarios,
+            "event_loop_lag_ms": {
+                "app_p99_max": max((s["p99_ms"] for s in app_lag), default=None),
+                "app_p95_median": round(statistics.median(s["p95_ms"] for s in app_lag), 2) if app_lag else None,
+                "app_max": max((s["recent_max_ms"] for s in app_lag), default=None),
+                "generator_p99": generator_lag.get("p99_ms"),
+                "generator_max": generator_lag.get("max_ms"),
+                "send_schedule_lag_p99": _percentiles(self.send_lag)["p99"],
+            },
+        }
+
+
+def _print_report(report: Dict[str, Any]) -> None:
+    print(f"target {report['target_rps']} rps, sent {report['sent']} ({report['achieved_send_rps']} rps), "
+          f"done in {report['completed_in_s']}s, peak in-flight {report['in_flight_max']}")
+    header = f"{'scenario':<12}{'reqs':>6}{'errors':>8}{'p50':>10}{'p90':>10}{'p95':>10}{'p99':>10}{'max':>10}"
+    print(header)
+    print("-" * len(header))
+    for name, row in report["scenarios"].items():
+        latency = row["latency_ms"]
+        cells = "".join(f"{'-' if latency[k] is None else f'{latency[k]:.0f}ms':>10}" for k in ("p50", "p90", "p95", "p99", "max"))
+        error_rate = "-" if row["error_rate"] is None else f"{row['error_rate']:.1%}"
+        print(f"{name:<12}{row['requests']:>6}{error_rate:>8}{cells}")
+        failures = {k: v for k, v in row["outcomes"].items() if k != "200"}
+        if failures:
+            print(f"    failures: {failures}")
+    lag = report["event_loop_lag_ms"]
+    print(f"event-loop lag (ms): app p99 {lag['app_p99_max']}, app max {lag['app_max']}, "
+          f"generator p99 {lag['generator_p99']}, send schedule p99 {lag['send_schedule_lag_p99']}")
+
+
+def main() -> None:
+    args = _parse_args()
+    report = asyncio.run(LoadTest(args).run())
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        _print_report(report)
+
+
+if __name__ == "__main__":
+    main()
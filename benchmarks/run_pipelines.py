@@ -0,0 +1,169 @@
+"""
+Offline pipeline benchmarks.
+
+Runs the interview-prep guide (POST /api/interview-v2/generate in-process),
+the SerpAPI + GPT job search and the company news fetch against an HTTP
+cassette (see http_cassette) and reports wall time, CPU time and the number of
+OpenAI / SerpAPI calls per run.
+
+Record a cassette once with real keys, then replay it as often as needed:
+
+    python benchmarks/run_pipelines.py --record
+    python benchmarks/run_pipelines.py --repeat 5
+    python benchmarks/run_pipelines.py --repeat 5 --latency sampled --json
+
+Replay never touches the network; an unrecorded request gets a 404 and is
+reported as a miss (usually a prompt or input change: re-record).
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+from typing import Any, Awaitable, Callable, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+DEFAULT_CASSETTE = os.path.join(ROOT, "benchmarks", "cassettes", "pipelines.jsonl")
+DEFAULT_INPUTS = os.path.join(ROOT, "benchmarks", "inputs.json")
+PIPELINES = ("generate_interview_prep", "search_jobs_serpapi_gpt", "fetch_recent_news")
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--record", action="store_true", help="Call the real APIs and append to the cassette.")
+    parser.add_argument("--cassette", default=DEFAULT_CASSETTE)
+    parser.add_argument("--inputs", default=DEFAULT_INPUTS)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--latency", choices=("none", "recorded", "sampled"), default="none",
+                        help="Latency injected on replay.")
+    parser.add_argument("--latency-scale", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--only", choices=PIPELINES, action="append", help="Run only these pipelines.")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON.")
+    return parser.parse_args()
+
+
+def _calls(stats: Dict[str, Any]) -> Dict[str, int]:
+    """Splits the cassette's per-endpoint counters into OpenAI and SerpAPI calls."""
+    serpapi = sum(n for endpoint, n in stats["calls_by_endpoint"].items() if endpoint.startswith("/search"))
+    total = sum(stats["calls_by_endpoint"].values())
+    return {"openai": total - serpapi, "serpapi": serpapi, "misses": stats["misses"]}
+
+
+def _pipelines(inputs: Dict[str, Any]) -> Dict[str, Callable[[], Awaitable[Any]]]:
+    import httpx
+
+    import main
+    import serpapi_news_fetcher
+    from job_search_pipeline import JobSearchPreferences, search_jobs_serpapi_gpt
+
+    async def generate_interview_prep():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+            response = await client.post("/api/interview-v2/generate", json={**inputs["generate"], "bypass_cache": True})
+        response.raise_for_status()
+        return response.json()
+
+    async def search_jobs():
+        job_search = inputs["job_search"]
+        return await search_jobs_serpapi_gpt(job_search["resume_text"], JobSearchPreferences(**job_search["preferences"]))
+
+    async def fetch_news():
+        # The fetcher keeps an hour-long in-process cache; every run should hit the API.
+        serpapi_news_fetcher._news_cache.clear()
+        return await serpapi_news_fetcher.fetch_recent_news(**inputs["news"])
+
+    return {
+        "generate_interview_prep": generate_interview_prep,
+        "search_jobs_serpapi_gpt": search_jobs,
+        "fetch_recent_news": fetch_news,
+    }
+
+
+async def _run(name: str, pipeline: Callable[[], Awaitable[Any]], cassette, repeat: int) -> Dict[str, Any]:
+    import llm_gateway
+
+    wall: List[float] = []
+    cpu: List[float] = []
+    calls: List[Dict[str, int]] = []
+    errors: List[str] = []
+    for _ in range(repeat):
+        before = _calls(cassette.stats())
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        try:
+            await pipeline()
+        except Exception as e:
+            errors.append(f"{type(e).__name__}: {e}")
+        wall.append(time.perf_counter() - wall_start)
+        cpu.append(time.process_time() - cpu_start)
+        after = _calls(cassette.stats())
+        calls.append({kind: after[kind] - before[kind] for kind in after})
+        # Pooled connections are per loop; the next repeat may run on a fresh one.
+        await llm_gateway.shutdown()
+    return {
+        "pipeline": name,
+        "runs": repeat,
+        "errors": errors,
+        "wall_ms": {"median": round(statistics.median(wall) * 1000, 1), "max": round(max(wall) * 1000, 1)},
+        "cpu_ms": {"median": round(statistics.median(cpu) * 1000, 1), "max": round(max(cpu) * 1000, 1)},
+        "calls_per_run": {kind: max(run[kind] for run in calls) for kind in calls[0]},
+    }
+
+
+def _print_report(report: Dict[str, Any]) -> None:
+    print(f"cassette: {report['cassette']['path']} ({report['cassette']['mode']}, latency {report['cassette']['latency']})")
+    header = f"{'pipeline':<26}{'runs':>5}{'wall p50':>11}{'wall max':>11}{'cpu p50':>10}{'openai':>8}{'serpapi':>9}{'misses':>8}"
+    print(header)
+    print("-" * len(header))
+    for row in report["results"]:
+        calls = row["calls_per_run"]
+        print(
+            f"{row['pipeline']:<26}{row['runs']:>5}{row['wall_ms']['median']:>9.1f}ms{row['wall_ms']['max']:>9.1f}ms"
+            f"{row['cpu_ms']['median']:>8.1f}ms{calls['openai']:>8}{calls['serpapi']:>9}{calls['misses']:>8}"
+        )
+        for error in row["errors"][:3]:
+            print(f"    error: {error}")
+
+
+def main() -> int:
+    args = _parse_args()
+    if not args.record:
+        # Clients refuse to start without keys; replay never sends them anywhere.
+        os.environ.setdefault("OPENAI_API_KEY", "cassette-replay")
+        os.environ.setdefault("SERPAPI_API_KEY", "cassette-replay")
+    logging.basicConfig(level=logging.WARNING)
+
+    import http_cassette
+
+    cassette = http_cassette.install(http_cassette.Cassette(
+        args.cassette,
+        mode=http_cassette.RECORD if args.record else http_cassette.REPLAY,
+        latency=args.latency,
+        latency_scale=args.latency_scale,
+        seed=args.seed,
+    ))
+    with open(args.inputs, encoding="utf-8") as f:
+        inputs = json.load(f)
+    pipelines = _pipelines(inputs)
+    selected = args.only or list(PIPELINES)
+    # Recording needs each distinct request once; later repeats replay identical calls.
+    repeat = 1 if args.record else args.repeat
+
+    results = [asyncio.run(_run(name, pipelines[name], cassette, repeat)) for name in selected]
+    http_cassette.uninstall()
+
+    report = {"cassette": cassette.stats(), "results": results}
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        _print_report(report)
+    return 1 if any(row["errors"] or row["calls_per_run"]["misses"] for row in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,26 +1,221 @@
 import hashlib
 import json
-from typing import Dict, Optional
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+class LRUTTLCache:
+    """Thread-safe LRU cache with per-entry TTL and an approximate memory cap.
+
+    Entries are evicted least-recently-used first once either `max_entries`
+    or `max_bytes` (as measured by `size_of`) is exceeded. The lock is only
+    held for dict bookkeeping, never across an await, so coroutines can call
+    `get`/`set` directly without blocking the event loop.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl_seconds: float, size_of: Optional[Callable[[Any], int]] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._size_of = size_of or _approx_size
+        self._data: "OrderedDict[str, Tuple[float, int, Any]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, size, value = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        size = self._size_of(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (time.monotonic() + self.ttl_seconds, size, value)
+            self._bytes += size
+            while len(self._data) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._data))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def _remove(self, key: str) -> None:
+        _, size, _ = self._data.pop(key)
+        self._bytes -= size
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "approx_bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else None,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+def _approx_size(value: Any) -> int:
+    if isinstance(value, (bytes, str)):
+        return len(value)
+    return len(json.dumps(value, default=str))
 
-# In-memory cache (for demo; replace with Redis or persistent store in prod)
-_resume_cache = {}
-_jd_cache = {}
 
 def hash_input(text: str) -> str:
     return hashlib.sha256(text.encode("utf-8")).hexdigest()
 
+
+def hash_payload(payload: Any) -> str:
+    """Hash of `payload`'s canonical JSON (sorted keys, no whitespace)."""
+    return hash_input(json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str))
+
+
+# --- Parsed resumes and job descriptions ---
+# Values are the parse's JSON so every hit is a fresh dict callers may mutate.
+_resume_cache = LRUTTLCache(
+    max_entries=int(os.getenv("RESUME_CACHE_MAX_ENTRIES", "1024")),
+    max_bytes=int(os.getenv("RESUME_CACHE_MAX_BYTES", str(32 * 1024 * 1024))),
+    ttl_seconds=float(os.getenv("RESUME_CACHE_TTL_SECONDS", str(24 * 3600))),
+)
+_jd_cache = LRUTTLCache(
+    max_entries=int(os.getenv("JD_CACHE_MAX_ENTRIES", "1024")),
+    max_bytes=int(os.getenv("JD_CACHE_MAX_BYTES", str(32 * 1024 * 1024))),
+    ttl_seconds=float(os.getenv("JD_CACHE_TTL_SECONDS", str(24 * 3600))),
+)
+
+def _get_parsed(cache: LRUTTLCache, text: str) -> Optional[Dict]:
+    cached = cache.get(hash_input(text))
+    return json.loads(cached) if cached is not None else None
+
+def _set_parsed(cache: LRUTTLCache, text: str, parsed: Dict):
+    cache.set(hash_input(text), json.dumps(parsed, separators=(",", ":"), default=str))
+
 def get_cached_resume(text: str) -> Optional[Dict]:
-    h = hash_input(text)
-    return _resume_cache.get(h)
+    return _get_parsed(_resume_cache, text)
 
 def set_cached_resume(text: str, parsed: Dict):
-    h = hash_input(text)
-    _resume_cache[h] = parsed
+    _set_parsed(_resume_cache, text, parsed)
+
+def resume_cache_stats() -> Dict[str, Any]:
+    return _resume_cache.stats()
 
 def get_cached_jd(text: str) -> Optional[Dict]:
-    h = hash_input(text)
-    return _jd_cache.get(h)
+    return _get_parsed(_jd_cache, text)
 
 def set_cached_jd(text: str, parsed: Dict):
-    h = hash_input(text)
-    _jd_cache[h] = parsed
+    _set_parsed(_jd_cache, text, parsed)
+
+def jd_cache_stats() -> Dict[str, Any]:
+    return _jd_cache.stats()
+
+
+# --- Assembled Interview Prep v2 guides ---
+# Values are the guide's JSON so hits can be returned without re-serialising.
+_guide_cache = LRUTTLCache(
+    max_entries=int(os.getenv("GUIDE_CACHE_MAX_ENTRIES", "256")),
+    max_bytes=int(os.getenv("GUIDE_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+    ttl_seconds=float(os.getenv("GUIDE_CACHE_TTL_SECONDS", "3600")),
+)
+
+def _normalise_label(value: Optional[str]) -> str:
+    return " ".join((value or "").split()).lower()
+
+def guide_cache_key(resume_structured: Dict, jd_structured: Dict, company_name: Optional[str], industry: Optional[str],
+                    job_description: Optional[str], raw_resume_text: Optional[str], version: str) -> str:
+    return hash_payload({
+        "resume": resume_structured,
+        "jd": jd_structured,
+        "company": _normalise_label(company_name),
+        "industry": _normalise_label(industry),
+        "job_description": (job_description or "").strip(),
+        "raw_resume_text": (raw_resume_text or "").strip(),
+        "version": version,
+    })
+
+def get_cached_guide(key: str) -> Optional[str]:
+    return _guide_cache.get(key)
+
+def set_cached_guide(key: str, guide_json: str):
+    _guide_cache.set(key, guide_json)
+
+def guide_cache_stats() -> Dict[str, Any]:
+    return _guide_cache.stats()
+
+
+# --- Individual guide sections (see SectionOrchestrator) ---
+# Values are (model class or None, JSON) pairs so hits never share mutable state.
+_section_cache = LRUTTLCache(
+    max_entries=int(os.getenv("SECTION_CACHE_MAX_ENTRIES", "2048")),
+    max_bytes=int(os.getenv("SECTION_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+    ttl_seconds=float(os.getenv("SECTION_CACHE_TTL_SECONDS", "3600")),
+    size_of=lambda entry: len(entry[1]),
+)
+
+def get_cached_section(key: str) -> Optional[Tuple[Optional[type], str]]:
+    return _section_cache.get(key)
+
+def set_cached_section(key: str, entry: Tuple[Optional[type], str]):
+    _section_cache.set(key, entry)
+
+def section_cache_stats() -> Dict[str, Any]:
+    return _section_cache.stats()
+
+
+# --- Resume-independent sections shared across users ---
+# Keyed only by company/role/JD inputs, so every candidate targeting the same
+# employer or posting reuses them; the TTL bounds how stale company news gets.
+_shared_section_cache = LRUTTLCache(
+    max_entries=int(os.getenv("SHARED_SECTION_CACHE_MAX_ENTRIES", "4096")),
+    max_bytes=int(os.getenv("SHARED_SECTION_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+    ttl_seconds=float(os.getenv("SHARED_SECTION_CACHE_TTL_SECONDS", str(12 * 3600))),
+    size_of=lambda entry: len(entry[1]),
+)
+
+def normalise_shared_input(value: Any) -> Any:
+    """Case/whitespace-insensitive form of a shared-cache input."""
+    if isinstance(value, str):
+        return _normalise_label(value)
+    if isinstance(value, (list, tuple)):
+        return [normalise_shared_input(v) for v in value]
+    if isinstance(value, dict):
+        return {k: normalise_shared_input(v) for k, v in value.items()}
+    return value
+
+def get_cached_shared_section(key: str) -> Optional[Tuple[Optional[type], str]]:
+    return _shared_section_cache.get(key)
+
+def set_cached_shared_section(key: str, entry: Tuple[Optional[type], str]):
+    _shared_section_cache.set(key, entry)
+
+def shared_section_cache_stats() -> Dict[str, Any]:
+    return _shared_section_cache.stats()
@@ -2,15 +2,17 @@ from typing import List, Dict, Tuple
 import re
 
 SECTION_HEADERS = [
-    r"(?i)experience", r"(?i)work history", r"(?i)employment", r"(?i)education", r"(?i)skills", r"(?i)certifications", r"(?i)languages", r"(?i)publications", r"(?i)achievements", r"(?i)awards"
+    r"experience", r"work history", r"employment", r"education", r"skills", r"certifications", r"languages", r"publications", r"achievements", r"awards"
 ]
+# One case-insensitive pattern; inline (?i) flags on each alternative are an error on Python 3.11+.
+SECTION_HEADER_PATTERN = re.compile(r'|'.join(SECTION_HEADERS), re.IGNORECASE)
 
 def chunk_resume_text(resume_text: str, max_words: int = 2000) -> List[str]:
     """
     Splits resume text into logical sections using common headers. If still too long, further splits into max_words chunks.
     """
     # Split by section headers
-    sections = re.split(r'|'.join(SECTION_HEADERS), resume_text)
+    sections = SECTION_HEADER_PATTERN.split(resume_text)
     chunks = []
     for sec in sections:
         words = sec.split()
@@ -1,8 +1,4 @@
-import os
-from openai import AsyncOpenAI
-
-openai_api_key = os.getenv("OPENAI_API_KEY")
-openai_client = AsyncOpenAI(api_key=openai_api_key)
+import llm_gateway
 
 async def fetch_company_profile(company_name: str, role_title: str) -> str:
     prompt = [
@@ -18,7 +14,7 @@ async def fetch_company_profile(company_name: str, role_title: str) -> str:
             "3. Three noteworthy recent developments or facts (no URLs needed)."
         )}
     ]
-    resp = await openai_client.chat.completions.create(
+    resp = await llm_gateway.chat_completion(
         model="gpt-4-1106-preview",  # Use gpt-4.1-nano if available in your OpenAI account
         messages=prompt,
         temperature=0.2,
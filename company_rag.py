@@ -3,6 +3,7 @@ import requests
 from typing import List, Dict
 import openai
 import numpy as np
+from serpapi_async import SERPAPI_BASE_URL
 
 GOOGLE_KG_API_KEY = os.getenv("GOOGLE_KG_API_KEY")
 SERPAPI_KEY = os.getenv("SERPAPI_KEY")
@@ -34,7 +35,7 @@ def fetch_company_overview(company_name: str) -> Dict:
 
 # --- SerpAPI News ---
 def fetch_company_news(company_name: str, num_articles: int = 8) -> List[Dict]:
-    url = "https://serpapi.com/search"
+    url = f"{SERPAPI_BASE_URL}/search"
     params = {
         "engine": "google_news",
         "q": company_name,
@@ -1,14 +1,10 @@
-import os
-import openai
 from fastapi import APIRouter
 from pydantic import BaseModel
 from dotenv import load_dotenv
+import llm_gateway
 
 load_dotenv()
 
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-openai.api_key = OPENAI_API_KEY
-
 router = APIRouter()
 
 class FollowUpRequest(BaseModel):
@@ -43,13 +39,13 @@ USER'S FOLLOW-UP QUESTION:
 Answer in a way that matches the language complexity setting above. Be concise, clear, and specific to the context provided. If the answer is not in the context, say so explicitly.
 """
     try:
-        response = openai.ChatCompletion.create(
+        response = await llm_gateway.chat_completion(
             model="gpt-3.5-turbo",
             messages=[{"role": "user", "content": prompt}],
             max_tokens=350,
             temperature=0.7
         )
-        answer = response.choices[0].message['content'].strip()
+        answer = response.choices[0].message.content.strip()
         return {"answer": answer}
     except Exception as e:
         return {"error": str(e)}
@@ -0,0 +1,334 @@
+"""
+http_cassette.py
+
+Record/replay of OpenAI and SerpAPI HTTP traffic for offline benchmarks and
+regression runs.
+
+In `record` mode every request to a covered host (CASSETTE_HOSTS plus the
+OPENAI_BASE_URL host) goes upstream as usual and the request/response pair is
+appended to a JSONL cassette with its wall-clock latency. In `replay` mode the
+same requests are answered from the cassette without touching the network;
+a request with no recording is answered with a 404 (not retried by llm_retry)
+and counted as a miss.
+
+Requests are matched by a canonical hash of method, path, query (minus
+credentials and cache busters) and JSON body with sorted keys, so the host
+(e.g. a local OPENAI_BASE_URL) and header order do not matter. When one key
+was recorded several times, replays cycle through the recordings in order.
+Replays can inject latency: none, each entry's `recorded` latency, or
+latency `sampled` (seeded) from all recordings of the same endpoint.
+
+The hook sits on the base transports of httpx (the OpenAI SDK, LangChain and
+serpapi_async) and requests (the serpapi package and company_rag), so no call
+site needs to know about it. Enable it with `install()` or, for the app,
+HTTP_CASSETTE_MODE (see `install_from_env`).
+"""
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+import httpx
+import requests
+import requests.adapters
+from requests.structures import CaseInsensitiveDict
+
+logger = logging.getLogger(__name__)
+
+OFF, RECORD, REPLAY = "off", "record", "replay"
+LATENCY_NONE, LATENCY_RECORDED, LATENCY_SAMPLED = "none", "recorded", "sampled"
+
+HTTP_CASSETTE_MODE = os.getenv("HTTP_CASSETTE_MODE", OFF).lower()
+HTTP_CASSETTE_PATH = os.getenv("HTTP_CASSETTE_PATH", os.path.join("benchmarks", "cassettes", "default.jsonl"))
+HTTP_CASSETTE_LATENCY = os.getenv("HTTP_CASSETTE_LATENCY", LATENCY_NONE).lower()
+HTTP_CASSETTE_LATENCY_SCALE = float(os.getenv("HTTP_CASSETTE_LATENCY_SCALE", "1.0"))
+HTTP_CASSETTE_SEED = int(os.getenv("HTTP_CASSETTE_SEED", "0"))
+
+CASSETTE_HOSTS = {"api.openai.com", "serpapi.com"}
+
+# Query parameters that never change the response: credentials and cache busters.
+_IGNORED_PARAMS = {"api_key", "no_cache"}
+# Response headers worth replaying; bodies are stored decoded, so encoding and
+# length headers would be wrong.
+_REPLAYED_HEADERS = ("content-type", "retry-after", "x-request-id")
+
+
+class CassetteMissError(RuntimeError):
+    """Replay mode received a request that was never recorded."""
+
+
+MISS_STATUS = 404
+
+
+def canonical_request(method: str, url: str, body: Optional[bytes]) -> Dict[str, Any]:
+    parts = urlsplit(url)
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k not in _IGNORED_PARAMS)
+    payload: Any = None
+    if body:
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            payload = body.decode("utf-8", errors="replace")
+    return {"method": method.upper(), "path": parts.path, "query": query, "body": payload}
+
+
+def request_key(canonical: Dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(canonical, sort_keys=True, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+
+def _endpoint(canonical: Dict[str, Any]) -> str:
+    """Latency bucket for a request: the path, plus the SerpAPI engine if any."""
+    engine = dict(canonical["query"]).get("engine")
+    return f"{canonical['path']}?engine={engine}" if engine else canonical["path"]
+
+
+class Cassette:
+    """One JSONL cassette file and its replay state. Thread-safe."""
+
+    def __init__(
+        self,
+        path: str,
+        mode: str = REPLAY,
+        latency: str = LATENCY_NONE,
+        latency_scale: float = 1.0,
+        seed: int = 0,
+        hosts: Optional[set] = None,
+    ):
+        if mode not in (RECORD, REPLAY):
+            raise ValueError(f"Unknown cassette mode '{mode}'.")
+        if latency not in (LATENCY_NONE, LATENCY_RECORDED, LATENCY_SAMPLED):
+            raise ValueError(f"Unknown cassette latency mode '{latency}'.")
+        self.path = path
+        self.mode = mode
+        self.latency = latency
+        self.latency_scale = latency_scale
+        self.hosts = set(hosts or CASSETTE_HOSTS)
+        base_url_host = urlsplit(os.getenv("OPENAI_BASE_URL", "")).hostname
+        if base_url_host:
+            self.hosts.add(base_url_host)
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._entries: Dict[str, List[Dict[str, Any]]] = {}
+        self._cursors: Dict[str, int] = {}
+        self._latencies: Dict[str, List[float]] = {}
+        self._stats = {"recorded": 0, "replayed": 0, "misses": 0, "passthrough": 0}
+        self._endpoint_calls: Dict[str, int] = {}
+        self._load()
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            if self.mode == REPLAY:
+                logger.warning(f"http_cassette: {self.path} does not exist; every covered request will miss.")
+            return
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    self._index(json.loads(line))
+        logger.info(f"http_cassette: loaded {sum(map(len, self._entries.values()))} recordings from {self.path}.")
+
+    def _index(self, entry: Dict[str, Any]) -> None:
+        self._entries.setdefault(entry["key"], []).append(entry)
+        self._latencies.setdefault(_endpoint(entry["request"]), []).append(entry["elapsed"])
+
+    def covers(self, host: Optional[str]) -> bool:
+        covered = host in self.hosts
+        if not covered:
+            with self._lock:
+                self._stats["passthrough"] += 1
+        return covered
+
+    def _count_endpoint(self, canonical: Dict[str, Any]) -> None:
+        endpoint = _endpoint(canonical)
+        self._endpoint_calls[endpoint] = self._endpoint_calls.get(endpoint, 0) + 1
+
+    def lookup(self, canonical: Dict[str, Any]) -> Dict[str, Any]:
+        key = request_key(canonical)
+        with self._lock:
+            self._count_endpoint(canonical)
+            entries = self._entries.get(key)
+            if not entries:
+                self._stats["misses"] += 1
+                raise CassetteMissError(f"No recording for {canonical['method']} {_endpoint(canonical)} (key {key[:12]}).")
+            cursor = self._cursors.get(key, 0)
+            self._cursors[key] = cursor + 1
+            self._stats["replayed"] += 1
+            return entries[cursor % len(entries)]
+
+    def replay_delay(self, entry: Dict[str, Any]) -> float:
+        if self.latency == LATENCY_RECORDED:
+            return entry["elapsed"] * self.latency_scale
+        if self.latency == LATENCY_SAMPLED:
+            with self._lock:
+                return self._rng.choice(self._latencies[_endpoint(entry["request"])]) * self.latency_scale
+        return 0.0
+
+    def record(self, canonical: Dict[str, Any], status: int, headers: Any, content: bytes, elapsed: float) -> None:
+        entry: Dict[str, Any] = {
+            "key": request_key(canonical),
+            "request": canonical,
+            "status": status,
+            "headers": {name: headers[name] for name in _REPLAYED_HEADERS if name in headers},
+            "elapsed": round(elapsed, 4),
+        }
+        try:
+            entry["body"] = content.decode("utf-8")
+        except UnicodeDecodeError:
+            entry["body_b64"] = base64.b64encode(content).decode("ascii")
+        line = json.dumps(entry, sort_keys=True)
+        with self._lock:
+            self._count_endpoint(canonical)
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+            self._index(entry)
+            self._stats["recorded"] += 1
+
+    @staticmethod
+    def content(entry: Dict[str, Any]) -> bytes:
+        if "body_b64" in entry:
+            return base64.b64decode(entry["body_b64"])
+        return entry["body"].encode("utf-8")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "path": self.path,
+                "latency": self.latency,
+                **self._stats,
+                "calls_by_endpoint": dict(self._endpoint_calls),
+            }
+
+
+# --- Transport hooks ---
+
+def _replay(cassette: Cassette, canonical: Dict[str, Any]) -> Tuple[int, Dict[str, str], bytes, float]:
+    """Status, headers, body and injected delay for a replayed request."""
+    try:
+        entry = cassette.lookup(canonical)
+    except CassetteMissError as e:
+        logger.warning(f"http_cassette: {e}")
+        body = json.dumps({"error": {"message": str(e), "type": "cassette_miss"}}).encode("utf-8")
+        return MISS_STATUS, {"content-type": "application/json"}, body, 0.0
+    return entry["status"], entry["headers"], Cassette.content(entry), cassette.replay_delay(entry)
+
+
+_active: Optional[Cassette] = None
+_originals: Dict[str, Any] = {}
+
+
+async def _httpx_async_handle(self, request: httpx.Request) -> httpx.Response:
+    cassette = _active
+    original = _originals["httpx_async"]
+    if cassette is None or not cassette.covers(request.url.host):
+        return await original(self, request)
+    canonical = canonical_request(request.method, str(request.url), await request.aread())
+    if cassette.mode == REPLAY:
+        status, headers, content, delay = _replay(cassette, canonical)
+        if delay:
+            await asyncio.sleep(delay)
+        return httpx.Response(status, headers=headers, content=content, request=request)
+    start = time.perf_counter()
+    response = await original(self, request)
+    try:
+        content = await response.aread()
+    finally:
+        await response.aclose()
+    cassette.record(canonical, response.status_code, response.headers, content, time.perf_counter() - start)
+    headers = {name: response.headers[name] for name in _REPLAYED_HEADERS if name in response.headers}
+    return httpx.Response(response.status_code, headers=headers, content=content, request=request)
+
+
+def _httpx_sync_handle(self, request: httpx.Request) -> httpx.Response:
+    cassette = _active
+    original = _originals["httpx_sync"]
+    if cassette is None or not cassette.covers(request.url.host):
+        return original(self, request)
+    canonical = canonical_request(request.method, str(request.url), request.read())
+    if cassette.mode == REPLAY:
+        status, headers, content, delay = _replay(cassette, canonical)
+        if delay:
+            time.sleep(delay)
+        return httpx.Response(status, headers=headers, content=content, request=request)
+    start = time.perf_counter()
+    response = original(self, request)
+    try:
+        content = response.read()
+    finally:
+        response.close()
+    cassette.record(canonical, response.status_code, response.headers, content, time.perf_counter() - start)
+    headers = {name: response.headers[name] for name in _REPLAYED_HEADERS if name in response.headers}
+    return httpx.Response(response.status_code, headers=headers, content=content, request=request)
+
+
+def _requests_send(self, request: requests.PreparedRequest, **kwargs) -> requests.Response:
+    cassette = _active
+    original = _originals["requests"]
+    if cassette is None or not cassette.covers(urlsplit(request.url).hostname):
+        return original(self, request, **kwargs)
+    body = request.body.encode("utf-8") if isinstance(request.body, str) else request.body
+    canonical = canonical_request(request.method, request.url, body)
+    if cassette.mode == REPLAY:
+        status, headers, content, delay = _replay(cassette, canonical)
+        if delay:
+            time.sleep(delay)
+        response = requests.Response()
+        response.status_code = status
+        response.headers = CaseInsensitiveDict(headers)
+        response._content = content
+        response.encoding = "utf-8"
+        response.url = request.url
+        response.request = request
+        return response
+    start = time.perf_counter()
+    response = original(self, request, **kwargs)
+    cassette.record(canonical, response.status_code, response.headers, response.content, time.perf_counter() - start)
+    return response
+
+
+def install(cassette: Cassette) -> Cassette:
+    """Routes covered HTTP traffic through `cassette` until `uninstall()`."""
+    global _active
+    if not _originals:
+        _originals["httpx_async"] = httpx.AsyncHTTPTransport.handle_async_request
+        _originals["httpx_sync"] = httpx.HTTPTransport.handle_request
+        _originals["requests"] = requests.adapters.HTTPAdapter.send
+        httpx.AsyncHTTPTransport.handle_async_request = _httpx_async_handle
+        httpx.HTTPTransport.handle_request = _httpx_sync_handle
+        requests.adapters.HTTPAdapter.send = _requests_send
+    _active = cassette
+    logger.info(f"http_cassette: {cassette.mode} mode on {cassette.path} (hosts {sorted(cassette.hosts)}, latency {cassette.latency}).")
+    return cassette
+
+
+def uninstall() -> None:
+    global _active
+    _active = None
+    if _originals:
+        httpx.AsyncHTTPTransport.handle_async_request = _originals.pop("httpx_async")
+        httpx.HTTPTransport.handle_request = _originals.pop("httpx_sync")
+        requests.adapters.HTTPAdapter.send = _originals.pop("requests")
+
+
+def install_from_env() -> Optional[Cassette]:
+    """Installs a cassette if HTTP_CASSETTE_MODE is `record` or `replay`."""
+    if HTTP_CASSETTE_MODE == OFF:
+        return None
+    return install(Cassette(
+        HTTP_CASSETTE_PATH,
+        mode=HTTP_CASSETTE_MODE,
+        latency=HTTP_CASSETTE_LATENCY,
+        latency_scale=HTTP_CASSETTE_LATENCY_SCALE,
+        seed=HTTP_CASSETTE_SEED,
+    ))
+
+
+def stats() -> Optional[Dict[str, Any]]:
+    return _active.stats() if _active is not None else None
@@ -1,18 +1,19 @@
 import asyncio
 from typing import Optional, List, Dict, Any
-from pydantic import BaseModel # Added for internal models
 from interview_prep_v2_models import (
     WelcomeSectionModel, CompanyIndustrySectionModel, RoleSuccessFactorsSection, EvaluatedRequirementItemModel, RoleUnderstandingFitAssessmentSectionModel, # CandidateFitMatrixSectionModel, FitMatrixRow removed
     StarStoryBankSectionModel, StarStory, TechnicalCasePrepSectionModel, CaseStudyPrompt, KeyTerm,
     InsiderCheatSheetSectionModel, # MockInterviewSectionModel removed
     ExportShareSectionModel, NewsItem, # OfferNegotiationSectionModel removed
-    JobDescriptionStructured
+    JobDescriptionStructured, FullRoleAssessmentResponse
 )
 from openai_resume_jd_parsing import parse_resume_with_openai, parse_jd_with_openai
 from company_profile_agent import fetch_company_profile, parse_company_profile_sections
-from serpapi_news_fetcher import fetch_recent_news
 import openai
-import os # Added
+import llm_gateway
+import model_router
+import prompt_registry
+import structured_output
 import json
 import logging
 import re
@@ -22,15 +23,6 @@ logger = logging.getLogger(__name__)
 if not logging.getLogger().hasHandlers():
     logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 
-# Initialize AsyncOpenAI client
-# Assumes OPENAI_API_KEY is available in the environment (e.g., loaded by main.py via python-dotenv)
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-if not OPENAI_API_KEY:
-    print("CRITICAL WARNING: OPENAI_API_KEY not found in environment for interview_prep_v2_builders.py. OpenAI calls will fail.")
-    # Provide a fallback or raise an error if essential, for now, it will likely fail if not set.
-    # OPENAI_API_KEY = "your_fallback_key_if_absolutely_necessary_and_secure"
-async_openai_client = openai.AsyncOpenAI(api_key=OPENAI_API_KEY)
-
 import difflib
 
 async def build_profile_sections(
@@ -60,18 +52,11 @@ def build_welcome_section(
     )
 
 
-async def build_company_industry_section(
-    company_name: str,
-    jd_structured: Dict[str, Any],
-    job_description: str
+def build_company_industry_section(
+    profile_sections: Dict[str, Any],
+    news_results: List[Dict[str, str]]
 ) -> CompanyIndustrySectionModel:
-    sections = await build_profile_sections(company_name, jd_structured, job_description)
-    # Fetch recent news via SerpAPI
-    try:
-        news_results = await fetch_recent_news(company_name, max_articles=5)
-    except Exception as e:
-        print(f"Recent news fetch failed: {e}")
-        news_results = []
+    """Combines the company profile (see build_profile_sections) with recent news (see fetch_company_news)."""
     recent_news_items: List[NewsItem] = []
     for idx, item in enumerate(news_results, start=1):
         recent_news_items.append(NewsItem(
@@ -82,9 +67,9 @@ async def build_company_industry_section(
             summary=item.get("snippet", "")
         ))
     # Map parsed 'facts' from company profile as industry drivers
-    industry_drivers = sections.get("facts", [])
+    industry_drivers = profile_sections.get("facts", [])
     return CompanyIndustrySectionModel(
-        company_overview=sections["overview"],
+        company_overview=profile_sections["overview"],
         recent_news=recent_news_items,
         industry_drivers=industry_drivers
     )
@@ -106,50 +91,7 @@ async def build_role_success_section(
     raw_job_duties = jd_responsibilities_texts # Responsibilities -> What you will do (raw)
     raw_qualifications = jd_requirements_texts  # Requirements -> Qualifications (raw)
 
-    class _FullRoleAssessmentResponse(BaseModel):
-        evaluated_must_haves: List[EvaluatedRequirementItemModel]
-        evaluated_nice_to_haves: List[EvaluatedRequirementItemModel]
-        overall_readiness: str
-        focus_recommendations: List[str]
-
-    system_prompt = f"""
-You are an expert career coach and talent analyst. Your task is to evaluate a candidate's fit for a role based on their resume and the job description.
-
-You will be provided with:
-1. `jd_requirements`: A list of requirements from the job description
-2. `jd_responsibilities`: A list of responsibilities from the job description
-3. `resume_bullets`: The candidate's resume content
-
-Your evaluation should be thorough, evidence-based, and focused on the candidate's potential to succeed in the role. Consider both explicit matches and transferable skills.
-
-Please provide your assessment in the following format:
-
-1. Must-Have Qualifications:
-   - Select 5-7 critical requirements from the JD
-   - For each, indicate if the candidate meets the requirement based on their resume
-   - Provide specific evidence from their experience that demonstrates each met requirement
-   - For unmet requirements, note what's missing
-
-2. Nice-to-Have Qualifications:
-   - Identify 3-5 additional valuable skills or experiences
-   - Assess if the candidate has these qualifications
-   - Provide specific examples from their background
-
-3. Overall Assessment:
-   - Summarize the candidate's strengths for this role
-   - Note any potential gaps in their experience
-   - Provide actionable recommendations for addressing any gaps
-
-Format your response as a JSON object matching this schema:
-{_FullRoleAssessmentResponse.schema_json(indent=2)}
-
-Key Guidelines:
-- Be specific and evidence-based in your evaluation
-- Consider both direct experience and transferable skills
-- Look for patterns of achievement and impact in the candidate's background
-- Be constructive in identifying areas for development
-- Focus on the most important qualifications for role success
-"""
+    system_prompt = prompt_registry.get("role_success").text
     
     user_content = json.dumps({
         "jd_requirements": jd_requirements_texts,
@@ -162,69 +104,26 @@ Key Guidelines:
         {"role": "user", "content": user_content}
     ]
 
-    evaluated_must_haves_result: List[EvaluatedRequirementItemModel] = []
-    evaluated_nice_to_haves_result: List[EvaluatedRequirementItemModel] = []
-    overall_readiness_result = "Could not generate overall readiness assessment at this time."
-    focus_recommendations_result = []
-
-    content_str_for_error = ""  # Initialize for error reporting
-    try:
-        response = await async_openai_client.chat.completions.create(
-            model="gpt-4-turbo",
-            messages=messages,
-            response_format={"type": "json_object"},
-            temperature=0.3,
-        )
-        
-        content_str_for_error = response.choices[0].message.content
-        if not content_str_for_error:
-            print("OpenAI returned empty content for role success section.")
-            return RoleSuccessFactorsSection(
-                must_haves=[],
-                nice_to_haves=[],
-                job_duties=jd_responsibilities_texts,
-                qualifications=jd_requirements_texts,
-                overall_readiness="Error: Could not generate assessment (empty LLM response).",
-                focus_recommendations=["Error: Could not generate focus recommendations."]
-            )
-            
-        parsed_content = json.loads(content_str_for_error)
-        assessment_data = _FullRoleAssessmentResponse(**parsed_content)
-        evaluated_must_haves_result = assessment_data.evaluated_must_haves
-        evaluated_nice_to_haves_result = assessment_data.evaluated_nice_to_haves
-        overall_readiness_result = assessment_data.overall_readiness
-        focus_recommendations_result = assessment_data.focus_recommendations
-        
-    except json.JSONDecodeError as e:
-        error_message = f"JSONDecodeError in build_role_success_section: {e}. Problematic content: {content_str_for_error}"
-        print(error_message)
-        return RoleSuccessFactorsSection(
-            must_haves=[],
-            nice_to_haves=[],
-            job_duties=jd_responsibilities_texts,
-            qualifications=jd_requirements_texts,
-            overall_readiness="Error: Could not generate assessment due to a parsing error.",
-            focus_recommendations=["Error: Could not generate focus recommendations due to a parsing error."]
-        )
-    except Exception as e:
-        error_message = f"Unexpected error in build_role_success_section: {e}. Content from LLM (if available): {content_str_for_error}"
-        print(error_message)
-        return RoleSuccessFactorsSection(
-            must_haves=[],
-            nice_to_haves=[],
-            job_duties=jd_responsibilities_texts,
-            qualifications=jd_requirements_texts,
-            overall_readiness="Error: Could not generate assessment due to an unexpected error.",
-            focus_recommendations=["Error: Could not generate focus recommendations."]
-        )
+    # Failures propagate: the orchestrator marks the section failed and does
+    # not cache it, instead of caching an "Error: ..." placeholder.
+    response = await model_router.chat_completion(
+        "role_success",
+        response_model=FullRoleAssessmentResponse,
+        messages=messages,
+        temperature=0.3,
+    )
+    content = response.choices[0].message.content
+    if not content:
+        raise ValueError("Empty LLM response for the role success section.")
+    assessment_data = structured_output.parse("role_success", content, FullRoleAssessmentResponse, record=False)
 
     return RoleSuccessFactorsSection(
-        must_haves=evaluated_must_haves_result,
-        nice_to_haves=evaluated_nice_to_haves_result,
+        must_haves=assessment_data.evaluated_must_haves,
+        nice_to_haves=assessment_data.evaluated_nice_to_haves,
         job_duties=raw_job_duties, # Keep raw duties for general info
         qualifications=raw_qualifications, # Keep raw qualifications for general info
-        overall_readiness=overall_readiness_result,
-        focus_recommendations=focus_recommendations_result
+        overall_readiness=assessment_data.overall_readiness,
+        focus_recommendations=assessment_data.focus_recommendations
     )
 
 
@@ -237,83 +136,30 @@ async def build_role_understanding_fit_assessment_section(
     """
     Generates a section that explains the role and assesses candidate fit based on JD and resume.
     """
-    content_str_for_error = "" # Initialize for error reporting
-    try:
-        schema_json = RoleUnderstandingFitAssessmentSectionModel.schema_json(indent=2)
-        
-        system_prompt = f"""
-You are an expert career coach and talent analyst. Your task is to help a candidate understand a potential role and their fit for it.
-You will be provided with a structured Job Description (JD) and a string containing the candidate's resume bullets.
-You MUST return a JSON object that strictly adheres to the following Pydantic model schema:
-
-```json
-{schema_json}
-```
-
-Instructions:
-
-Phase 1: Role Understanding
-Based on the provided structured Job Description (JD), first, clearly and concisely explain:
-1.  `role_summary`: In 2-3 sentences, what is the core purpose and essence of this role? Use simple, everyday language.
-2.  `key_responsibilities_summary`: List 3-5 bullet points summarizing the main things someone in this role would be doing regularly. Avoid jargon from the JD; rephrase for clarity.
-
-Phase 2: Candidate Fit Assessment
-Now, considering the candidate's `resume_bullets` and your understanding of the role from Phase 1:
-3.  `overall_fit_rating`: Provide a qualitative assessment (e.g., 'Strong Fit', 'Good Potential Fit', 'Potential Gaps Identified', 'Challenging Fit').
-4.  `fit_assessment_details`: Write a comprehensive but easy-to-read paragraph.
-    *   Explain your `overall_fit_rating`.
-    *   If it's a good fit, highlight specific experiences or skills from the resume that align directly with the `role_summary` and `key_responsibilities_summary`.
-    *   If there are gaps or it's a challenging fit, gently but honestly point out which aspects of the role don't seem to be strongly supported by the resume, or what experiences might be missing.
-    *   The tone should be constructive and evaluative. Ensure this explanation is thorough and directly references both the JD aspects and resume points.
-"""
-        user_content = {
-            "job_description_structured": jd_structured.dict(exclude_none=True),
-            "resume_bullets": resume_bullets
-        }
-
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": json.dumps(user_content)}
-        ]
-
-        response = await async_openai_client.chat.completions.create(
-            model="gpt-4-turbo", 
-            messages=messages,
-            response_format={"type": "json_object"},
-            temperature=0.3,
-        )
-        
-        content_str_for_error = response.choices[0].message.content
-        if not content_str_for_error:
-            print("OpenAI returned empty content for role understanding/fit assessment.")
-            return RoleUnderstandingFitAssessmentSectionModel(
-                role_summary="Error: Could not generate role summary (empty LLM response).",
-                key_responsibilities_summary=[],
-                overall_fit_rating="Error",
-                fit_assessment_details="Error: Could not generate fit assessment details (empty LLM response)."
-            )
-        
-        parsed_section = RoleUnderstandingFitAssessmentSectionModel.parse_raw(content_str_for_error)
-        return parsed_section
-
-    except json.JSONDecodeError as e:
-        error_message = f"JSONDecodeError in build_role_understanding_fit_assessment_section: {e}. Problematic content from LLM: {content_str_for_error}"
-        print(error_message)
-        return RoleUnderstandingFitAssessmentSectionModel(
-            role_summary="Error: Could not generate role summary due to a parsing error.",
-            key_responsibilities_summary=[],
-            overall_fit_rating="Error",
-            fit_assessment_details=error_message
-        )
-    except Exception as e:
-        error_message = f"Unexpected error in build_role_understanding_fit_assessment_section: {e}. Content from LLM (if available): {content_str_for_error}"
-        print(error_message)
-        return RoleUnderstandingFitAssessmentSectionModel(
-            role_summary="Error: Could not generate role summary due to an unexpected error.",
-            key_responsibilities_summary=[],
-            overall_fit_rating="Error",
-            fit_assessment_details=error_message
-        )
+    system_prompt = prompt_registry.get("role_understanding_fit").text
+    user_content = {
+        "job_description_structured": jd_structured.dict(exclude_none=True),
+        "resume_bullets": resume_bullets
+    }
+
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": json.dumps(user_content)}
+    ]
+
+    # Failures propagate so the orchestrator marks the section failed (see build_role_success_section).
+    response = await model_router.chat_completion(
+        "role_understanding_fit",
+        response_model=RoleUnderstandingFitAssessmentSectionModel,
+        messages=messages,
+        temperature=0.3,
+    )
+    content = response.choices[0].message.content
+    if not content:
+        raise ValueError("Empty LLM response for the role understanding/fit assessment section.")
+    return structured_output.parse(
+        "role_understanding_fit", content, RoleUnderstandingFitAssessmentSectionModel, record=False
+    )
 
 
 async def build_star_story_bank_section(
@@ -323,9 +169,6 @@ async def build_star_story_bank_section(
     """
     Use OpenAI to generate STAR stories from resume achievements.
     """
-    schema_dict = StarStoryBankSectionModel.model_json_schema()
-    schema_json = json.dumps(schema_dict, indent=2)
-
     # --- Enhanced Achievement Extraction ---
     all_achievements = []
     # 1. Get top-level achievements if any
@@ -373,54 +216,23 @@ async def build_star_story_bank_section(
     jd_context_str = f"Job Title: {jd_role_title}\nKey Requirements: {'; '.join(jd_requirements[:5])}\nKey Responsibilities: {'; '.join(jd_responsibilities[:3])}"
 
     messages = [
-        {"role": "system", "content": (
-            f"You are an expert interview coach and resume writer. You will be given a list of resume achievements and context about a job description. "
-            f"Your task is to generate 2-3 unique STAR stories based on the provided achievements, making them relevant to the job description. "
-            f"For each STAR story, you MUST:"
-            f"1. Formulate a 'behavioral_question' an interviewer might ask for {jd_role_title} that the STAR story can answer. This question should reflect common interview scenarios and be tailored to the provided job context."
-            f"2. Identify a 'competency' (e.g., 'Problem Solving', 'Leadership', 'Teamwork', 'Initiative', 'Adaptability', 'Communication') that the story and question highlight. This competency will serve as the title for the story."
-            f"3. Construct the STAR story with 'situation', 'task', 'action', and 'result' fields based on one of the resume achievements."
-            f"4. Provide 'interviewer_advice' (2-3 sentences) explaining what an interviewer is likely trying to assess with this type of question and what the candidate should emphasize in their answer."
-            f"5. Optionally, include a list of 'tags' (keywords) relevant to the story."
-            f"You MUST return a JSON object. This JSON object should contain a single key 'stories', which is a list of these story objects. "
-            f"Each story object in the 'stories' list MUST have the fields: 'competency' (string), 'behavioral_question' (string), 'situation' (string), 'task' (string), 'action' (string), 'result' (string), 'interviewer_advice' (string), and 'tags' (list of strings)."
-            f"Your entire output must be ONLY the JSON object, strictly adhering to this structure and the Pydantic model schema provided below. Do not include any extra explanations or conversational text.\n\n"
-            f"Pydantic JSON Schema to follow:\n{schema_json}"
-        )},
+        {"role": "system", "content": prompt_registry.get("star_story_bank").render(jd_role_title=jd_role_title)},
         {"role": "user", "content": json.dumps({
             "resume_achievements": unique_achievements[:10], # Send up to 10 unique achievements
             "job_description_context": jd_context_str
         })}
     ]
-    content_str_for_error = "" # Initialize for error reporting
-    try:
-        # Using gpt-4-turbo as it's generally better with JSON and complex instructions
-        # Ensure the model used supports response_format={"type": "json_object"}
-        # gpt-3.5-turbo might need a newer version like gpt-3.5-turbo-0125
-        response = await async_openai_client.chat.completions.create(
-            model="gpt-4-turbo", # Or "gpt-3.5-turbo-0125" or newer that supports JSON mode
-            messages=messages,
-            response_format={"type": "json_object"},
-            temperature=0.5
-        )
-        
-        content_str_for_error = response.choices[0].message.content
-        if not content_str_for_error:
-            print("OpenAI returned empty content for STAR stories.")
-            return StarStoryBankSectionModel(stories=[]) # Return empty stories list
-        
-        parsed_section = StarStoryBankSectionModel.parse_raw(content_str_for_error)
-        return parsed_section
-
-    except json.JSONDecodeError as e:
-        error_message = f"JSONDecodeError in build_star_story_bank_section: {e}. Problematic content from LLM: {content_str_for_error}"
-        print(error_message)
-        return StarStoryBankSectionModel(stories=[])
-    except Exception as e:
-        # Catching openai.APIError specifically could be useful too
-        error_message = f"Unexpected error in build_star_story_bank_section: {e}. Content from LLM (if available): {content_str_for_error}"
-        print(error_message)
-        return StarStoryBankSectionModel(stories=[])
+    # Every model in the route must support at least response_format={"type": "json_object"}
+    response = await model_router.chat_completion(
+        "star_story_bank",
+        response_model=StarStoryBankSectionModel,
+        messages=messages,
+        temperature=0.5
+    )
+    content = response.choices[0].message.content
+    if not content:
+        raise ValueError("Empty LLM response for the STAR story bank section.")
+    return structured_output.parse("star_story_bank", content, StarStoryBankSectionModel, record=False)
 
 
 async def build_technical_case_prep_section(
@@ -446,9 +258,7 @@ async def build_technical_case_prep_section(
     requirements = "\n- ".join(jd_structured.requirements) if jd_structured.requirements else "Not specified"
     
     # Enhanced system prompt for comprehensive technical prep
-    system_prompt = """You are an expert technical interviewer and career coach with deep experience in technical hiring 
-    across various domains. Your task is to create comprehensive technical interview preparation materials 
-    tailored to a specific job role."""
+    system_prompt = prompt_registry.get("technical_case_prep").text
     
     user_content = f"""
     Please generate comprehensive technical interview preparation materials for a candidate applying to the following role:
@@ -487,9 +297,9 @@ async def build_technical_case_prep_section(
     try:
         logger.info(f"Generating technical case prep for role: {role_title}")
         
-        # Use a more capable model for comprehensive generation
-        response = await async_openai_client.chat.completions.create(
-            model="gpt-4-turbo-preview",
+        response = await model_router.chat_completion(
+            "technical_case_prep",
+            validate=lambda content: structured_output.loads("technical_case_prep", content),
             messages=messages,
             temperature=0.5,  # Lower temperature for more focused, accurate responses
             response_format={"type": "json_object"},
@@ -502,7 +312,7 @@ async def build_technical_case_prep_section(
         if llm_output:
             try:
                 # Parse the JSON response
-                parsed_data = json.loads(llm_output)
+                parsed_data = structured_output.loads("technical_case_prep", llm_output, record=False)
                 
                 # Transform the data to match our Pydantic models
                 prompts = [
@@ -553,11 +363,11 @@ async def build_technical_case_prep_section(
                     preparation_tips=parsed_data.get("preparation_tips", [])
                 )
                 
-            except (json.JSONDecodeError, KeyError, TypeError) as e:
+            except (structured_output.StructuredOutputError, KeyError, TypeError) as e:
                 logger.error(f"Error parsing technical prep data: {e}\nRaw output: {llm_output}")
                 raise ValueError("Failed to parse technical preparation data")
         
-        return TechnicalCasePrepSectionModel()
+        raise ValueError("Empty LLM response for the technical case prep section.")
         
     except openai.APIError as e:
         logger.error(f"OpenAI API error in build_technical_case_prep_section: {e}", exc_info=True)
@@ -573,11 +383,6 @@ async def build_insider_cheat_sheet_section(
     job_description: str
 ) -> InsiderCheatSheetSectionModel:
     # Generate insider cheat sheet with cultural, exec, financial, and candidate questions
-    function_def = {
-        "name": "generate_insider_cheat_sheet",
-        "description": "Generate insider cheat sheet details for company and role",
-        "parameters": InsiderCheatSheetSectionModel.schema()
-    }
     messages = [
         {"role": "system", "content": (
             "You are a seasoned industry analyst. Given the company name, job description, and JD requirements, "
@@ -589,22 +394,15 @@ async def build_insider_cheat_sheet_section(
         {"role": "system", "content": f"JD requirements: {json.dumps(jd_structured.get('requirements', []))}"},
         {"role": "user", "content": json.dumps({"company_name": company_name})}
     ]
-    response = await openai.chat.completions.create(
+    response = await llm_gateway.chat_completion(
         model="gpt-4.1-nano",
         messages=messages,
         temperature=0.7
     )
     content_str = response.choices[0].message.content
-    try:
-        parsed_args = json.loads(content_str)
-        return InsiderCheatSheetSectionModel(**parsed_args)
-    except json.JSONDecodeError as e:
-        print(f"Error generating insider cheat sheet section: {e}")
-        print(f"Problematic content: {content_str}")
-        return InsiderCheatSheetSectionModel(culture_cues=[], exec_quotes=[], financial_snapshot="", glassdoor_pain_points=[], tailored_questions=[])
-    except Exception as e:
-        print(f"Error generating insider cheat sheet section: {e}")
-        return InsiderCheatSheetSectionModel(culture_cues=[], exec_quotes=[], financial_snapshot="", glassdoor_pain_points=[], tailored_questions=[])
+    if not content_str:
+        raise ValueError("Empty LLM response for the insider cheat sheet section.")
+    return InsiderCheatSheetSectionModel(**json.loads(content_str))
 
 
 # def build_offer_negotiation_section(
@@ -47,6 +47,13 @@ class RoleSuccessFactorsSection(BaseModel):
     overall_readiness: Optional[str] = Field(default=None, description="Narrative evaluation of how prepared the candidate is given resume & JD")
     focus_recommendations: Optional[List[str]] = Field(default_factory=list, description="Guidance on areas to highlight or improve during interview prep")
 
+class FullRoleAssessmentResponse(BaseModel):
+    # Raw LLM response of the role success builder, mapped onto RoleSuccessFactorsSection
+    evaluated_must_haves: List[EvaluatedRequirementItemModel]
+    evaluated_nice_to_haves: List[EvaluatedRequirementItemModel]
+    overall_readiness: str
+    focus_recommendations: List[str]
+
 # SECTION 4: Role Understanding & Fit Assessment
 class RoleUnderstandingFitAssessmentSectionModel(BaseModel):
     role_summary: str = Field(default="", description="A concise, easily understandable summary of what the role is.")
@@ -220,6 +227,12 @@ class InterviewPrepV2Guide(BaseModel):
     export_share: Optional[ExportShareSectionModel] = None
     resume_structured: Optional[ResumeStructured] = None
     job_description_structured: Optional[JobDescriptionStructured] = None
+    # Sections returned as placeholders because they (or a section they are
+    # built from) missed the generation deadline; re-request them individually.
+    timed_out_sections: List[str] = Field(default_factory=list)
+    # Only set on guide skeletons: "ready" (included), "loading" (started in the
+    # background) or "on_demand" (built only when requested) per section.
+    section_states: Dict[str, str] = Field(default_factory=dict)
 
     class Config:
         validate_assignment = True
@@ -0,0 +1,702 @@
+"""
+interview_prep_v2_orchestrator.py
+
+Dependency-aware concurrent orchestration for the Interview Prep v2 guide.
+Each guide section is registered as a node with the nodes it depends on.
+Independent nodes start at once, dependants start as soon as their inputs
+land, and a failure in one node only ever replaces that node's output with
+its default model. With a deadline, each node gets a share of it as its time
+budget; a node that misses its budget is returned as its default, marked as
+timed out, instead of holding up the rest of the guide.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from functools import partial
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple, Type
+
+from langchain_core.messages import SystemMessage, HumanMessage
+from pydantic import BaseModel
+
+import prompts
+from prompts import INTERVIEW_PREP_V2_USER_PROMPT_TEMPLATE_B_CANDIDATE_ROLE
+from interview_prep_v2_builders import (
+    build_profile_sections,
+    build_company_industry_section,
+    build_role_success_section,
+    build_role_understanding_fit_assessment_section,
+    build_star_story_bank_section,
+    build_technical_case_prep_section,
+)
+from interview_prep_v2_models import (
+    JobDescriptionStructured,
+    ResumeStructured,
+    InterviewPrepV2Guide,
+    WelcomeSectionModel,
+    CompanyIndustrySectionModel,
+    RoleSuccessFactorsSection,
+    RoleUnderstandingFitAssessmentSectionModel,
+    StarStoryBankSectionModel,
+    TechnicalCasePrepSectionModel,
+    QuestionsToAskSectionModel,
+    InsiderCheatSheetSectionModel,
+    ExportShareSectionModel,
+)
+from cache import (
+    get_cached_section, set_cached_section,
+    get_cached_shared_section, set_cached_shared_section,
+    normalise_shared_input, hash_payload,
+)
+import llm_gateway
+import llm_retry
+import model_router
+import prompt_registry
+import structured_output
+import single_flight
+from serpapi_news_fetcher import fetch_company_news
+from prompt_budget import PromptField, compact_json, dedupe_text, fit_prompt, text_values
+
+logger = logging.getLogger(__name__)
+
+# Input-token budget for prompt B (system + user message). The call itself is
+# routed by model_router; this model is only used to count tokens.
+PROMPT_B_INPUT_TOKEN_BUDGET = int(os.getenv("PROMPT_B_INPUT_TOKEN_BUDGET", "6000"))
+PROMPT_B_MODEL = "gpt-4o"
+
+# Server default for how long a whole guide may take; requests can pass their own.
+GUIDE_DEADLINE_SECONDS = float(os.getenv("GUIDE_DEADLINE_SECONDS", "120"))
+# Share of the deadline the LLM-backed nodes may use, leaving the rest for the
+# post-processing sections that depend on them and for assembly.
+LLM_SECTION_BUDGET_SHARE = float(os.getenv("LLM_SECTION_BUDGET_SHARE", "0.9"))
+
+# Bump when section builders, models or assembly change in a way that should
+# invalidate cached guides. Prompt text changes, and schema changes of the
+# models compiled into registered prompts, are picked up automatically.
+GUIDE_PLAN_VERSION = "2"
+GUIDE_CACHE_VERSION = hashlib.sha256(json.dumps(
+    [GUIDE_PLAN_VERSION, model_router.ROUTES_VERSION, sorted(prompt_registry.versions().items()),
+     sorted((k, v) for k, v in vars(prompts).items() if k.isupper() and isinstance(v, str))]
+).encode("utf-8")).hexdigest()[:16]
+
+SectionRunner = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+# Nodes whose output is a field of InterviewPrepV2Guide (in guide order).
+# Any other node in the plan is an intermediate result, e.g. raw LLM call B.
+GUIDE_SECTION_NAMES = [
+    "section_1_company_industry",
+    "section_3_role_success",
+    "section_4_role_understanding_fit_assessment",
+    "section_5_star_story_bank",
+    "section_6_technical_case_prep",
+    "section_8_insider_cheat_sheet",
+    "section_9_questions_to_ask",
+]
+
+# Sections too expensive to build for every guide: company profile + news
+# (section 1) and the dedicated technical case prep builder (section 6, which
+# otherwise comes from call B). With `lazy_sections` they are only run when a
+# client asks for them (see SectionOrchestrator.run with targets).
+LAZY_SECTION_NAMES = [
+    "section_1_company_industry",
+    "section_6_technical_case_prep",
+]
+
+# Section states reported on a guide skeleton.
+SECTION_READY, SECTION_LOADING, SECTION_ON_DEMAND = "ready", "loading", "on_demand"
+
+# Nodes that need only the parsed resume and JD (no company, industry or raw
+# text), so they can be pre-generated before the user asks for a guide.
+SPECULATIVE_SECTION_NAMES = [
+    "role_success_prebuilt",
+    "section_4_role_understanding_fit_assessment",
+    "section_5_star_story_bank",
+]
+
+
+class SectionResult:
+    """Outcome of a single orchestrated node."""
+
+    def __init__(self, name: str, value: Any, error: Optional[BaseException] = None, elapsed: float = 0.0,
+                 cached: bool = False, timed_out: bool = False):
+        self.name = name
+        self.value = value
+        self.error = error
+        self.elapsed = elapsed
+        self.cached = cached
+        # The node, or a node it depends on, missed its deadline budget.
+        self.timed_out = timed_out
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def _freeze_inputs(inputs: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: v.model_dump(mode="json") if isinstance(v, BaseModel) else v for k, v in inputs.items()}
+
+
+def _freeze(value: Any) -> Tuple[Optional[type], str]:
+    if isinstance(value, BaseModel):
+        return type(value), value.model_dump_json()
+    return None, json.dumps(value)
+
+
+def _thaw(entry: Tuple[Optional[type], str]) -> Any:
+    model_cls, payload = entry
+    return model_cls.model_validate_json(payload) if model_cls else json.loads(payload)
+
+
+class SectionOrchestrator:
+    """
+    Runs a DAG of async section builders concurrently.
+
+    A runner receives a dict of its dependencies' values and returns its own
+    value. Returning None or raising yields the node's default instead, so one
+    broken section never takes the whole guide down with it.
+
+    Nodes registered with `inputs` (the exact values the runner consumes) are
+    cached per node, keyed by those inputs, the plan version and their
+    dependencies' keys. Only nodes that some uncached output still needs are
+    run, so a plan whose sections are all cached makes no calls at all.
+    `shared` nodes depend on nothing user-specific (company, role, industry);
+    their normalised inputs key a cross-user cache with its own TTL.
+
+    With a `deadline` (seconds from the start of the run), each node must
+    finish within `budget_share` of it; one that doesn't is cancelled and
+    yields its default with `timed_out` set, as do its dependants.
+    """
+
+    def __init__(self, version: str = "", use_cache: bool = True, deadline: Optional[float] = None):
+        self._runners: Dict[str, SectionRunner] = {}
+        self._depends_on: Dict[str, List[str]] = {}
+        self._defaults: Dict[str, Callable[[], Any]] = {}
+        self._inputs: Dict[str, Any] = {}
+        self._shared: set = set()
+        self._refresh: set = set()
+        self._budget_shares: Dict[str, float] = {}
+        self.version = version
+        self.use_cache = use_cache
+        self.deadline = deadline
+
+    def add(
+        self,
+        name: str,
+        runner: SectionRunner,
+        depends_on: Iterable[str] = (),
+        default: Callable[[], Any] = lambda: None,
+        inputs: Optional[Dict[str, Any]] = None,
+        shared: bool = False,
+        budget_share: float = 1.0,
+    ) -> None:
+        if name in self._runners:
+            raise ValueError(f"Section '{name}' is already registered.")
+        if shared and (inputs is None or depends_on):
+            raise ValueError(f"Shared section '{name}' needs inputs and cannot have dependencies.")
+        self._runners[name] = runner
+        self._depends_on[name] = list(depends_on)
+        self._defaults[name] = default
+        self._budget_shares[name] = budget_share
+        if inputs is not None:
+            self._inputs[name] = normalise_shared_input(_freeze_inputs(inputs)) if shared else inputs
+        if shared:
+            self._shared.add(name)
+
+    @property
+    def names(self) -> List[str]:
+        return list(self._runners)
+
+    def refresh(self, name: str) -> None:
+        """Forces `name` and everything it depends on to be regenerated."""
+        if name not in self._runners:
+            raise ValueError(f"Unknown section '{name}'.")
+        self._refresh.add(name)
+        for dep in self._depends_on[name]:
+            self.refresh(dep)
+
+    def _check_graph(self) -> None:
+        for name, deps in self._depends_on.items():
+            for dep in deps:
+                if dep not in self._runners:
+                    raise ValueError(f"Section '{name}' depends on unknown section '{dep}'.")
+        visiting, done = set(), set()
+
+        def visit(node: str) -> None:
+            if node in done:
+                return
+            if node in visiting:
+                raise ValueError(f"Dependency cycle detected at section '{node}'.")
+            visiting.add(node)
+            for dep in self._depends_on[node]:
+                visit(dep)
+            visiting.discard(node)
+            done.add(node)
+
+        for node in self._runners:
+            visit(node)
+
+    def _cache_keys(self) -> Dict[str, Optional[str]]:
+        keys: Dict[str, Optional[str]] = {}
+
+        def key(node: str) -> Optional[str]:
+            if node not in keys:
+                dep_keys = [key(dep) for dep in self._depends_on[node]]
+                if node in self._shared:
+                    keys[node] = hash_payload(["shared", self.version, node, self._inputs[node]])
+                elif node in self._inputs and None not in dep_keys:
+                    keys[node] = hash_payload([self.version, node, _freeze_inputs(self._inputs[node]), dep_keys])
+                else:
+                    keys[node] = None
+            return keys[node]
+
+        for node in self._runners:
+            key(node)
+        return keys
+
+    def _cached_values(self, keys: Dict[str, Optional[str]], names: Iterable[str]) -> Dict[str, Any]:
+        hits: Dict[str, Any] = {}
+        if not self.use_cache:
+            return hits
+        for name in names:
+            key = keys[name]
+            if key is not None and name not in self._refresh:
+                entry = get_cached_shared_section(key) if name in self._shared else get_cached_section(key)
+                if entry is not None:
+                    hits[name] = _thaw(entry)
+        return hits
+
+    def peek(self, names: Iterable[str]) -> Dict[str, Any]:
+        """Values of the given nodes that are already cached, without running anything."""
+        self._check_graph()
+        return self._cached_values(self._cache_keys(), names)
+
+    async def as_completed(self, targets: Optional[Iterable[str]] = None) -> AsyncIterator[SectionResult]:
+        """Yields each needed node's SectionResult as soon as that node finishes.
+
+        By default every output (node nothing depends on) is produced; pass
+        `targets` to run only those nodes and what they need.
+        """
+        self._check_graph()
+        keys = self._cache_keys()
+        hits = self._cached_values(keys, self._runners)
+
+        # Sinks are the plan's outputs; intermediates only run for an uncached dependant.
+        dependants = {dep for deps in self._depends_on.values() for dep in deps}
+        needed = set()
+        stack = list(targets) if targets is not None else [name for name in self._runners if name not in dependants]
+        while stack:
+            node = stack.pop()
+            if node in needed:
+                continue
+            needed.add(node)
+            if node not in hits:
+                stack.extend(self._depends_on[node])
+
+        loop = asyncio.get_running_loop()
+        run_started = loop.time()
+        futures: Dict[str, asyncio.Future] = {name: loop.create_future() for name in needed}
+        finished: asyncio.Queue = asyncio.Queue()
+
+        # Whether a node's value is real output (not a default) built only from
+        # real output; anything else must not be cached.
+        clean: Dict[str, bool] = {}
+
+        async def run_node(name: str) -> None:
+            if name in hits:
+                clean[name] = True
+                result = SectionResult(name, hits[name], cached=True)
+                logger.info(f"ORCHESTRATOR: Section '{name}' served from cache.")
+                futures[name].set_result(result)
+                finished.put_nowait(result)
+                return
+            dep_values = {}
+            timed_out = False
+            for dep in self._depends_on[name]:
+                dep_result = await futures[dep]
+                dep_values[dep] = dep_result.value
+                timed_out = timed_out or dep_result.timed_out
+            start = time.perf_counter()
+            error = None
+            timeout = None
+            if self.deadline is not None:
+                timeout = run_started + self.deadline * self._budget_shares[name] - loop.time()
+            try:
+                if keys[name] is not None:
+                    # Identical work already running (a concurrent request or a
+                    # speculative pre-generation) is joined rather than repeated.
+                    work = single_flight.group("sections").do(keys[name], lambda: self._runners[name](dep_values))
+                else:
+                    work = self._runners[name](dep_values)
+                if timeout is not None and timeout <= 0:
+                    work.close()
+                    raise asyncio.TimeoutError()
+                value = await asyncio.wait_for(work, timeout)
+            except asyncio.TimeoutError as e:
+                logger.warning(f"ORCHESTRATOR: Section '{name}' missed its {max(timeout or 0, 0):.1f}s budget, using placeholder.")
+                value, error, timed_out = None, e, True
+            except Exception as e:
+                logger.error(f"ORCHESTRATOR: Section '{name}' failed, using default: {e}", exc_info=True)
+                value, error = None, e
+            default = self._defaults[name]()
+            if value is None:
+                value = default
+            # Empty results (often a builder that swallowed an error) are not
+            # cached, so the next request tries again.
+            clean[name] = value != default and all(clean[dep] for dep in self._depends_on[name])
+            if clean[name] and keys[name] is not None:
+                (set_cached_shared_section if name in self._shared else set_cached_section)(keys[name], _freeze(value))
+            result = SectionResult(name, value, error=error, elapsed=time.perf_counter() - start, timed_out=timed_out)
+            logger.info(f"ORCHESTRATOR: Section '{name}' finished in {result.elapsed:.2f}s (ok={result.ok}).")
+            futures[name].set_result(result)
+            finished.put_nowait(result)
+
+        tasks = [asyncio.create_task(run_node(name), name=f"section:{name}") for name in self._runners if name in needed]
+        try:
+            for _ in range(len(tasks)):
+                yield await finished.get()
+        finally:
+            # The consumer stopped early (or was cancelled, e.g. its client
+            # disconnected): nothing else will read these sections.
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def run(self, targets: Optional[Iterable[str]] = None) -> Dict[str, SectionResult]:
+        """Runs the plan (see `as_completed`) and returns all results once the last one lands."""
+        results: Dict[str, SectionResult] = {}
+        async for result in self.as_completed(targets):
+            results[result.name] = result
+        return results
+
+
+async def _call_openai_api_with_retry(messages: list, section: str, max_tokens: int = 3000, temperature: float = 0.2,
+                                      hedge_key: Optional[str] = None, response_model: Optional[Type[BaseModel]] = None):
+    """JSON-mode chat call on the model routed for `section` (see model_router),
+    escalating to a stronger model when the output does not parse (as
+    `response_model`, when given, which also sets the response schema; see
+    structured_output).
+    Transient failures are retried by llm_gateway's retry policy; once that
+    gives up (or the circuit is open) the error propagates so the orchestrator
+    marks the section failed. Returns None if the model answers empty.
+    `hedge_key` opts the call into hedging (see llm_hedging)."""
+    formatted_messages = llm_gateway.format_messages(messages)
+    try:
+        response = await model_router.chat_completion(
+            section,
+            response_model=response_model,
+            validate=None if response_model else partial(structured_output.loads, section),
+            messages=formatted_messages,
+            response_format={"type": "json_object"},
+            temperature=temperature,
+            max_tokens=max_tokens,
+            hedge_key=hedge_key
+        )
+    except Exception as e:
+        logging.error(f"Failed to get response from OpenAI API ({section}, {llm_retry.classify_error(e)}): {e}")
+        raise
+
+    response_content = response.choices[0].message.content
+    if not response_content:
+        logging.warning("OpenAI API returned empty content.")
+        return None
+    logging.debug(f"OpenAI API call successful. Response sample: {response_content[:500]}...")
+    return response_content
+
+
+# --- Interview Prep v2 guide plan ---
+
+def _meaningful_resume_content(resume_model: Optional[ResumeStructured]) -> str:
+    parts = []
+    if resume_model and resume_model.positions:
+        for pos in resume_model.positions:
+            if pos.description:
+                parts.append(pos.description)
+    return "\n\n".join(parts)
+
+
+def build_prompt_b(
+    resume_model: Optional[ResumeStructured],
+    jd_model: Optional[JobDescriptionStructured],
+    company_name: Optional[str] = None,
+    industry: Optional[str] = None,
+    job_description: Optional[str] = None,
+    raw_resume_text: Optional[str] = None,
+    budget: Optional[int] = None,
+) -> Tuple[str, Dict[str, Any]]:
+    """User message for call B: compact structured inputs, supplementary text
+    de-duplicated against them, trimmed to PROMPT_B_INPUT_TOKEN_BUDGET."""
+    jd_texts = text_values(jd_model) if jd_model else []
+    resume_texts = text_values(resume_model) if resume_model else []
+    fields = {
+        "jd_role_title": PromptField(jd_model.role_title if jd_model and jd_model.role_title else "the role", priority=100),
+        "company_name": PromptField(company_name or "the company", priority=100),
+        "industry": PromptField(industry or "the relevant industry", priority=100),
+        "jd_structured_json": PromptField(compact_json(jd_model), priority=90),
+        "resume_structured_json": PromptField(compact_json(resume_model), priority=80, min_tokens=1000),
+        "role_success_factors": PromptField("{}", priority=100),
+        # Requirements are already listed in the structured JD.
+        "jd_requirements": PromptField(
+            "(see structured JD)" if jd_model and jd_model.requirements else "", priority=100
+        ),
+        "jd_summary": PromptField(dedupe_text((job_description or "")[:1000], jd_texts), priority=30, min_tokens=0),
+        "resume_raw_text_snippet": PromptField(dedupe_text((raw_resume_text or "")[:3000], resume_texts), priority=10, min_tokens=0),
+    }
+    baseline = {
+        "jd_role_title": fields["jd_role_title"].text,
+        "company_name": fields["company_name"].text,
+        "industry": fields["industry"].text,
+        "jd_structured_json": jd_model.model_dump_json(indent=2) if jd_model else "{}",
+        "resume_structured_json": resume_model.model_dump_json(indent=2) if resume_model else "{}",
+        "role_success_factors": "{}",
+        "jd_summary": job_description[:1000] if job_description else "",
+        "jd_requirements": ", ".join(jd_model.requirements) if jd_model and jd_model.requirements else "",
+        "resume_raw_text_snippet": raw_resume_text[:3000] if raw_resume_text else "",
+    }
+    return fit_prompt(
+        "prompt_b",
+        INTERVIEW_PREP_V2_USER_PROMPT_TEMPLATE_B_CANDIDATE_ROLE,
+        fields,
+        budget=budget or PROMPT_B_INPUT_TOKEN_BUDGET,
+        model=PROMPT_B_MODEL,
+        baseline_params=baseline,
+        system_tokens=prompt_registry.get("prompt_b").tokens,
+    )
+
+
+def build_interview_prep_plan(
+    resume_model: Optional[ResumeStructured],
+    jd_model: Optional[JobDescriptionStructured],
+    company_name: Optional[str] = None,
+    industry: Optional[str] = None,
+    job_description: Optional[str] = None,
+    raw_resume_text: Optional[str] = None,
+    use_cache: bool = True,
+    deadline_seconds: Optional[float] = None,
+    lazy_sections: bool = False,
+) -> SectionOrchestrator:
+    """
+    Registers every guide section with its dependencies and cache inputs.
+
+    The pre-built sections and LLM calls B and C are independent and all start
+    at once; sections 3, 6 and 9 are cheap post-processing steps that wait on
+    the call B output (and the pre-built section 3 fallback). Each node's
+    `inputs` must list exactly what its runner reads, as they form its cache key.
+    Nodes that call an LLM get LLM_SECTION_BUDGET_SHARE of `deadline_seconds`.
+    With `lazy_sections`, section 6 comes from the dedicated technical case
+    prep builder instead of call B; callers are expected to run the plan with
+    `targets` so LAZY_SECTION_NAMES only run when asked for.
+    """
+    plan = SectionOrchestrator(version=GUIDE_CACHE_VERSION, use_cache=use_cache, deadline=deadline_seconds)
+    llm_share = LLM_SECTION_BUDGET_SHARE
+    resume_content = _meaningful_resume_content(resume_model)
+
+    # --- Section 1: Company & Industry Insights ---
+    # The profile and the news are separate nodes so a failed news fetch
+    # raises (and isn't cached) without losing the profile.
+    async def company_profile(_deps: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if not (company_name and jd_model and job_description):
+            logger.warning("ORCHESTRATOR: Skipping company_industry_section due to missing company_name, jd_model, or job_description.")
+            return None
+        return await build_profile_sections(company_name, jd_model.model_dump(), job_description)
+
+    async def company_news(_deps: Dict[str, Any]) -> Optional[List[Dict[str, str]]]:
+        if not (company_name and jd_model and job_description):
+            return None
+        return await fetch_company_news(company_name, max_articles=5)
+
+    async def company_industry(deps: Dict[str, Any]) -> Optional[CompanyIndustrySectionModel]:
+        if not deps["company_profile"]:
+            return None
+        return build_company_industry_section(deps["company_profile"], deps["company_news"])
+
+    # --- Section 3 (pre-built): Role Success Factors ---
+    async def role_success_prebuilt(_deps: Dict[str, Any]) -> Optional[RoleSuccessFactorsSection]:
+        if not (jd_model and resume_content):
+            logger.warning("ORCHESTRATOR: Skipping role_success_section due to missing jd_model or resume_content.")
+            return None
+        return await build_role_success_section(jd_structured=jd_model, resume_bullets=resume_content)
+
+    # --- Section 4: Role Understanding & Fit Assessment ---
+    async def role_understanding_fit(_deps: Dict[str, Any]) -> Optional[RoleUnderstandingFitAssessmentSectionModel]:
+        if not (jd_model and resume_content):
+            logger.warning("ORCHESTRATOR: Skipping role_understanding_fit_assessment_section due to missing jd_model or resume_content.")
+            return None
+        return await build_role_understanding_fit_assessment_section(jd_structured=jd_model, resume_bullets=resume_content)
+
+    # --- Section 5: STAR Story Bank ---
+    async def star_story_bank(_deps: Dict[str, Any]) -> Optional[StarStoryBankSectionModel]:
+        if not (resume_model and jd_model):
+            logger.warning("ORCHESTRATOR: Skipping star_story_bank_section due to missing resume_model or jd_model.")
+            return None
+        return await build_star_story_bank_section(resume_structured=resume_model.model_dump(), jd_structured=jd_model.model_dump())
+
+    # --- LLM Call B: candidate/role sections (3, 6, 9) ---
+    async def llm_call_b(_deps: Dict[str, Any]) -> Dict[str, Any]:
+        # Section 3 is pre-built concurrently rather than fed into prompt B, so
+        # call B does not have to wait on it.
+        user_prompt_b, _ = build_prompt_b(
+            resume_model, jd_model, company_name, industry, job_description, raw_resume_text
+        )
+        logger.debug(f"LLM Call B - User Prompt: {user_prompt_b}")
+        messages_b = [
+            SystemMessage(content=prompt_registry.get("prompt_b").text),
+            HumanMessage(content=user_prompt_b)
+        ]
+        llm_output_b = await _call_openai_api_with_retry(messages=messages_b, section="prompt_b", max_tokens=4000, hedge_key="prompt_b")
+        if not llm_output_b:
+            raise ValueError("LLM Call B returned no content.")
+        logger.info(f"LLM Call B raw content: {llm_output_b}")
+        return structured_output.loads("prompt_b", llm_output_b, record=False)
+
+    # --- Section 3: Role Success Factors (call B, falling back to pre-built) ---
+    async def role_success(deps: Dict[str, Any]) -> RoleSuccessFactorsSection:
+        llm_b_parsed_data = deps["llm_call_b"]
+        prebuilt = deps["role_success_prebuilt"]
+        prebuilt_has_content = bool(prebuilt and (prebuilt.must_haves or prebuilt.nice_to_haves))
+        final = RoleSuccessFactorsSection()
+        if llm_b_parsed_data.get('role_success_factors'):
+            try:
+                final = RoleSuccessFactorsSection(**llm_b_parsed_data['role_success_factors'])
+            except Exception as e_rs_llm:
+                logger.error(f"ORCHESTRATOR: Error populating RoleSuccessFactorsSection from LLM B data: {e_rs_llm}", exc_info=True)
+                if prebuilt_has_content:
+                    final = prebuilt
+        elif prebuilt_has_content:
+            final = prebuilt
+        else:
+            logger.warning("ORCHESTRATOR: role_success_factors not found in LLM B and pre-built role_success_output is empty. Using default.")
+        if final.must_haves or final.nice_to_haves:
+            return RoleSuccessFactorsSection(must_haves=final.must_haves, nice_to_haves=final.nice_to_haves)
+        return RoleSuccessFactorsSection()
+
+    # --- Section 6: Technical Case Prep (from call B) ---
+    async def technical_case_prep(deps: Dict[str, Any]) -> Optional[TechnicalCasePrepSectionModel]:
+        section_6_data = deps["llm_call_b"].get('section_6_technical_case_prep')
+        if not section_6_data:
+            logger.warning("LLM B response missing or empty 'section_6_technical_case_prep'. Using default.")
+            return None
+        section_6_data = dict(section_6_data)
+        # The LLM is instructed to provide structured prompts under 'practice_prompts';
+        # they map directly onto TechnicalCasePrepSectionModel.prompts.
+        if 'practice_prompts' in section_6_data:
+            section_6_data['prompts'] = section_6_data.pop('practice_prompts')
+        elif 'prompts' not in section_6_data:
+            section_6_data['prompts'] = []
+        return TechnicalCasePrepSectionModel(**section_6_data)
+
+    # --- Section 9: Questions to Ask (from call B) ---
+    async def questions_to_ask(deps: Dict[str, Any]) -> Optional[QuestionsToAskSectionModel]:
+        section_9_data = deps["llm_call_b"].get('section_9_questions_to_ask')
+        if not section_9_data:
+            logger.warning("LLM B response missing 'section_9_questions_to_ask' or it's empty. Using default QuestionsToAskSectionModel.")
+            return None
+        return QuestionsToAskSectionModel(**section_9_data)
+
+    # --- Section 6 (lazy): dedicated Technical Case Prep builder ---
+    async def technical_case_prep_full(_deps: Dict[str, Any]) -> Optional[TechnicalCasePrepSectionModel]:
+        if not jd_model:
+            logger.warning("ORCHESTRATOR: Skipping technical_case_prep_section due to missing jd_model.")
+            return None
+        return await build_technical_case_prep_section(jd_structured=jd_model)
+
+    # --- LLM Call C: Insider Cheat Sheet ---
+    async def insider_cheat_sheet(_deps: Dict[str, Any]) -> Optional[InsiderCheatSheetSectionModel]:
+        role_title_for_c = jd_model.role_title if jd_model and jd_model.role_title else None
+        if not role_title_for_c:
+            logger.warning("Role title for Call C is missing, Insider Cheat Sheet might be generic.")
+            role_title_for_c = "the specified role"
+        user_message_c = HumanMessage(content=(
+            f"Company Name: {company_name}\n"
+            f"Role Title: {role_title_for_c}\n"
+            f"Industry: {industry if industry else 'Not specified'}"
+        ))
+        system_message_c = SystemMessage(content=prompt_registry.get("prompt_c").text)
+        response_c_json_str = await _call_openai_api_with_retry(
+            messages=[system_message_c, user_message_c],
+            section="prompt_c",
+            temperature=0.0,
+            hedge_key="prompt_c",
+            response_model=InsiderCheatSheetSectionModel
+        )
+        if not response_c_json_str:
+            raise ValueError("LLM Call C returned no content.")
+        logger.info(f"LLM Call C successful. Response: {response_c_json_str[:500]}...")
+        return structured_output.parse("prompt_c", response_c_json_str, InsiderCheatSheetSectionModel, record=False)
+
+    role_title = jd_model.role_title if jd_model else None
+    # The company profile, its news and section 8 only depend on the
+    # company/role/industry, so they are shared across every candidate
+    # targeting the same employer.
+    plan.add("company_profile", company_profile, default=dict, shared=True, budget_share=llm_share,
+             inputs={"company_name": company_name, "role_title": role_title or (job_description or "")[:40]})
+    plan.add("company_news", company_news, default=list, shared=True, budget_share=llm_share,
+             inputs={"company_name": company_name})
+    plan.add("section_1_company_industry", company_industry, depends_on=["company_profile", "company_news"],
+             default=CompanyIndustrySectionModel, inputs={})
+    plan.add("role_success_prebuilt", role_success_prebuilt, default=RoleSuccessFactorsSection, budget_share=llm_share,
+             inputs={"jd": jd_model, "resume_content": resume_content})
+    plan.add("section_4_role_understanding_fit_assessment", role_understanding_fit, default=RoleUnderstandingFitAssessmentSectionModel, budget_share=llm_share,
+             inputs={"jd": jd_model, "resume_content": resume_content})
+    plan.add("section_5_star_story_bank", star_story_bank, default=StarStoryBankSectionModel, budget_share=llm_share,
+             inputs={"resume": resume_model, "jd": jd_model})
+    plan.add("llm_call_b", llm_call_b, default=dict, budget_share=llm_share,
+             inputs={"resume": resume_model, "jd": jd_model, "company_name": company_name, "industry": industry,
+                     "job_description": job_description, "raw_resume_text": raw_resume_text})
+    plan.add("section_8_insider_cheat_sheet", insider_cheat_sheet, default=InsiderCheatSheetSectionModel, shared=True, budget_share=llm_share,
+             inputs={"company_name": company_name, "role_title": role_title, "industry": industry})
+    plan.add("section_3_role_success", role_success, depends_on=["role_success_prebuilt", "llm_call_b"], default=RoleSuccessFactorsSection, inputs={})
+    if lazy_sections:
+        # The dedicated builder only reads the posting, so its output is
+        # shared across every candidate targeting the same role.
+        plan.add("section_6_technical_case_prep", technical_case_prep_full, default=TechnicalCasePrepSectionModel, shared=True,
+                 budget_share=llm_share,
+                 inputs={"role_title": role_title, "responsibilities": jd_model.responsibilities if jd_model else None,
+                         "requirements": jd_model.requirements if jd_model else None})
+    else:
+        plan.add("section_6_technical_case_prep", technical_case_prep, depends_on=["llm_call_b"], default=TechnicalCasePrepSectionModel, inputs={})
+    plan.add("section_9_questions_to_ask", questions_to_ask, depends_on=["llm_call_b"], default=QuestionsToAskSectionModel, inputs={})
+    return plan
+
+
+def assemble_interview_prep_guide(
+    sections: Dict[str, Any],
+    resume_model: Optional[ResumeStructured],
+    jd_model: Optional[JobDescriptionStructured],
+    timed_out_sections: Iterable[str] = (),
+    section_states: Optional[Dict[str, str]] = None,
+) -> InterviewPrepV2Guide:
+    """Builds the final guide from section values keyed by GUIDE_SECTION_NAMES.
+
+    With `section_states` the result is a skeleton: sections without a value
+    are left empty rather than filled with defaults.
+    """
+    guide = InterviewPrepV2Guide(
+        section_0_welcome=WelcomeSectionModel(
+            title="Welcome to Your AI-Powered Interview Prep!",
+            introduction="This guide is designed to help you ace your interview. Let's get started."
+        ),
+        section_1_company_industry=sections.get("section_1_company_industry") or CompanyIndustrySectionModel(),
+        section_3_role_success=sections.get("section_3_role_success") or RoleSuccessFactorsSection(),
+        section_4_role_understanding_fit_assessment=sections.get("section_4_role_understanding_fit_assessment") or RoleUnderstandingFitAssessmentSectionModel(),
+        section_5_star_story_bank=sections.get("section_5_star_story_bank") or StarStoryBankSectionModel(),
+        section_6_technical_case_prep=sections.get("section_6_technical_case_prep") or TechnicalCasePrepSectionModel(),
+        section_8_insider_cheat_sheet=sections.get("section_8_insider_cheat_sheet") or InsiderCheatSheetSectionModel(),
+        section_9_questions_to_ask=sections.get("section_9_questions_to_ask") or QuestionsToAskSectionModel(),
+        export_share=ExportShareSectionModel(
+            export_options=["PDF", "Markdown"],
+            share_platforms=["Email", "LinkedIn"],
+            shareable_link="(Coming Soon!)"
+        ),
+        resume_structured=resume_model,
+        job_description_structured=jd_model,
+        timed_out_sections=[name for name in GUIDE_SECTION_NAMES if name in set(timed_out_sections)]
+    )
+    if section_states is not None:
+        for name in GUIDE_SECTION_NAMES:
+            if sections.get(name) is None:
+                setattr(guide, name, None)
+        guide.section_states = {name: section_states[name] for name in GUIDE_SECTION_NAMES if name in section_states}
+    return guide
@@ -0,0 +1,282 @@
+"""
+job_queue.py
+
+Durable background jobs for long-running generation.
+
+`JobQueue` is a small SQLite-backed queue: jobs survive process restarts and
+the database can be shared by several processes on the same host (WAL mode,
+claims taken under `BEGIN IMMEDIATE`). A claimed job is leased for
+`visibility_timeout` seconds; a worker that dies mid-job simply stops renewing
+the lease and the job becomes claimable again once it lapses. Failed attempts
+are retried with full-jitter backoff until `max_attempts` is reached.
+
+`WorkerPool` runs N asyncio workers that claim jobs, dispatch them to the
+handler registered for their `kind`, renew the lease while the handler runs
+and record the JSON result. On shutdown, in-flight jobs are released back to
+the queue without consuming an attempt, so a deploy mid-generation only
+delays the job.
+"""
+import asyncio
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUE_PATH = os.getenv("JOB_QUEUE_PATH", "interview_jobs.sqlite3")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_VISIBILITY_TIMEOUT_SECONDS = float(os.getenv("JOB_VISIBILITY_TIMEOUT_SECONDS", "300"))
+JOB_POLL_INTERVAL_SECONDS = float(os.getenv("JOB_POLL_INTERVAL_SECONDS", "0.5"))
+JOB_RETRY_BASE_DELAY_SECONDS = float(os.getenv("JOB_RETRY_BASE_DELAY_SECONDS", "2"))
+JOB_RETENTION_SECONDS = float(os.getenv("JOB_RETENTION_SECONDS", str(7 * 24 * 3600)))
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = "queued", "running", "succeeded", "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    visible_at REAL NOT NULL,
+    lease_owner TEXT,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_claimable ON jobs (status, visible_at);
+"""
+
+Handler = Callable[[Dict[str, Any]], Awaitable[str]]
+
+
+class JobQueue:
+    """SQLite-backed job queue. All methods are blocking; call them from a thread."""
+
+    def __init__(self, path: str = JOB_QUEUE_PATH):
+        self.path = path
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _transaction(self):
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def enqueue(self, kind: str, payload: Dict[str, Any], max_attempts: int = JOB_MAX_ATTEMPTS) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, payload, status, max_attempts, visible_at, created_at, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, json.dumps(payload), QUEUED, max_attempts, now, now, now),
+            )
+        return job_id
+
+    def claim(self, worker_id: str, visibility_timeout: float = JOB_VISIBILITY_TIMEOUT_SECONDS) -> Optional[Dict[str, Any]]:
+        """Leases the oldest visible job: a queued one, or a running one whose lease lapsed."""
+        now = time.time()
+        with self._transaction() as conn:
+            while True:
+                row = conn.execute(
+                    "SELECT * FROM jobs WHERE status IN (?, ?) AND visible_at <= ? ORDER BY visible_at LIMIT 1",
+                    (QUEUED, RUNNING, now),
+                ).fetchone()
+                if row is None:
+                    return None
+                if row["attempts"] >= row["max_attempts"]:
+                    # Only reachable for a running job whose worker vanished on its last attempt.
+                    conn.execute(
+                        "UPDATE jobs SET status = ?, error = ?, lease_owner = NULL, updated_at = ? WHERE id = ?",
+                        (FAILED, "Visibility timeout expired on the final attempt.", now, row["id"]),
+                    )
+                    continue
+                conn.execute(
+                    "UPDATE jobs SET status = ?, attempts = attempts + 1, visible_at = ?, lease_owner = ?, updated_at = ?"
+                    " WHERE id = ?",
+                    (RUNNING, now + visibility_timeout, worker_id, now, row["id"]),
+                )
+                job = dict(row)
+                job["attempts"] += 1
+                job["payload"] = json.loads(job["payload"])
+                return job
+
+    def _update_leased(self, job_id: str, worker_id: str, sql: str, params: tuple) -> bool:
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                f"UPDATE jobs SET {sql}, updated_at = ? WHERE id = ? AND lease_owner = ? AND status = ?",
+                (*params, time.time(), job_id, worker_id, RUNNING),
+            )
+            return cursor.rowcount == 1
+
+    def extend(self, job_id: str, worker_id: str, visibility_timeout: float = JOB_VISIBILITY_TIMEOUT_SECONDS) -> bool:
+        """Renews a lease. False means the lease was lost and another worker may own the job."""
+        return self._update_leased(job_id, worker_id, "visible_at = ?", (time.time() + visibility_timeout,))
+
+    def complete(self, job_id: str, worker_id: str, result: str) -> bool:
+        return self._update_leased(
+            job_id, worker_id, "status = ?, result = ?, error = NULL, lease_owner = NULL", (SUCCEEDED, result)
+        )
+
+    def fail(self, job_id: str, worker_id: str, error: str, retry_delay: float) -> bool:
+        """Requeues the job after `retry_delay`, or marks it failed once its attempts are used up."""
+        return self._update_leased(
+            job_id,
+            worker_id,
+            "status = CASE WHEN attempts >= max_attempts THEN ? ELSE ? END, visible_at = ?, error = ?, lease_owner = NULL",
+            (FAILED, QUEUED, time.time() + retry_delay, error),
+        )
+
+    def release(self, job_id: str, worker_id: str) -> bool:
+        """Returns a leased job to the queue without counting the attempt (used on shutdown)."""
+        return self._update_leased(
+            job_id, worker_id, "status = ?, attempts = attempts - 1, visible_at = ?, lease_owner = NULL", (QUEUED, time.time())
+        )
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def purge(self, older_than_seconds: float = JOB_RETENTION_SECONDS) -> int:
+        """Deletes finished jobs last updated more than `older_than_seconds` ago."""
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?",
+                (SUCCEEDED, FAILED, time.time() - older_than_seconds),
+            )
+            return cursor.rowcount
+
+    def counts(self) -> Dict[str, int]:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+
+def retry_delay(attempt: int, base_delay: float = JOB_RETRY_BASE_DELAY_SECONDS, max_delay: float = 300.0) -> float:
+    """Full-jitter exponential backoff before the job's next attempt."""
+    return random.uniform(0, min(max_delay, base_delay * (2 ** (attempt - 1))))
+
+
+class WorkerPool:
+    """`concurrency` asyncio workers draining `queue` into `handlers` (keyed by job kind)."""
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        handlers: Dict[str, Handler],
+        concurrency: int = JOB_WORKERS,
+        visibility_timeout: float = JOB_VISIBILITY_TIMEOUT_SECONDS,
+        poll_interval: float = JOB_POLL_INTERVAL_SECONDS,
+    ):
+        self.queue = queue
+        self.handlers = handlers
+        self.concurrency = concurrency
+        self.visibility_timeout = visibility_timeout
+        self.poll_interval = poll_interval
+        self._workers = []
+        self._lock = threading.Lock()
+        self._stats = {"claimed": 0, "succeeded": 0, "retried": 0, "failed": 0, "released": 0, "lease_lost": 0}
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self._stats[key] += 1
+
+    async def start(self) -> None:
+        purged = await asyncio.to_thread(self.queue.purge)
+        if purged:
+            logger.info(f"JOBS: Purged {purged} finished jobs past retention.")
+        prefix = uuid.uuid4().hex[:8]
+        self._workers = [
+            asyncio.create_task(self._worker(f"{prefix}-{i}"), name=f"job-worker-{i}") for i in range(self.concurrency)
+        ]
+        logger.info(f"JOBS: Started {self.concurrency} workers on {self.queue.path}.")
+
+    async def stop(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def _worker(self, worker_id: str) -> None:
+        while True:
+            try:
+                job = await asyncio.to_thread(self.queue.claim, worker_id, self.visibility_timeout)
+            except sqlite3.Error as e:
+                logger.error(f"JOBS: Worker {worker_id} could not claim a job: {e}")
+                job = None
+            if job is None:
+                await asyncio.sleep(self.poll_interval)
+                continue
+            self._count("claimed")
+            await self._run(worker_id, job)
+
+    async def _keep_leased(self, worker_id: str, job_id: str) -> None:
+        while True:
+            await asyncio.sleep(self.visibility_timeout / 3)
+            if not await asyncio.to_thread(self.queue.extend, job_id, worker_id, self.visibility_timeout):
+                self._count("lease_lost")
+                logger.warning(f"JOBS: Worker {worker_id} lost the lease on job {job_id}.")
+                return
+
+    async def _run(self, worker_id: str, job: Dict[str, Any]) -> None:
+        job_id, kind = job["id"], job["kind"]
+        handler = self.handlers.get(kind)
+        if handler is None:
+            await asyncio.to_thread(self.queue.fail, job_id, worker_id, f"No handler for job kind '{kind}'.", 0)
+            self._count("failed")
+            return
+        heartbeat = asyncio.create_task(self._keep_leased(worker_id, job_id))
+        start = time.perf_counter()
+        try:
+            result = await handler(job["payload"])
+        except asyncio.CancelledError:
+            # Shutdown: hand the job back so another worker or the next deploy picks it up.
+            await asyncio.shield(asyncio.to_thread(self.queue.release, job_id, worker_id))
+            self._count("released")
+            raise
+        except Exception as e:
+            logger.error(f"JOBS: Job {job_id} ({kind}) attempt {job['attempts']}/{job['max_attempts']} failed: {e}", exc_info=True)
+            delay = retry_delay(job["attempts"])
+            await asyncio.to_thread(self.queue.fail, job_id, worker_id, str(e), delay)
+            self._count("retried" if job["attempts"] < job["max_attempts"] else "failed")
+        else:
+            await asyncio.to_thread(self.queue.complete, job_id, worker_id, result)
+            self._count("succeeded")
+            logger.info(f"JOBS: Job {job_id} ({kind}) succeeded in {time.perf_counter() - start:.2f}s.")
+        finally:
+            heartbeat.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            data = dict(self._stats)
+        data["workers"] = len(self._workers)
+        return data
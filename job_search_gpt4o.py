@@ -8,6 +8,8 @@ import re
 from typing import List, Dict, Any, Optional
 from dotenv import load_dotenv
 from pydantic import BaseModel, ValidationError
+import llm_gateway
+import structured_output
 
 load_dotenv()
 
@@ -128,9 +130,6 @@ async def search_jobs_gpt4o(resume_text: str, preferences: Dict[str, Any], api_k
     validate_prompt(resume_text)
 
     try:
-        import openai
-        client = openai.OpenAI(api_key=api_key)
-
         # Format the preferences dictionary into a string
         pref_string = ", ".join([f"{k}: {v}" for k, v in preferences.items() if v])
         if not pref_string: # Handle case where preferences might be empty after filtering
@@ -147,8 +146,8 @@ async def search_jobs_gpt4o(resume_text: str, preferences: Dict[str, Any], api_k
 
         logging.debug(f"--- Sending Prompt to GPT-4o ---\n{formatted_prompt}\n-----------------------------")
 
-        # Revert to using client.responses.create which handles the web_search tool type correctly
-        response = client.responses.create(
+        # Use responses.create (via the gateway) which handles the web_search tool type correctly
+        response = await llm_gateway.responses_create(
             model="gpt-4o",
             input=formatted_prompt, # Use formatted prompt as input
             tools=[{"type": "web_search_preview"}],
@@ -178,13 +177,9 @@ async def search_jobs_gpt4o(resume_text: str, preferences: Dict[str, Any], api_k
             logging.warning("[GPT-4o EMPTY RESPONSE] %r", content)
             return {"error": "OpenAI returned an empty response.", "raw": content}
 
-        # Re-add JSON cleaning for potential markdown markers
-        import re
-        import json
-        content = re.sub(r"^```json\n|\n```$", "", content.strip(), flags=re.MULTILINE)
-
         try:
-            jobs = json.loads(content)
+            # Handles markdown code fences and truncated output
+            jobs = structured_output.loads("job_search_gpt4o", content)
             # Check if the result is a dictionary with a key (like sometimes happens)
             # and extract the list if necessary.
             if isinstance(jobs, dict):
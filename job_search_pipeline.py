@@ -2,8 +2,8 @@ import os
 import json
 import logging
 # import requests  # No longer used in this module, replaced by httpx.
-from serpapi import GoogleSearch
-from openai import AsyncOpenAI
+from serpapi_async import DEFAULT_SERPAPI_BASE_URL, SERPAPI_BASE_URL, SERPAPI_URL, fetch_serpapi_jobs, google_search, serpapi_get_json
+import llm_gateway
 from dotenv import load_dotenv
 from pydantic import BaseModel, Field, ValidationError
 from typing import List, Optional, Dict, Any
@@ -67,8 +67,6 @@ async def rank_jobs_with_gpt4o(job_results: List[Dict[str, Any]], resume_text: s
         logger.warning("No job results provided to rank_jobs_with_gpt4o.")
         return []
 
-    client = AsyncOpenAI(api_key=OPENAI_API_KEY)
-
     # Prepare job data for the prompt (limit fields for clarity/token count)
     simplified_jobs = []
     def best_link(job: dict) -> str:
@@ -144,7 +142,7 @@ async def rank_jobs_with_gpt4o(job_results: List[Dict[str, Any]], resume_text: s
 
     try:
         logger.info(f"Sending {len(simplified_jobs)} jobs to GPT-4o for ranking.")
-        response = await client.chat.completions.create(
+        response = await llm_gateway.chat_completion(
             model="gpt-4o", # Using gpt-4o as per memory
             messages=[
                 {"role": "system", "content": system_prompt},
@@ -194,13 +192,13 @@ async def rank_jobs_with_gpt4o(job_results: List[Dict[str, Any]], resume_text: s
 
 # --- SerpAPI Function ---
 async def search_serpapi_google_jobs(preferences: JobSearchPreferences) -> List[dict]:
-    # TEMPORARY: Return empty list to bypass SerpAPI calls during testing due to API limits.
-    logger.warning("SerpAPI call is temporarily bypassed in search_serpapi_google_jobs. Returning empty list.")
-    return []
-
-    # Original code below, commented out for now:
-    # 
     """Queries SerpAPI Google Jobs endpoint with detailed preferences."""
+    # TEMPORARY: bypass the live API during testing due to API limits. A local
+    # stand-in (SERPAPI_BASE_URL, see benchmarks/fake_serpapi.py) is still queried.
+    if SERPAPI_BASE_URL == DEFAULT_SERPAPI_BASE_URL:
+        logger.warning("SerpAPI call is temporarily bypassed in search_serpapi_google_jobs. Returning empty list.")
+        return []
+
     if not SERPAPI_API_KEY:
         logger.error("SERPAPI_API_KEY not configured.")
         return []
@@ -254,7 +252,7 @@ async def search_serpapi_google_jobs(preferences: JobSearchPreferences) -> List[
 
     try:
         logger.info(f"Querying SerpAPI with params: {query_params}")
-        search = GoogleSearch(query_params)
+        search = google_search(query_params)
         results = search.get_dict()
 
         if "error" in results:
@@ -284,7 +282,6 @@ async def search_serpapi_google_jobs(preferences: JobSearchPreferences) -> List[
         return []
 
 # --- Main Pipeline Function ---
-from serpapi_async import fetch_serpapi_jobs
 
 async def search_jobs_serpapi_gpt(resume_text: str, preferences: JobSearchPreferences, next_page_token: Optional[str] = None, buffer: Optional[list] = None) -> dict:
     """
@@ -294,8 +291,6 @@ async def search_jobs_serpapi_gpt(resume_text: str, preferences: JobSearchPrefer
     # 1. Fetch and filter jobs via new async fetcher
     jobs, token = await fetch_serpapi_jobs(preferences, next_page_token, want=15)
 
-    # 2. Rank jobs with GPT-4o
-    ranked_jobs = await rank_jobs_with_gpt4o(jobs, resume_text, preferences.dict())
     # Use results from fetch_serpapi_jobs directly
     all_jobs = jobs if jobs else []
     # token and has_more already set from fetch_serpapi_jobs
@@ -408,11 +403,9 @@ async def query_serpapi_google_jobs(
                     "num": 1, # Only need 1 result to get filters
                 }
                 try:
-                    serpapi_url = "https://serpapi.com/search.json"
+                    serpapi_url = SERPAPI_URL
                     logger.debug(f"Fetching filters with params: {initial_params}")
-                    resp = await client.get(serpapi_url, params=initial_params)
-                    resp.raise_for_status()
-                    initial_result = resp.json()
+                    initial_result = await serpapi_get_json(client, serpapi_url, initial_params)
                     initial_search_metadata = initial_result.get("search_metadata", {})
                     google_jobs_filters = initial_search_metadata.get("google_jobs_filters", [])
                     
@@ -457,7 +450,7 @@ async def query_serpapi_google_jobs(
                     logger.info(f"Requesting page 1 using filter link: {request_url}")
                 else:
                     # Subsequent pages using token, or first page without filters
-                    request_url = "https://serpapi.com/search.json"
+                    request_url = SERPAPI_URL
                     request_params = {
                         "engine": "google_jobs",
                         "api_key": serpapi_key,
@@ -474,9 +467,7 @@ async def query_serpapi_google_jobs(
                          logger.info(f"Requesting page {current_page} using base parameters (no token/filter)...")
                 
                 # Make the API call for the current page
-                resp = await client.get(request_url, params=request_params)
-                resp.raise_for_status() # Raise HTTPError for bad responses (4xx or 5xx)
-                results_data = resp.json()
+                results_data = await serpapi_get_json(client, request_url, request_params) # Raises HTTPError for bad responses (4xx or 5xx)
                 logger.debug(f"Successfully retrieved page {current_page} data.")
 
                 # Process results safely
@@ -0,0 +1,367 @@
+"""
+llm_gateway.py
+
+Process-wide OpenAI gateway. Every module calls the chat/completions API
+through here so all requests share one tuned keep-alive connection pool
+instead of paying a fresh TLS handshake per call.
+
+The async client is created by `startup()` (wired into the FastAPI lifespan in
+main.py) and closed by `shutdown()`; scripts that never call `startup()` get
+one lazily on first use. Pooled connections belong to the event loop that
+opened them, so each loop gets its own client and `shutdown()` closes them
+all. A pooled sync client is also provided for code that still runs in worker
+threads.
+
+Pool utilisation and connection churn are tracked through httpcore trace
+hooks and exposed via `stats()`. Retries are owned by llm_retry (the SDK's
+own retry loop is disabled) so every caller gets the same backoff and
+circuit-breaking behaviour, and each attempt is admitted by
+llm_rate_limiter against the model's TPM/RPM budget. Identical concurrent
+async requests are coalesced into one upstream call by single_flight.
+
+An upstream call is cancelled once every caller waiting on it is cancelled
+(e.g. its HTTP client disconnected; see request_scope). Each abandoned call
+is counted with the tokens it would have used, so `stats()` shows what
+cancellation saves. Latency-critical call sites can pass a `hedge_key` to
+have slow calls hedged (see llm_hedging).
+"""
+import asyncio
+import logging
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+import httpx
+import openai
+from pydantic import BaseModel
+
+import llm_hedging
+import llm_rate_limiter
+import llm_retry
+import single_flight
+import structured_output
+
+logger = logging.getLogger(__name__)
+
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "100"))
+LLM_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "20"))
+LLM_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("LLM_KEEPALIVE_EXPIRY_SECONDS", "90"))
+LLM_CONNECT_TIMEOUT_SECONDS = float(os.getenv("LLM_CONNECT_TIMEOUT_SECONDS", "10"))
+LLM_READ_TIMEOUT_SECONDS = float(os.getenv("LLM_READ_TIMEOUT_SECONDS", "180"))
+
+
+class _PoolMetrics:
+    """Thread-safe counters for one connection pool."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests_started = 0
+        self.requests_failed = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.connections_opened = 0
+        self.tls_handshakes = 0
+
+    def request_started(self) -> None:
+        with self._lock:
+            self.requests_started += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def request_finished(self, failed: bool) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            if failed:
+                self.requests_failed += 1
+
+    def on_trace(self, event_name: str) -> None:
+        if event_name == "connection.connect_tcp.complete":
+            with self._lock:
+                self.connections_opened += 1
+        elif event_name == "connection.start_tls.complete":
+            with self._lock:
+                self.tls_handshakes += 1
+
+    def snapshot(self, transports: List[Any]) -> Dict[str, Any]:
+        with self._lock:
+            data = {
+                "requests_started": self.requests_started,
+                "requests_failed": self.requests_failed,
+                "in_flight": self.in_flight,
+                "peak_in_flight": self.peak_in_flight,
+                "connections_opened": self.connections_opened,
+                "tls_handshakes": self.tls_handshakes,
+                # 1.0 means every request rode an existing connection.
+                "connection_reuse_ratio": round(1 - self.connections_opened / self.requests_started, 3) if self.requests_started else None,
+            }
+        connections = [
+            connection for transport in transports
+            for connection in list(getattr(getattr(transport.transport, "_pool", None), "connections", []) or [])
+        ]
+        active = sum(1 for c in connections if not c.is_idle() and not c.is_closed())
+        data["pool"] = {
+            "max_connections": LLM_MAX_CONNECTIONS,
+            "max_keepalive_connections": LLM_MAX_KEEPALIVE_CONNECTIONS,
+            "open_connections": len(connections),
+            "active_connections": active,
+            "idle_connections": len(connections) - active,
+            "utilisation": round(active / LLM_MAX_CONNECTIONS, 3),
+        }
+        return data
+
+
+_async_metrics = _PoolMetrics()
+_sync_metrics = _PoolMetrics()
+
+
+class _TracedAsyncTransport(httpx.AsyncBaseTransport):
+    """Wraps the pooled transport with request counters and httpcore trace hooks."""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport):
+        self.transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        async def trace(event_name: str, info: Dict[str, Any]) -> None:
+            _async_metrics.on_trace(event_name)
+
+        request.extensions["trace"] = trace
+        _async_metrics.request_started()
+        failed = True
+        try:
+            response = await self.transport.handle_async_request(request)
+            failed = False
+            return response
+        finally:
+            _async_metrics.request_finished(failed)
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+
+class _TracedSyncTransport(httpx.BaseTransport):
+    def __init__(self, transport: httpx.BaseTransport):
+        self.transport = transport
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        def trace(event_name: str, info: Dict[str, Any]) -> None:
+            _sync_metrics.on_trace(event_name)
+
+        request.extensions["trace"] = trace
+        _sync_metrics.request_started()
+        failed = True
+        try:
+            response = self.transport.handle_request(request)
+            failed = False
+            return response
+        finally:
+            _sync_metrics.request_finished(failed)
+
+    def close(self) -> None:
+        self.transport.close()
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=LLM_MAX_CONNECTIONS,
+        max_keepalive_connections=LLM_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=LLM_KEEPALIVE_EXPIRY_SECONDS,
+    )
+
+
+def _timeout() -> httpx.Timeout:
+    return httpx.Timeout(LLM_READ_TIMEOUT_SECONDS, connect=LLM_CONNECT_TIMEOUT_SECONDS)
+
+
+def _async_pool_transport() -> httpx.AsyncBaseTransport:
+    return httpx.AsyncHTTPTransport(limits=_limits())
+
+
+def _sync_pool_transport() -> httpx.BaseTransport:
+    return httpx.HTTPTransport(limits=_limits())
+
+
+def _api_key() -> str:
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        # Let the app start without a key (as main.py does); calls fail with 401.
+        logger.warning("LLM gateway: OPENAI_API_KEY not found in environment variables.")
+        api_key = "your_openai_api_key_here"
+    return api_key
+
+
+# One client per event loop (None: created outside any loop).
+_async_clients: Dict[Optional[asyncio.AbstractEventLoop], Tuple[openai.AsyncOpenAI, _TracedAsyncTransport]] = {}
+_async_lock = threading.Lock()
+_sync_client: Optional[openai.OpenAI] = None
+_sync_transport: Optional[_TracedSyncTransport] = None
+_sync_lock = threading.Lock()
+
+
+def get_client() -> openai.AsyncOpenAI:
+    """Returns the running loop's shared AsyncOpenAI client, creating it on first use."""
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+    with _async_lock:
+        entry = _async_clients.get(loop)
+        if entry is None:
+            # Nothing can run on a closed loop any more (scripts calling
+            # asyncio.run() repeatedly without shutdown()); drop its client.
+            for stale in [l for l in _async_clients if l is not None and l.is_closed()]:
+                del _async_clients[stale]
+            transport = _TracedAsyncTransport(_async_pool_transport())
+            client = openai.AsyncOpenAI(
+                api_key=_api_key(),
+                max_retries=0,
+                http_client=openai.DefaultAsyncHttpxClient(transport=transport, timeout=_timeout()),
+            )
+            entry = _async_clients[loop] = (client, transport)
+            logger.info(f"LLM gateway: created async client (max_connections={LLM_MAX_CONNECTIONS}, keepalive={LLM_MAX_KEEPALIVE_CONNECTIONS}).")
+        return entry[0]
+
+
+def get_sync_client() -> openai.OpenAI:
+    """Returns the shared sync OpenAI client for code running in worker threads."""
+    global _sync_client, _sync_transport
+    with _sync_lock:
+        if _sync_client is None:
+            _sync_transport = _TracedSyncTransport(_sync_pool_transport())
+            _sync_client = openai.OpenAI(
+                api_key=_api_key(),
+                max_retries=0,
+                http_client=openai.DefaultHttpxClient(transport=_sync_transport, timeout=_timeout()),
+            )
+            logger.info("LLM gateway: created sync client.")
+        return _sync_client
+
+
+async def startup() -> None:
+    get_client()
+
+
+async def shutdown() -> None:
+    """Closes every client, each on the loop that owns its connections."""
+    global _sync_client, _sync_transport
+    with _async_lock:
+        clients = list(_async_clients.items())
+        _async_clients.clear()
+    current = asyncio.get_running_loop()
+    for loop, (client, _) in clients:
+        if loop is None or loop is current:
+            await client.close()
+        elif loop.is_running():
+            await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(client.close(), loop))
+    with _sync_lock:
+        if _sync_client is not None:
+            _sync_client.close()
+            _sync_client, _sync_transport = None, None
+    logger.info("LLM gateway: clients closed.")
+
+
+def format_messages(messages: List[Any]) -> List[Dict[str, Any]]:
+    """Normalises LangChain messages and plain dicts into OpenAI chat messages."""
+    formatted = []
+    for msg in messages:
+        if hasattr(msg, 'type') and hasattr(msg, 'content'):
+            role = msg.type
+            if role == 'human':
+                role = 'user'
+            elif role == 'ai':
+                role = 'assistant'
+            formatted.append({"role": role, "content": msg.content})
+        elif isinstance(msg, dict) and 'role' in msg and 'content' in msg:
+            formatted.append(msg)
+        else:
+            logger.error(f"Skipping unrecognised message type in format_messages: {type(msg)}")
+    return formatted
+
+
+_cancel_lock = threading.Lock()
+_cancelled = {"calls": 0, "prompt_tokens_estimate": 0, "completion_tokens_allowance": 0}
+
+
+async def _cancellable(kwargs: Dict[str, Any], call):
+    """Runs one upstream call, counting it if it is abandoned by cancellation.
+
+    Prompt tokens may still be billed if the request already reached OpenAI;
+    the completion allowance is the upper bound on output tokens not generated.
+    """
+    try:
+        return await call()
+    except asyncio.CancelledError:
+        with _cancel_lock:
+            _cancelled["calls"] += 1
+            _cancelled["prompt_tokens_estimate"] += llm_rate_limiter.estimate_prompt_tokens(kwargs)
+            _cancelled["completion_tokens_allowance"] += llm_rate_limiter.completion_allowance(kwargs)
+        logger.info(f"LLM gateway: cancelled {kwargs.get('model', 'unknown')} call (all callers went away).")
+        raise
+
+
+def _chat_attempts(kwargs: Dict[str, Any]):
+    """One chat call (all its retries) under the model's retry and rate-limit policies."""
+    model = kwargs.get("model", "unknown")
+    return llm_retry.call_with_retry(
+        lambda: llm_rate_limiter.limited(lambda: get_client().chat.completions.create(**kwargs), model, kwargs),
+        model=model,
+    )
+
+
+async def chat_completion(hedge_key: Optional[str] = None, response_model: Optional[Type[BaseModel]] = None, **kwargs):
+    """`chat.completions.create` on the shared async client, under the shared retry and rate-limit policies.
+
+    With `hedge_key`, a call slower than that key's p95 is hedged (see llm_hedging).
+    With `response_model`, the `response_format` is built for whichever model
+    each call goes to, since a hedge may use a different model.
+    """
+    def for_model(model: str) -> Dict[str, Any]:
+        if response_model is None:
+            return {**kwargs, "model": model}
+        return {**kwargs, "model": model, "response_format": structured_output.response_format(model, response_model)}
+
+    kwargs = for_model(kwargs.get("model", "unknown"))
+
+    async def call():
+        if hedge_key is None:
+            return await _chat_attempts(kwargs)
+        return await llm_hedging.hedged(hedge_key, kwargs["model"], lambda model: _chat_attempts(for_model(model)))
+
+    return await single_flight.group("llm").do(
+        single_flight.canonical_key("chat.completions", kwargs),
+        lambda: _cancellable(kwargs, call),
+    )
+
+
+async def responses_create(**kwargs):
+    """`responses.create` on the shared async client, under the shared retry and rate-limit policies."""
+    model = kwargs.get("model", "unknown")
+    return await single_flight.group("llm").do(
+        single_flight.canonical_key("responses", kwargs),
+        lambda: _cancellable(kwargs, lambda: llm_retry.call_with_retry(
+            lambda: llm_rate_limiter.limited(lambda: get_client().responses.create(**kwargs), model, kwargs),
+            model=model,
+        )),
+    )
+
+
+def sync_chat_completion(**kwargs):
+    """`chat.completions.create` on the shared sync client (blocking), under the shared retry and rate-limit policies."""
+    model = kwargs.get("model", "unknown")
+    return llm_retry.call_with_retry_sync(
+        lambda: llm_rate_limiter.limited_sync(lambda: get_sync_client().chat.completions.create(**kwargs), model, kwargs),
+        model=model,
+    )
+
+
+def stats() -> Dict[str, Any]:
+    with _cancel_lock:
+        cancelled = dict(_cancelled)
+    with _async_lock:
+        async_transports = [transport for _, transport in _async_clients.values()]
+    data = {
+        "async": _async_metrics.snapshot(async_transports),
+        "sync": _sync_metrics.snapshot([_sync_transport] if _sync_transport is not None else []),
+        "cancelled": cancelled,
+    }
+    data["async"]["clients"] = len(async_transports)
+    return data
@@ -0,0 +1,165 @@
+"""
+llm_hedging.py
+
+Hedged requests for latency-critical LLM calls.
+
+A hedged call starts normally. If it has not returned by the rolling p95
+latency of its hedge key (e.g. "prompt_b"), a duplicate is fired, optionally
+on a faster model (LLM_HEDGE_MODELS), and whichever answers first wins; the
+other is cancelled. Hedging only kicks in once a key has enough latency
+samples, and the total number of hedges is capped at LLM_HEDGE_BUDGET_RATIO
+of hedgeable calls so the extra spend stays bounded.
+
+Callers opt in per call site through llm_gateway.chat_completion(hedge_key=...).
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+LLM_HEDGING_ENABLED = os.getenv("LLM_HEDGING_ENABLED", "false").lower() in ("1", "true", "yes")
+LLM_HEDGE_BUDGET_RATIO = float(os.getenv("LLM_HEDGE_BUDGET_RATIO", "0.1"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+LLM_HEDGE_WINDOW = int(os.getenv("LLM_HEDGE_WINDOW", "200"))
+# Primary model -> model the hedge is sent to, e.g. {"gpt-4-turbo-preview": "gpt-4o"}.
+LLM_HEDGE_MODELS: Dict[str, str] = json.loads(os.getenv("LLM_HEDGE_MODELS", "{}"))
+
+PRIMARY, HEDGE = "primary", "hedge"
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies for one hedge key."""
+
+    def __init__(self, window: int = LLM_HEDGE_WINDOW):
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, q: float, min_samples: int = LLM_HEDGE_MIN_SAMPLES) -> Optional[float]:
+        with self._lock:
+            if len(self._samples) < max(min_samples, 1):
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class HedgeStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.primary_wins = 0
+        self.budget_denied = 0
+        self.no_baseline = 0
+
+    def count(self, field: str) -> None:
+        with self._lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+    def try_spend(self, budget_ratio: float) -> bool:
+        """Reserves one hedge if that keeps hedges within `budget_ratio` of calls."""
+        with self._lock:
+            if self.hedged + 1 > budget_ratio * self.calls:
+                self.budget_denied += 1
+                return False
+            self.hedged += 1
+            return True
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "hedged": self.hedged,
+                "hedge_wins": self.hedge_wins,
+                "primary_wins": self.primary_wins,
+                "hedge_win_rate": round(self.hedge_wins / self.hedged, 3) if self.hedged else None,
+                "budget_denied": self.budget_denied,
+                "no_baseline": self.no_baseline,
+            }
+
+
+_trackers: Dict[str, LatencyTracker] = {}
+_stats: Dict[str, HedgeStats] = {}
+_registry_lock = threading.Lock()
+
+
+def _tracker(key: str) -> LatencyTracker:
+    with _registry_lock:
+        return _trackers.setdefault(key, LatencyTracker())
+
+
+def _key_stats(key: str) -> HedgeStats:
+    with _registry_lock:
+        return _stats.setdefault(key, HedgeStats())
+
+
+async def hedged(key: str, model: str, call: Callable[[str], Awaitable[Any]]) -> Any:
+    """Runs `call(model)`, hedging with `call(hedge_model)` after the key's p95 latency."""
+    tracker = _tracker(key)
+    start = time.perf_counter()
+    if not LLM_HEDGING_ENABLED:
+        result = await call(model)
+        tracker.record(time.perf_counter() - start)
+        return result
+
+    stats = _key_stats(key)
+    stats.count("calls")
+    delay = tracker.percentile(0.95)
+    if delay is None:
+        stats.count("no_baseline")
+        result = await call(model)
+        tracker.record(time.perf_counter() - start)
+        return result
+
+    primary = asyncio.ensure_future(call(model))
+    legs = {primary: PRIMARY}
+    try:
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if not done and stats.try_spend(LLM_HEDGE_BUDGET_RATIO):
+            hedge_model = LLM_HEDGE_MODELS.get(model, model)
+            logger.info(f"llm_hedging[{key}]: {model} call exceeded p95 {delay:.2f}s; hedging on {hedge_model}.")
+            legs[asyncio.ensure_future(call(hedge_model))] = HEDGE
+        pending = set(legs)
+        first_error: Optional[BaseException] = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for leg in done:
+                if leg.exception() is not None:
+                    first_error = first_error or leg.exception()
+                    continue
+                if len(legs) > 1:
+                    stats.count("hedge_wins" if legs[leg] == HEDGE else "primary_wins")
+                return leg.result()
+        raise first_error
+    finally:
+        # The primary's latency is recorded even when it lost: the time it had
+        # taken so far is a lower bound and keeps the p95 from drifting down.
+        primary_failed = primary.done() and not primary.cancelled() and primary.exception() is not None
+        if not primary_failed:
+            tracker.record(time.perf_counter() - start)
+        for leg in legs:
+            if not leg.done():
+                leg.cancel()
+        await asyncio.gather(*legs, return_exceptions=True)
+
+
+def stats() -> Dict[str, Any]:
+    with _registry_lock:
+        keys = dict(_stats)
+        trackers = dict(_trackers)
+    data = {}
+    for key, key_stats in keys.items():
+        data[key] = key_stats.snapshot()
+        p95 = trackers[key].percentile(0.95)
+        data[key]["p95_seconds"] = round(p95, 3) if p95 is not None else None
+    return {"enabled": LLM_HEDGING_ENABLED, "budget_ratio": LLM_HEDGE_BUDGET_RATIO, "keys": data}
@@ -3,6 +3,7 @@ import json
 from typing import List, Dict, Any
 from langchain_core.prompts import PromptTemplate
 from langchain.chains import LLMChain
+import structured_output
 
 # This function assumes you have a LangChain LLM instance (e.g. self.llm) available
 def preprocess_jobs_for_llm(jobs, max_jobs=8, desc_max_len=250):
@@ -56,18 +57,9 @@ Return ONLY valid JSON, with NO extra text or commentary.
         job_json=job_json,
         n=n
     )
-    # Clean markdown code block formatting if present
-    import re
-    def clean_llm_json_response(resp):
-        # Remove opening code block with optional 'json' and any whitespace/newlines after
-        cleaned = re.sub(r"^```(?:json)?[\s\r\n]*", "", resp.strip(), flags=re.IGNORECASE)
-        # Remove closing code block with any whitespace/newlines before
-        cleaned = re.sub(r"[\s\r\n]*```$", "", cleaned)
-        return cleaned
-
     try:
-        cleaned_response = clean_llm_json_response(response)
-        filtered_jobs = json.loads(cleaned_response)
+        # Handles markdown code fences and truncated output
+        filtered_jobs = structured_output.loads("job_filter", response)
         # Ensure all required fields are present
         for job in filtered_jobs:
             job.setdefault("url", "")
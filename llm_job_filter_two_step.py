@@ -3,7 +3,7 @@ import json
 from typing import List, Dict, Any
 from langchain_core.prompts import PromptTemplate
 from langchain.chains import LLMChain
-import re
+import structured_output
 
 # --- Step 1: Select Top N Jobs by Index ---
 async def select_top_job_indices(jobs: List[Dict[str, Any]], resume_summary: str, preferences: str, llm, n: int = 5) -> List[int]:
@@ -39,21 +39,9 @@ Return ONLY the JSON list of indices. No explanation, no commentary, no markdown
         job_list_str=job_list_str,
         n=n
     )
-    # Clean and parse JSON
-    def clean_json(resp):
-        cleaned = resp.strip()
-        # Find the first '[' and last ']'
-        start = cleaned.find('[')
-        end = cleaned.rfind(']')
-        if start != -1 and end != -1 and end > start:
-            return cleaned[start:end+1]
-        # Fallback: try markdown removal
-        cleaned = re.sub(r"^```(?:json)?[\s\r\n]*", "", cleaned, flags=re.IGNORECASE)
-        cleaned = re.sub(r"[\s\r\n]*```$", "", cleaned)
-        return cleaned
     try:
-        cleaned = clean_json(response)
-        indices = json.loads(cleaned)
+        # Handles surrounding prose, markdown code fences and truncated output
+        indices = structured_output.loads("job_filter_select", response)
         if isinstance(indices, list) and all(isinstance(i, int) for i in indices):
             return indices
         logging.error(f"LLM did not return a valid list of indices: {response}")
@@ -94,21 +82,8 @@ Jobs:
             preferences=preferences,
             job_batch_json=job_batch_json
         )
-        # Clean and parse JSON
-        def clean_json(resp):
-            cleaned = resp.strip()
-            # Find the first '[' and last ']'
-            start = cleaned.find('[')
-            end = cleaned.rfind(']')
-            if start != -1 and end != -1 and end > start:
-                return cleaned[start:end+1]
-            # Fallback: try markdown removal
-            cleaned = re.sub(r"^```(?:json)?[\s\r\n]*", "", cleaned, flags=re.IGNORECASE)
-            cleaned = re.sub(r"[\s\r\n]*```$", "", cleaned)
-            return cleaned
         try:
-            cleaned = clean_json(response)
-            batch_results = json.loads(cleaned)
+            batch_results = structured_output.loads("job_filter_explain", response)
             if isinstance(batch_results, list):
                 results.extend(batch_results)
             else:
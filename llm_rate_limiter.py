@@ -0,0 +1,292 @@
+"""
+llm_rate_limiter.py
+
+Process-wide token-bucket limiter for OpenAI tokens-per-minute (TPM) and
+requests-per-minute (RPM) budgets, keyed by model.
+
+Before each attempt llm_gateway reserves the request's estimated tokens
+(prompt tokens counted with tiktoken plus the completion allowance) and one
+request. Reservations are granted strictly in arrival order: a caller that
+overdraws a bucket is told how long to wait until its share has refilled,
+and everyone behind it queues after that. Throughput therefore sits at the
+configured ceiling instead of bursting past it into 429s. Once the response
+arrives the estimate is reconciled against the actual `usage`.
+
+Limits come from LLM_RATE_LIMITS, a JSON object such as
+    {"gpt-4o": {"tpm": 30000, "rpm": 500}, "*": {"tpm": 200000, "rpm": 5000}}
+("*" applies to models not listed), or from LLM_DEFAULT_TPM / LLM_DEFAULT_RPM.
+A limit of 0 means unlimited, which is the default.
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import llm_retry
+import llm_tokens
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_COMPLETION_TOKENS = int(os.getenv("LLM_DEFAULT_COMPLETION_TOKENS", "1000"))
+
+
+def _load_limits() -> Dict[str, Dict[str, int]]:
+    limits: Dict[str, Dict[str, int]] = {
+        "*": {
+            "tpm": int(os.getenv("LLM_DEFAULT_TPM", "0")),
+            "rpm": int(os.getenv("LLM_DEFAULT_RPM", "0")),
+        }
+    }
+    raw = os.getenv("LLM_RATE_LIMITS")
+    if raw:
+        try:
+            for model, cfg in json.loads(raw).items():
+                limits[model] = {"tpm": int(cfg.get("tpm", 0)), "rpm": int(cfg.get("rpm", 0))}
+        except (ValueError, AttributeError) as e:
+            logger.error(f"llm_rate_limiter: ignoring malformed LLM_RATE_LIMITS: {e}")
+    return limits
+
+
+class TokenBucket:
+    """Refills `per_minute` units per minute, up to one minute's worth of burst.
+
+    `reserve` always debits immediately (the level may go negative) and returns
+    how long the caller must wait for the debt to be repaid, which gives FIFO
+    ordering without a waiter queue.
+    """
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = float(per_minute)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float, now: float) -> float:
+        self._refill(now)
+        # A single request larger than the whole bucket would otherwise wait forever.
+        self.level -= min(amount, self.capacity)
+        return 0.0 if self.level >= 0 else -self.level / self.rate
+
+    def credit(self, amount: float, now: float) -> None:
+        """Returns (or, if negative, further debits) `amount` units."""
+        self._refill(now)
+        self.level = min(self.capacity, self.level + amount)
+
+    def drain(self, now: float) -> None:
+        self._refill(now)
+        self.level = min(self.level, 0.0)
+
+
+class Reservation:
+    def __init__(self, limiter: "ModelRateLimiter", tokens: int, wait: float):
+        self.limiter = limiter
+        self.tokens = tokens
+        self.wait = wait
+
+
+class ModelRateLimiter:
+    def __init__(self, model: str, tpm: int, rpm: int):
+        self.model = model
+        self.tpm = tpm
+        self.rpm = rpm
+        self._tokens = TokenBucket(tpm) if tpm > 0 else None
+        self._requests = TokenBucket(rpm) if rpm > 0 else None
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.throttled = 0
+        self.total_wait_seconds = 0.0
+        self.waiting = 0
+        self.estimated_tokens = 0
+        self.actual_tokens = 0
+        self.reconciled = 0
+        self.provider_429s = 0
+
+    def queued(self, delta: int) -> None:
+        with self._lock:
+            self.waiting += delta
+
+    @property
+    def enabled(self) -> bool:
+        return self._tokens is not None or self._requests is not None
+
+    def reserve(self, tokens: int) -> Reservation:
+        now = time.monotonic()
+        with self._lock:
+            wait = 0.0
+            if self._tokens is not None:
+                wait = max(wait, self._tokens.reserve(tokens, now))
+            if self._requests is not None:
+                wait = max(wait, self._requests.reserve(1, now))
+            self.requests += 1
+            self.estimated_tokens += tokens
+            if wait > 0:
+                self.throttled += 1
+                self.total_wait_seconds += wait
+        return Reservation(self, tokens, wait)
+
+    def reconcile(self, reservation: Reservation, actual_tokens: Optional[int]) -> None:
+        if actual_tokens is None:
+            return
+        with self._lock:
+            self.actual_tokens += actual_tokens
+            self.reconciled += 1
+            if self._tokens is not None:
+                self._tokens.credit(reservation.tokens - actual_tokens, time.monotonic())
+
+    def release(self, reservation: Reservation, rate_limited: bool = False, sent: bool = True) -> None:
+        """Refunds the token estimate of an attempt that never produced output.
+
+        The request slot is only refunded when the attempt was never `sent`
+        (e.g. cancelled while queued): once sent, the provider has counted it
+        against its RPM limit whether or not a response came back.
+        """
+        with self._lock:
+            self.estimated_tokens -= reservation.tokens
+            now = time.monotonic()
+            if not sent:
+                self.requests -= 1
+                if self._requests is not None:
+                    self._requests.credit(1, now)
+            if rate_limited:
+                # The provider disagrees with our accounting; stop granting
+                # budget until the bucket refills from empty.
+                self.provider_429s += 1
+                if self._tokens is not None:
+                    self._tokens.drain(now)
+                if self._requests is not None:
+                    self._requests.drain(now)
+            elif self._tokens is not None:
+                self._tokens.credit(reservation.tokens, now)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "tpm_limit": self.tpm or None,
+                "rpm_limit": self.rpm or None,
+                "requests": self.requests,
+                "throttled": self.throttled,
+                "waiting": self.waiting,
+                "total_wait_seconds": round(self.total_wait_seconds, 3),
+                "estimated_tokens": self.estimated_tokens,
+                "actual_tokens": self.actual_tokens,
+                "reconciled_requests": self.reconciled,
+                "provider_429s": self.provider_429s,
+            }
+
+
+_limits = _load_limits()
+_limiters: Dict[str, ModelRateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(model: str) -> ModelRateLimiter:
+    with _limiters_lock:
+        limiter = _limiters.get(model)
+        if limiter is None:
+            cfg = _limits.get(model, _limits["*"])
+            limiter = ModelRateLimiter(model, cfg["tpm"], cfg["rpm"])
+            _limiters[model] = limiter
+        return limiter
+
+
+def estimate_prompt_tokens(kwargs: Dict[str, Any]) -> int:
+    """Input tokens of a create() call: messages/input plus tool definitions."""
+    model = kwargs.get("model")
+    prompt = 0
+    if kwargs.get("messages"):
+        prompt += llm_tokens.count_message_tokens(kwargs["messages"], model)
+    if kwargs.get("input"):
+        value = kwargs["input"]
+        prompt += llm_tokens.count_tokens(value if isinstance(value, str) else json.dumps(value, default=str), model)
+    for key in ("tools", "functions"):
+        if kwargs.get(key):
+            prompt += llm_tokens.count_tokens(json.dumps(kwargs[key], default=str), model)
+    return prompt
+
+
+def completion_allowance(kwargs: Dict[str, Any]) -> int:
+    """The most output tokens a create() call may produce."""
+    return int(kwargs.get("max_tokens") or kwargs.get("max_completion_tokens") or kwargs.get("max_output_tokens") or DEFAULT_COMPLETION_TOKENS)
+
+
+def estimate_request_tokens(kwargs: Dict[str, Any]) -> int:
+    """Prompt tokens plus the completion allowance for a create() call."""
+    return estimate_prompt_tokens(kwargs) + completion_allowance(kwargs)
+
+
+def usage_tokens(response: Any) -> Optional[int]:
+    usage = getattr(response, "usage", None)
+    total = getattr(usage, "total_tokens", None)
+    return int(total) if total is not None else None
+
+
+def _reserve(model: str, kwargs: Dict[str, Any]) -> Tuple[ModelRateLimiter, Optional[Reservation]]:
+    limiter = get_limiter(model)
+    if not limiter.enabled:
+        return limiter, None
+    reservation = limiter.reserve(estimate_request_tokens(kwargs))
+    if reservation.wait > 0:
+        logger.info(f"llm_rate_limiter: '{model}' over budget; queuing request for {reservation.wait:.2f}s.")
+    return limiter, reservation
+
+
+def _finish(limiter: ModelRateLimiter, reservation: Optional[Reservation], response: Any = None,
+            error: Optional[BaseException] = None, sent: bool = True) -> None:
+    if reservation is None:
+        return
+    if error is None:
+        limiter.reconcile(reservation, usage_tokens(response))
+    else:
+        limiter.release(reservation, rate_limited=llm_retry.classify_error(error) == llm_retry.RATE_LIMIT, sent=sent)
+
+
+async def limited(call, model: str, kwargs: Dict[str, Any]) -> Any:
+    """Awaits `call()` once the model's TPM/RPM budget allows it."""
+    limiter, reservation = _reserve(model, kwargs)
+    if reservation is not None and reservation.wait > 0:
+        limiter.queued(1)
+        try:
+            await asyncio.sleep(reservation.wait)
+        except BaseException as e:
+            _finish(limiter, reservation, error=e, sent=False)
+            raise
+        finally:
+            limiter.queued(-1)
+    try:
+        response = await call()
+    except BaseException as e:
+        _finish(limiter, reservation, error=e)
+        raise
+    _finish(limiter, reservation, response=response)
+    return response
+
+
+def limited_sync(call, model: str, kwargs: Dict[str, Any]) -> Any:
+    """Blocking counterpart of `limited` for worker threads."""
+    limiter, reservation = _reserve(model, kwargs)
+    if reservation is not None and reservation.wait > 0:
+        limiter.queued(1)
+        try:
+            time.sleep(reservation.wait)
+        finally:
+            limiter.queued(-1)
+    try:
+        response = call()
+    except BaseException as e:
+        _finish(limiter, reservation, error=e)
+        raise
+    _finish(limiter, reservation, response=response)
+    return response
+
+
+def stats() -> Dict[str, Any]:
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return {limiter.model: limiter.snapshot() for limiter in limiters}
@@ -0,0 +1,311 @@
+"""
+llm_retry.py
+
+Shared retry policy for LLM calls made through llm_gateway.
+
+Errors are classified as rate-limit, timeout, 5xx or bad-request. Transient
+classes are retried with full-jitter exponential backoff (honouring any
+Retry-After the provider sends) so that bursts of 429s don't turn into
+synchronized retry storms. Bad requests are never retried.
+
+Each model also has a circuit breaker: after enough consecutive transient
+failures it opens and calls fail fast with CircuitOpenError until a cool-down
+has passed, then a single probe call decides whether to close it again.
+"""
+import asyncio
+import email.utils
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import httpx
+import openai
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT = "rate_limit"
+TIMEOUT = "timeout"
+SERVER_ERROR = "server_error"
+BAD_REQUEST = "bad_request"
+UNKNOWN = "unknown"
+
+RETRYABLE_CLASSES = {RATE_LIMIT, TIMEOUT, SERVER_ERROR}
+
+
+class CircuitOpenError(Exception):
+    """Raised without calling the provider while a model's breaker is open."""
+
+    def __init__(self, model: str, retry_in: float):
+        super().__init__(f"Circuit open for model '{model}'; retry in {retry_in:.1f}s.")
+        self.model = model
+        self.retry_in = retry_in
+
+
+def classify_error(exc: BaseException) -> str:
+    if isinstance(exc, openai.RateLimitError):
+        return RATE_LIMIT
+    if isinstance(exc, (openai.APITimeoutError, asyncio.TimeoutError, httpx.TimeoutException)):
+        return TIMEOUT
+    # Dropped/refused connections are transient in the same way timeouts are.
+    if isinstance(exc, (openai.APIConnectionError, httpx.TransportError)):
+        return TIMEOUT
+    if isinstance(exc, openai.APIStatusError):
+        if exc.status_code == 429:
+            return RATE_LIMIT
+        if exc.status_code == 408:
+            return TIMEOUT
+        if exc.status_code >= 500:
+            return SERVER_ERROR
+        return BAD_REQUEST
+    return UNKNOWN
+
+
+def retry_after_seconds(exc: BaseException) -> Optional[float]:
+    """Reads Retry-After / retry-after-ms from a provider error response, if any."""
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return max(float(retry_after_ms) / 1000.0, 0.0)
+        except ValueError:
+            pass
+    retry_after = headers.get("retry-after")
+    if not retry_after:
+        return None
+    try:
+        return max(float(retry_after), 0.0)
+    except ValueError:
+        pass
+    try:
+        parsed = email.utils.parsedate_to_datetime(retry_after)
+    except (TypeError, ValueError):
+        return None
+    return max(parsed.timestamp() - time.time(), 0.0)
+
+
+class RetryPolicy:
+    """Full-jitter exponential backoff; rate limits back off from a larger base."""
+
+    def __init__(
+        self,
+        max_attempts: int = 4,
+        base_delay: float = 0.5,
+        rate_limit_base_delay: float = 2.0,
+        max_delay: float = 30.0,
+        max_retry_after: float = 60.0,
+    ):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.rate_limit_base_delay = rate_limit_base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+
+    def should_retry(self, error_class: str, attempt: int) -> bool:
+        return error_class in RETRYABLE_CLASSES and attempt < self.max_attempts
+
+    def backoff(self, error_class: str, attempt: int, exc: Optional[BaseException] = None) -> float:
+        """Delay before retry number `attempt` (1-based)."""
+        base = self.rate_limit_base_delay if error_class == RATE_LIMIT else self.base_delay
+        delay = random.uniform(0, min(self.max_delay, base * (2 ** (attempt - 1))))
+        hinted = retry_after_seconds(exc) if exc is not None else None
+        if hinted is not None:
+            # Never retry earlier than the provider asked, but keep a little
+            # jitter on top so callers that got the same hint don't align.
+            delay = min(hinted, self.max_retry_after) + random.uniform(0, self.base_delay)
+        return delay
+
+
+class CircuitBreaker:
+    """Per-model breaker: closed -> open after N transient failures -> half-open probe."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, model: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.model = model
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_call(self) -> bool:
+        """Admits a call or raises CircuitOpenError; returns True if the call is the half-open probe."""
+        with self._lock:
+            if self.state == self.OPEN:
+                elapsed = time.monotonic() - self.opened_at
+                if elapsed < self.reset_timeout:
+                    raise CircuitOpenError(self.model, self.reset_timeout - elapsed)
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self.state == self.HALF_OPEN:
+                if self._probe_in_flight:
+                    raise CircuitOpenError(self.model, 0.0)
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info(f"LLM retry: circuit for '{self.model}' closed again.")
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self._probe_in_flight = False
+
+    def release(self) -> None:
+        """Frees the half-open probe slot after the probe ended without a result (e.g. was cancelled).
+
+        Only the call that `before_call` admitted as the probe may call this.
+        """
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self, error_class: str) -> None:
+        with self._lock:
+            self._probe_in_flight = False
+            if error_class not in RETRYABLE_CLASSES:
+                # Our own bad requests say nothing about provider health.
+                if self.state == self.HALF_OPEN:
+                    self.state = self.CLOSED
+                return
+            self.consecutive_failures += 1
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.times_opened += 1
+                    logger.warning(f"LLM retry: circuit for '{self.model}' opened after {self.consecutive_failures} consecutive {error_class} failures.")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "times_opened": self.times_opened,
+            }
+
+
+DEFAULT_POLICY = RetryPolicy(
+    max_attempts=int(os.getenv("LLM_RETRY_MAX_ATTEMPTS", "4")),
+    base_delay=float(os.getenv("LLM_RETRY_BASE_DELAY_SECONDS", "0.5")),
+    rate_limit_base_delay=float(os.getenv("LLM_RETRY_RATE_LIMIT_BASE_DELAY_SECONDS", "2.0")),
+    max_delay=float(os.getenv("LLM_RETRY_MAX_DELAY_SECONDS", "30")),
+)
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("LLM_CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_SECONDS = float(os.getenv("LLM_CIRCUIT_RESET_SECONDS", "30"))
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_stats: Dict[str, int] = {"calls": 0, "attempts": 0, "retries": 0, "gave_up": 0, "short_circuited": 0}
+_errors_by_class: Dict[str, int] = {}
+
+
+def get_breaker(model: str) -> CircuitBreaker:
+    with _breakers_lock:
+        breaker = _breakers.get(model)
+        if breaker is None:
+            breaker = CircuitBreaker(model, CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_SECONDS)
+            _breakers[model] = breaker
+        return breaker
+
+
+def _count(key: str, error_class: Optional[str] = None) -> None:
+    with _stats_lock:
+        _stats[key] += 1
+        if error_class:
+            _errors_by_class[error_class] = _errors_by_class.get(error_class, 0) + 1
+
+
+def _on_attempt(breaker: CircuitBreaker) -> bool:
+    """Admits one attempt; returns True if it is the breaker's half-open probe."""
+    try:
+        probe = breaker.before_call()
+    except CircuitOpenError:
+        _count("short_circuited")
+        raise
+    _count("attempts")
+    return probe
+
+
+def _on_error(breaker: CircuitBreaker, policy: RetryPolicy, exc: Exception, attempt: int) -> Optional[float]:
+    """Records a failed attempt; returns the delay before retrying, or None to give up."""
+    error_class = classify_error(exc)
+    breaker.record_failure(error_class)
+    if not policy.should_retry(error_class, attempt):
+        _count("gave_up", error_class)
+        return None
+    _count("retries", error_class)
+    delay = policy.backoff(error_class, attempt, exc)
+    logger.warning(f"LLM retry: {error_class} from '{breaker.model}' (attempt {attempt}/{policy.max_attempts}): {exc}. Retrying in {delay:.2f}s.")
+    return delay
+
+
+async def call_with_retry(fn: Callable[[], Awaitable[Any]], model: str, policy: Optional[RetryPolicy] = None) -> Any:
+    policy = policy or DEFAULT_POLICY
+    breaker = get_breaker(model)
+    _count("calls")
+    attempt = 0
+    while True:
+        attempt += 1
+        probe = _on_attempt(breaker)
+        try:
+            result = await fn()
+        except Exception as exc:
+            delay = _on_error(breaker, policy, exc, attempt)
+            if delay is None:
+                raise
+            await asyncio.sleep(delay)
+            continue
+        except BaseException:
+            # Cancelled (hedge loser, client disconnect, deadline): not a verdict on the model.
+            if probe:
+                breaker.release()
+            raise
+        breaker.record_success()
+        return result
+
+
+def call_with_retry_sync(fn: Callable[[], Any], model: str, policy: Optional[RetryPolicy] = None) -> Any:
+    policy = policy or DEFAULT_POLICY
+    breaker = get_breaker(model)
+    _count("calls")
+    attempt = 0
+    while True:
+        attempt += 1
+        probe = _on_attempt(breaker)
+        try:
+            result = fn()
+        except Exception as exc:
+            delay = _on_error(breaker, policy, exc, attempt)
+            if delay is None:
+                raise
+            time.sleep(delay)
+            continue
+        except BaseException:
+            if probe:
+                breaker.release()
+            raise
+        breaker.record_success()
+        return result
+
+
+def stats() -> Dict[str, Any]:
+    with _stats_lock:
+        data = dict(_stats)
+        data["errors_by_class"] = dict(_errors_by_class)
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    data["circuits"] = {b.model: b.snapshot() for b in breakers}
+    return data
@@ -0,0 +1,93 @@
+"""
+llm_tokens.py
+
+Token counting shared by the LLM stack (rate limiting, prompt budgeting).
+
+Uses tiktoken when its encoding files are available. tiktoken fetches them
+on first use, so in environments without network access (or a pre-seeded
+TIKTOKEN_CACHE_DIR) we fall back to a ~4 characters/token heuristic rather
+than failing the call.
+"""
+import json
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+import tiktoken
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ENCODING = "cl100k_base"
+CHARS_PER_TOKEN = 4
+# Per-message framing overhead of the chat format (role, separators).
+TOKENS_PER_MESSAGE = 4
+TOKENS_PER_REPLY = 3
+
+_encodings: Dict[str, Optional[tiktoken.Encoding]] = {}
+_encodings_lock = threading.Lock()
+
+
+def _encoding_name(model: Optional[str]) -> str:
+    if model:
+        try:
+            return tiktoken.encoding_name_for_model(model)
+        except KeyError:
+            pass
+    return DEFAULT_ENCODING
+
+
+def get_encoding(model: Optional[str] = None) -> Optional[tiktoken.Encoding]:
+    """Returns the tiktoken encoding for `model`, or None if it can't be loaded."""
+    name = _encoding_name(model)
+    with _encodings_lock:
+        if name in _encodings:
+            return _encodings[name]
+        try:
+            encoding = tiktoken.get_encoding(name)
+        except Exception as e:
+            # Remember the failure so we don't retry a download on every call.
+            logger.warning(f"llm_tokens: tiktoken encoding '{name}' unavailable ({e}); using character heuristic.")
+            encoding = None
+        _encodings[name] = encoding
+        return encoding
+
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    if not text:
+        return 0
+    encoding = get_encoding(model)
+    if encoding is None:
+        return max(1, len(text) // CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def _content_text(content: Any) -> str:
+    if isinstance(content, str):
+        return content
+    # Multi-part content / tool payloads: count their serialized form.
+    return json.dumps(content, default=str)
+
+
+def count_message_tokens(messages: List[Dict[str, Any]], model: Optional[str] = None) -> int:
+    """Prompt tokens for a list of OpenAI chat messages."""
+    total = TOKENS_PER_REPLY
+    for message in messages:
+        total += TOKENS_PER_MESSAGE
+        for key, value in message.items():
+            if value is None:
+                continue
+            total += count_tokens(_content_text(value), model)
+    return total
+
+
+def truncate_to_tokens(text: str, max_tokens: int, model: Optional[str] = None) -> str:
+    """Longest prefix of `text` that fits in `max_tokens`."""
+    if max_tokens <= 0 or not text:
+        return ""
+    encoding = get_encoding(model)
+    if encoding is None:
+        return text[:max_tokens * CHARS_PER_TOKEN]
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max_tokens])
@@ -0,0 +1,97 @@
+"""
+loop_lag.py
+
+Event-loop lag monitor.
+
+A background task sleeps LOOP_LAG_INTERVAL seconds at a time and records how
+much later than requested it woke up. Lag means something held the loop:
+synchronous parsing or JSON work in a handler, a blocking client call, or
+simply more ready callbacks than one core can run. The recent samples are
+summarised in /api/metrics, and load tests read them to tell upstream latency
+apart from time spent queueing inside the app.
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+LOOP_LAG_INTERVAL = float(os.getenv("LOOP_LAG_INTERVAL", "0.1"))
+LOOP_LAG_SAMPLES = int(os.getenv("LOOP_LAG_SAMPLES", "600"))
+# Wake-ups later than this are logged.
+LOOP_LAG_WARN_SECONDS = float(os.getenv("LOOP_LAG_WARN_SECONDS", "0.5"))
+
+
+def _percentile(ordered, q: float) -> float:
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class LoopLagMonitor:
+    def __init__(self, interval: float = LOOP_LAG_INTERVAL, samples: int = LOOP_LAG_SAMPLES):
+        self.interval = interval
+        self._samples: Deque[float] = deque(maxlen=samples)
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._max = 0.0
+        self._total = 0
+
+    async def _run(self) -> None:
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.perf_counter() - start - self.interval)
+            with self._lock:
+                self._samples.append(lag)
+                self._max = max(self._max, lag)
+                self._total += 1
+            if lag > LOOP_LAG_WARN_SECONDS:
+                logger.warning(f"loop_lag: event loop blocked for {lag * 1000:.0f}ms.")
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            ordered = sorted(self._samples)
+            running_max, total = self._max, self._total
+        if not ordered:
+            return {"running": self._task is not None, "samples": 0}
+        return {
+            "running": self._task is not None,
+            "samples": total,
+            "interval_ms": self.interval * 1000,
+            "p50_ms": round(_percentile(ordered, 0.50) * 1000, 2),
+            "p95_ms": round(_percentile(ordered, 0.95) * 1000, 2),
+            "p99_ms": round(_percentile(ordered, 0.99) * 1000, 2),
+            "recent_max_ms": round(ordered[-1] * 1000, 2),
+            "max_ms": round(running_max * 1000, 2),
+        }
+
+
+monitor = LoopLagMonitor()
+
+
+def start() -> None:
+    monitor.start()
+
+
+async def stop() -> None:
+    await monitor.stop()
+
+
+def stats() -> Dict[str, Any]:
+    return monitor.stats()
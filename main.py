@@ -1,4 +1,3 @@
-import openai
 import logging
 import os
 from dotenv import load_dotenv
@@ -7,20 +6,16 @@ from pdf_export import router as pdf_export_router
 from followup_qa import router as followup_qa_router
 from fastapi import HTTPException, UploadFile, File, Form, Depends, BackgroundTasks, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel, Field, ValidationError
 from typing import Optional, List, Dict, Any, Union, Literal
 import json
 import asyncio
-from prompts import (
-    INTERVIEW_PREP_V2_SYSTEM_PROMPT_A_COMPANY,
-    INTERVIEW_PREP_V2_SYSTEM_PROMPT_B_CANDIDATE_ROLE,
-    INTERVIEW_PREP_V2_RESUME_BULLETS_SYSTEM_PROMPT_TEMPLATE,
-    INTERVIEW_PREP_V2_USER_PROMPT_TEMPLATE_A_COMPANY,
-    INTERVIEW_PREP_V2_USER_PROMPT_TEMPLATE_B_CANDIDATE_ROLE,
-    INTERVIEW_PREP_V2_SYSTEM_PROMPT_C_INSIDER_CHEAT_SHEET  # Added for Call C
+from interview_prep_v2_orchestrator import (
+    build_interview_prep_plan, assemble_interview_prep_guide, GUIDE_SECTION_NAMES, GUIDE_CACHE_VERSION, GUIDE_DEADLINE_SECONDS,
+    LAZY_SECTION_NAMES, SECTION_READY, SECTION_LOADING, SECTION_ON_DEMAND,
 )
-from interview_prep_v2_builders import build_company_industry_section, build_role_success_section, build_role_understanding_fit_assessment_section, build_star_story_bank_section, build_technical_case_prep_section # Added import
-from langchain_core.messages import SystemMessage, HumanMessage # Added import
+from cache import guide_cache_key, get_cached_guide, set_cached_guide, guide_cache_stats, section_cache_stats, shared_section_cache_stats, resume_cache_stats, jd_cache_stats
 from interview_prep_v2_models import (
     JobDescriptionStructured,
     ResumeStructured,
@@ -44,14 +39,37 @@ from openai_resume_jd_parsing import parse_resume_with_openai, parse_jd_with_ope
 import time
 from utils import extract_text_from_pdf_bytes, extract_resume_bullets
 import uvicorn
+import http_cassette
+import llm_gateway
+import loop_lag
+import parse_store
+import llm_hedging
+import llm_rate_limiter
+import llm_retry
+import model_router
+import prompt_registry
+import structured_output
+import prompt_budget
+import request_scope
+import single_flight
+import speculative_generation
+from job_queue import JobQueue, WorkerPool, JOB_WORKERS, SUCCEEDED, FAILED
+from contextlib import asynccontextmanager
 from serpapi_news_fetcher import fetch_recent_news # Added import
 
 # Pydantic Models for Request/Response
 class ParseResumeRequest(BaseModel):
     resume_text: str
+    session_id: Optional[str] = None  # Opts in to speculative pre-generation (see speculative_generation)
 
 class ParseJDRequest(BaseModel):
     job_description_text: str
+    session_id: Optional[str] = None
+
+class JobSearchRequest(BaseModel):
+    resume_text: str
+    preferences: JobSearchPreferences
+    next_page_token: Optional[str] = None
 
 class GenerateInterviewPrepRequest(BaseModel):
     resume_structured: Dict[str, Any]  
@@ -60,6 +78,27 @@ class GenerateInterviewPrepRequest(BaseModel):
     industry: Optional[str] = None
     job_description: Optional[str] = None 
     raw_resume_text: Optional[str] = None 
+    bypass_cache: bool = False  # Regenerate even if a cached guide exists (the new guide is still cached)
+    session_id: Optional[str] = None  # Joins speculative work started by parse-resume/parse-jd
+    deadline_seconds: Optional[float] = Field(None, gt=0)  # Defaults to GUIDE_DEADLINE_SECONDS
+    skeleton: bool = False  # Return a guide skeleton at once; load sections via /sections/{section}/load
+
+class GuideSectionResponse(BaseModel):
+    section: str
+    ok: bool
+    cached: bool
+    timed_out: bool
+    elapsed: float
+    data: Optional[Dict[str, Any]] = None
+
+class InterviewPrepJobStatus(BaseModel):
+    job_id: str
+    status: Literal["queued", "running", "succeeded", "failed"]
+    attempts: int
+    max_attempts: int
+    error: Optional[str] = None
+    created_at: float
+    updated_at: float
 
 # Setup Logging
 logging.basicConfig(level=logging.DEBUG)
@@ -75,13 +114,36 @@ if not openai_api_key:
     print("Warning: OPENAI_API_KEY not found in environment variables")
     openai_api_key = "your_openai_api_key_here"  # Placeholder for development
 
-# Initialize OpenAI v1 client
-client = openai.OpenAI(api_key=openai_api_key)
-
 # Define the OpenAI model globally
 GPT_MODEL_V2 = "gpt-3.5-turbo-0125" # Or "gpt-4-turbo-preview" for higher quality
 
-app = FastAPI(debug=True)
+# Durable queue behind /api/interview-v2/jobs; see job_queue.
+GUIDE_JOB_KIND = "interview_prep_guide"
+job_queue: Optional[JobQueue] = None
+job_workers: Optional[WorkerPool] = None
+# Background section runs started by guide skeletons (referenced so they are not garbage collected).
+skeleton_prefetches: set = set()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global job_queue, job_workers
+    # Record/replay of OpenAI and SerpAPI traffic when HTTP_CASSETTE_MODE is set; see http_cassette.
+    http_cassette.install_from_env()
+    # One pooled LLM client for the whole process; see llm_gateway.
+    await llm_gateway.startup()
+    loop_lag.start()
+    job_queue = JobQueue()
+    if JOB_WORKERS > 0:
+        job_workers = WorkerPool(job_queue, {GUIDE_JOB_KIND: _run_guide_job})
+        await job_workers.start()
+    yield
+    if job_workers is not None:
+        await job_workers.stop()
+    await loop_lag.stop()
+    await llm_gateway.shutdown()
+    http_cassette.uninstall()
+
+app = FastAPI(debug=True, lifespan=lifespan)
 app.include_router(pdf_export_router)
 app.include_router(followup_qa_router)
 app.title = "Job Search Assistant API"
@@ -127,6 +189,36 @@ def get_job_search_agent():
 def get_interview_prep_agent():
     return InterviewPrepAgent(api_key=openai_api_key)
 
+@app.get("/api/metrics")
+async def get_metrics():
+    """Process-local performance counters for the LLM stack."""
+    return {
+        "llm_gateway": llm_gateway.stats(),
+        "llm_retry": llm_retry.stats(),
+        "llm_hedging": llm_hedging.stats(),
+        "model_router": model_router.stats(),
+        "structured_output": structured_output.stats(),
+        "llm_rate_limiter": llm_rate_limiter.stats(),
+        "single_flight": single_flight.stats(),
+        "request_scope": request_scope.stats(),
+        "prompt_budget": prompt_budget.stats(),
+        "prompt_registry": prompt_registry.stats(),
+        "guide_cache": guide_cache_stats(),
+        "section_cache": section_cache_stats(),
+        "shared_section_cache": shared_section_cache_stats(),
+        "resume_cache": resume_cache_stats(),
+        "jd_cache": jd_cache_stats(),
+        "parse_store": await asyncio.to_thread(parse_store.stats),
+        "speculative_generation": speculative_generation.stats(),
+        "http_cassette": http_cassette.stats(),
+        "event_loop_lag": loop_lag.stats(),
+        "guide_skeleton": {"prefetching": len(skeleton_prefetches)},
+        "jobs": {
+            "counts": await asyncio.to_thread(job_queue.counts) if job_queue is not None else {},
+            "workers": job_workers.stats() if job_workers is not None else None,
+        },
+    }
+
 @app.post("/api/upload-resume")
 async def handle_resume_upload(request: Request, file: UploadFile = File(...)):
     logger.info(f"handle_resume_upload: Received request headers: {request.headers}")
@@ -168,29 +260,44 @@ async def handle_resume_upload(request: Request, file: UploadFile = File(...)):
 async def handle_parse_resume(request: ParseResumeRequest):
     try:
         logging.debug(f"Parsing resume text. Length: {len(request.resume_text)}")
-        # Run the synchronous parse_resume_with_openai in a separate thread
-        parsed_resume = await asyncio.to_thread(parse_resume_with_openai, request.resume_text)
+        parsed_resume = await parse_resume_with_openai(request.resume_text)
         logging.info("Successfully parsed resume.")
+        speculative_generation.record_resume(request.session_id, parsed_resume, request.resume_text)
         return parsed_resume
     except Exception as e:
         logging.error(f"Error parsing resume: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Failed to parse resume: {str(e)}")
 
+@app.post("/api/job-search")
+async def job_search(request: JobSearchRequest, http_request: Request):
+    """SerpAPI Google Jobs search ranked against the resume, one page at a time."""
+    result = await request_scope.cancel_on_disconnect(
+        http_request,
+        search_jobs_serpapi_gpt(request.resume_text, request.preferences, request.next_page_token),
+        "job_search",
+    )
+    return {
+        "jobs": result.get("jobs", []),
+        "remaining": result.get("remaining") or result.get("remaining_jobs", []),
+        "next_page_token": result.get("next_page_token"),
+        "has_more": result.get("has_more", False),
+    }
+
 # New endpoint for parsing JD text
 @app.post("/api/interview-v2/parse-jd", response_model=JobDescriptionStructured) # Changed from JDStructured
 async def handle_parse_jd(request: ParseJDRequest):
     try:
         logging.debug(f"Parsing JD text. Length: {len(request.job_description_text)}")
-        # Run the synchronous parse_jd_with_openai in a separate thread
-        parsed_jd = await asyncio.to_thread(parse_jd_with_openai, request.job_description_text)
+        parsed_jd = await parse_jd_with_openai(request.job_description_text)
         logging.info("Successfully parsed JD.")
+        speculative_generation.record_jd(request.session_id, parsed_jd, request.job_description_text)
         return parsed_jd
     except Exception as e:
         logging.error(f"Error parsing JD: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Failed to parse JD: {str(e)}")
 
-@app.post("/api/interview-v2/generate", response_model=InterviewPrepV2Guide)
-async def generate_interview_prep(request: GenerateInterviewPrepRequest):
+def _structure_generate_request(request: GenerateInterviewPrepRequest):
+    """Validates the structured resume/JD payloads into Pydantic models."""
     logger.info(f"generate_interview_prep called with request: {request.company_name}, {request.industry}")
     # Log the types and content of structured data for debugging
     logger.debug(f"Type of request.resume_structured: {type(request.resume_structured)}")
@@ -214,392 +321,89 @@ async def generate_interview_prep(request: GenerateInterviewPrepRequest):
         logger.error(f"Error processing structured data: {e}", exc_info=True)
         # Consider if this should be a 500 or a more specific 4xx error
         raise HTTPException(status_code=500, detail=f"Error processing structured data: {str(e)}")
+    return resume_model, jd_model
+
+def _guide_cache_key(request: GenerateInterviewPrepRequest) -> str:
+    return guide_cache_key(
+        request.resume_structured,
+        request.jd_structured,
+        request.company_name,
+        request.industry,
+        request.job_description,
+        request.raw_resume_text,
+        GUIDE_CACHE_VERSION,
+    )
 
-    start_time = time.time()
-    logging.info(f"Received request for interview prep generation: {request.model_dump_json(indent=2)}")
-
-    top_resume_bullets = []
-    if resume_model and resume_model.positions:
-        for pos in resume_model.positions:
-            if pos.description:
-                bullets = [b.strip() for b in pos.description.replace('●', '\n').replace('*', '\n').split('\n') if b.strip()]
-                top_resume_bullets.extend(bullets)
-    top_resume_bullets_str = "\n- ".join(top_resume_bullets[:7]) 
-    logging.debug(f"Extracted top resume bullets for prompt B: {top_resume_bullets_str}")
-
-    company_industry_output = CompanyIndustrySectionModel()
-    role_success_output = RoleSuccessFactorsSection()
-    role_understanding_fit_assessment_output = RoleUnderstandingFitAssessmentSectionModel() # Changed from CandidateFitMatrixSectionModel
-    star_story_bank_output = StarStoryBankSectionModel()
-    technical_case_prep_output = TechnicalCasePrepSectionModel()
-    # mock_interview_output = MockInterviewSectionModel()
-    # offer_negotiation_output = OfferNegotiationSectionModel()
-    insider_cheat_sheet_output = InsiderCheatSheetSectionModel() # Added based on prompt B expectations
-    questions_to_ask_output = QuestionsToAskSectionModel() # Initialize questions_to_ask_output
-
-    role_success_built_output = RoleSuccessFactorsSection() # Initialize with default
-    try:
-        meaningful_resume_content_parts = []
-        if resume_model and resume_model.positions:
-            for pos in resume_model.positions:
-                if pos.description:
-                    meaningful_resume_content_parts.append(pos.description)
-        # Also consider adding skills, summary, etc. if deemed relevant for role_success evaluation
-        # For now, focusing on position descriptions as primary content.
-        meaningful_resume_content_str = "\n\n".join(meaningful_resume_content_parts)
-
-        # --- Pre-build Section 1: Company & Industry Insights ---
-        if request.company_name and jd_model and request.job_description:
-            logger.info(f"MAIN.PY: Before calling build_company_industry_section - Company: {request.company_name}")
-            try:
-                section_1_data = await build_company_industry_section(
-                    company_name=request.company_name,
-                    jd_structured=jd_model.model_dump(),
-                    job_description=request.job_description
-                )
-                logger.info(f"MAIN.PY: After calling build_company_industry_section - section_1_data: {section_1_data.model_dump_json(indent=2) if section_1_data else 'None'}")
-                if section_1_data:
-                    company_industry_output = CompanyIndustrySectionModel(**section_1_data.model_dump())
-                else:
-                    logger.warning("MAIN.PY: build_company_industry_section returned None or empty-like, using default for section_1.")
-            except Exception as e_s1:
-                logger.error(f"MAIN.PY: Error pre-building company_industry_section: {e_s1}", exc_info=True)
-        else:
-            logger.warning("MAIN.PY: Skipping pre-build of company_industry_section due to missing company_name, jd_model, or job_description.")
-
-        # --- Pre-build Section 3: Role Success Factors ---
-        if jd_model and meaningful_resume_content_str:
-            logger.info(f"MAIN.PY: Before calling build_role_success_section - jd_model.requirements: {jd_model.requirements if jd_model.requirements else 'N/A'}")
-            logger.info(f"MAIN.PY: Before calling build_role_success_section - jd_model.responsibilities: {jd_model.responsibilities if jd_model.responsibilities else 'N/A'}")
-            logger.info(f"MAIN.PY: Before calling build_role_success_section - meaningful_resume_content_str: {meaningful_resume_content_str[:750]}...")
-            try:
-                section_3_data = await build_role_success_section(jd_structured=jd_model, resume_bullets=meaningful_resume_content_str)
-                logger.info(f"MAIN.PY: After calling build_role_success_section - section_3_data: {section_3_data.model_dump_json(indent=2) if section_3_data else 'None'}")
-                if section_3_data:
-                    role_success_output = RoleSuccessFactorsSection(**section_3_data.model_dump())
-                else:
-                    logger.warning("MAIN.PY: build_role_success_section returned None or empty-like, using default for section_3.")
-            except Exception as e_s3:
-                logger.error(f"MAIN.PY: Error pre-building role_success_section: {e_s3}", exc_info=True)
-        else:
-            logger.warning("MAIN.PY: Skipping pre-build of role_success_section due to missing jd_model or resume_content.")
-
-        # --- Pre-build Section 4: Role Understanding & Fit Assessment ---
-        if jd_model and meaningful_resume_content_str:
-            logger.info(f"MAIN.PY: Before calling build_role_understanding_fit_assessment_section - jd_model info logged above.")
-            try:
-                section_4_data = await build_role_understanding_fit_assessment_section(jd_structured=jd_model, resume_bullets=meaningful_resume_content_str)
-                logger.info(f"MAIN.PY: After calling build_role_understanding_fit_assessment_section - section_4_data: {section_4_data.model_dump_json(indent=2) if section_4_data else 'None'}")
-                if section_4_data:
-                    role_understanding_fit_assessment_output = RoleUnderstandingFitAssessmentSectionModel(**section_4_data.model_dump())
-                else:
-                    logger.warning("MAIN.PY: build_role_understanding_fit_assessment_section returned None or empty-like, using default for section_4.")
-            except Exception as e_s4:
-                logger.error(f"MAIN.PY: Error pre-building role_understanding_fit_assessment_section: {e_s4}", exc_info=True)
-        else:
-            logger.warning("MAIN.PY: Skipping pre-build of role_understanding_fit_assessment_section due to missing jd_model or resume_content.") 
-
-        # --- Pre-build Section 5: STAR Story Bank ---
-        if resume_model and jd_model:
-            logger.info(f"MAIN.PY: Before calling build_star_story_bank_section - resume_model and jd_model available.")
-            try:
-                section_5_data = await build_star_story_bank_section(resume_structured=resume_model.model_dump(), jd_structured=jd_model.model_dump())
-                logger.info(f"MAIN.PY: After calling build_star_story_bank_section - section_5_data: {section_5_data.model_dump_json(indent=2) if section_5_data else 'None'}")
-                if section_5_data:
-                    star_story_bank_output = StarStoryBankSectionModel(**section_5_data.model_dump())
-                else:
-                    logger.warning("MAIN.PY: build_star_story_bank_section returned None or empty-like, using default for section_5.")
-            except Exception as e_s5:
-                logger.error(f"MAIN.PY: Error pre-building star_story_bank_section: {e_s5}", exc_info=True)
-        else:
-            logger.warning("MAIN.PY: Skipping pre-build of star_story_bank_section due to missing resume_model or jd_model.")
-
-        # --- Pre-build Section 6: Technical Case Prep ---
-        # if jd_model:
-        #     logger.info(f"MAIN.PY: Before calling build_technical_case_prep_section - jd_model available.")
-        #     # section_6_data = await build_technical_case_prep_section(jd_structured=jd_model)
-        #     # logger.info(f"MAIN.PY: After calling build_technical_case_prep_section - section_6_data: {section_6_data.model_dump_json(indent=2) if section_6_data else 'None'}")
-        #     # if section_6_data and section_6_data.prompts:
-        #     #     technical_case_prep_output = TechnicalCasePrepSectionModel(**section_6_data.model_dump())
-        #     # else:
-        #     #     logger.warning("MAIN.PY: build_technical_case_prep_section returned None, empty, or no prompts, using default for section_6.")
-        # else:
-        #     logger.warning("MAIN.PY: Skipping pre-build of technical_case_prep_section due to missing jd_model.")
-
-    except Exception as e:
-        logging.warning(f"Could not build role_success_section separately: {e}", exc_info=True)
-    role_success_factors_str_for_prompt_b = role_success_built_output.model_dump_json(indent=2) if role_success_built_output and (role_success_built_output.must_haves or role_success_built_output.nice_to_haves) else "{}"
-
-    try:
-        # Fetch recent news for Company A prompt - COMMENTED OUT FOR TESTING
-        # fetched_news = await fetch_recent_news(request.company_name, max_articles=5)
-        # formatted_news_articles_str = ""
-        # if fetched_news:
-        #     for article in fetched_news:
-        #         formatted_news_articles_str += f"Title: {article.get('title', 'N/A')}\n"
-        #         formatted_news_articles_str += f"Snippet: {article.get('snippet', 'N/A')}\n"
-        #         formatted_news_articles_str += f"URL: {article.get('url', 'N/A')}\n"
-        #         formatted_news_articles_str += f"Published Date: {article.get('published_at', 'N/A')}\n\n"
-        # else:
-        #     formatted_news_articles_str = "No recent news articles found or failed to fetch."
-        formatted_news_articles_str = "News fetching disabled for testing."
-        logger.debug(f"Formatted news for prompt A: {formatted_news_articles_str}")
-
-        user_prompt_params_for_a = {
-            "jd_full_text": request.job_description or "",
-            "company_name": request.company_name or "the company",
-            "industry": request.industry or "the relevant industry",
-            "role_title": jd_model.role_title if jd_model else "the role",
-            "fetched_news_articles": formatted_news_articles_str  # Added fetched news
-        }
-        messages_a = [
-            SystemMessage(content=INTERVIEW_PREP_V2_SYSTEM_PROMPT_A_COMPANY),
-            HumanMessage(content=INTERVIEW_PREP_V2_USER_PROMPT_TEMPLATE_A_COMPANY.format(**user_prompt_params_for_a))
-        ]
-        # company_industry_json_string_task = asyncio.create_task( # COMMENTED OUT FOR TESTING
-        #     _call_openai_api_with_retry(
-        #         messages=messages_a,
-        #         model_name="gpt-4o", 
-        #         max_tokens=1500
-        #     )
-        # )
-        company_industry_json_string_task = None # Ensure it's defined
-
-        jd_structured_json_for_prompt_b = jd_model.model_dump_json(indent=2) if jd_model else "{}"
-        resume_structured_json_for_prompt_b = resume_model.model_dump_json(indent=2) if resume_model else "{}"
-        
-        jd_summary_for_prompt_b = request.job_description[:1000] if request.job_description else ""
-        jd_requirements_for_prompt_b = ", ".join(jd_model.requirements) if jd_model and jd_model.requirements else ""
-
-        user_prompt_params_for_b = {
-            "jd_role_title": jd_model.role_title if jd_model else "the role",
-            "company_name": request.company_name or "the company",
-            "industry": request.industry or "the relevant industry",
-            "jd_structured_json": jd_structured_json_for_prompt_b,
-            "resume_structured_json": resume_structured_json_for_prompt_b,
-            "role_success_factors": role_success_factors_str_for_prompt_b,
-            "top_resume_bullets": top_resume_bullets_str,
-            "jd_summary": jd_summary_for_prompt_b, 
-            "jd_requirements": jd_requirements_for_prompt_b,
-            "resume_raw_text_snippet": request.raw_resume_text[:3000] if request.raw_resume_text else ""
-        }
-
-        logging.debug(f"LLM Call B - User Prompt Params: {json.dumps(user_prompt_params_for_b, indent=2)}")
-
-        messages_b = [
-            SystemMessage(content=INTERVIEW_PREP_V2_SYSTEM_PROMPT_B_CANDIDATE_ROLE),
-            HumanMessage(content=INTERVIEW_PREP_V2_USER_PROMPT_TEMPLATE_B_CANDIDATE_ROLE.format(**user_prompt_params_for_b))
-        ]
-        other_sections_json_string_task = asyncio.create_task(
-            _call_openai_api_with_retry(
-                messages=messages_b,
-                model_name="gpt-4o", 
-                max_tokens=4000 
-            )
-        )
-
-        llm_output_b = await other_sections_json_string_task
-
-        if company_industry_json_string_task:
-            llm_output_a_json_string = await company_industry_json_string_task
-            logging.info(f"LLM Call A raw content: {llm_output_a_json_string}")
-            try:
-                company_industry_data = json.loads(llm_output_a_json_string)
-                company_industry_output = CompanyIndustrySectionModel(**company_industry_data)
-                logging.info(f"LLM Call A parsed content: {company_industry_output}")
-            except json.JSONDecodeError as e:
-                logging.error(f"Error decoding JSON from LLM Call A: {e}. Raw string: {llm_output_a_json_string}")
-                # company_industry_output remains default if parsing fails
-            except Exception as e:
-                logging.error(f"Error processing LLM Call A output: {e}. Raw string: {llm_output_a_json_string}")
-        else:
-            logging.info("LLM Call A was skipped for testing. Using default company_industry_output.")
-
-        logging.info(f"LLM Call B raw content: {llm_output_b}")
-        llm_b_parsed_data = json.loads(llm_output_b)
-        logging.info(f"LLM Call B parsed content: {llm_b_parsed_data}")
-
-        role_success_final_output = RoleSuccessFactorsSection() # Initialize with default
-        if 'role_success_factors' in llm_b_parsed_data and llm_b_parsed_data['role_success_factors']:
-            try:
-                role_success_final_output = RoleSuccessFactorsSection(**llm_b_parsed_data['role_success_factors'])
-                logger.info("MAIN.PY: Populated role_success_final_output from LLM B data.")
-            except Exception as e_rs_llm:
-                logger.error(f"MAIN.PY: Error populating RoleSuccessFactorsSection from LLM B data: {e_rs_llm}. Data: {llm_b_parsed_data.get('role_success_factors')}", exc_info=True)
-                # Fallback to pre-built if LLM data is malformed
-                if role_success_output and (role_success_output.must_haves or role_success_output.nice_to_haves):
-                    role_success_final_output = role_success_output
-                    logger.info("MAIN.PY: Used pre-built role_success_output due to LLM B data error.")
-        elif role_success_output and (role_success_output.must_haves or role_success_output.nice_to_haves):
-             role_success_final_output = role_success_output # Use actual pre-built section 3 if LLM B didn't provide
-             logger.info("MAIN.PY: Used pre-built role_success_output as LLM B did not provide role_success_factors.")
-        else:
-            logger.warning("MAIN.PY: role_success_factors not found in LLM B and pre-built role_success_output is empty. Using default.")
-        # Ensure role_success_final_output remains its default initialized value by not reassigning here for isolated testing. -- This comment is now misleading, removing.
-        # --- Populate Section 6: Technical Case Prep ---
-        if 'section_6_technical_case_prep' in llm_b_parsed_data and llm_b_parsed_data['section_6_technical_case_prep']:
-            section_6_data = llm_b_parsed_data['section_6_technical_case_prep']
-            logger.info(f"Populating technical_case_prep_output from LLM B (using key 'section_6_technical_case_prep'). Data: {json.dumps(section_6_data, indent=2)}")
-            # <<< START DEBUG LOGGING FOR RAW SECTION 6 DATA >>>
-            logger.info(f"MAIN.PY: Raw section_6_data from LLM B before Pydantic model: {section_6_data}")
-            logger.info(f"MAIN.PY: Type of section_6_data: {type(section_6_data)}")
-            if isinstance(section_6_data, dict):
-                logger.info(f"MAIN.PY: Keys in section_6_data: {section_6_data.keys()}")
-                # Check for both 'prompts' and 'practice_prompts' as the key from LLM
-                prompts_key_found = None
-                if 'prompts' in section_6_data:
-                    prompts_key_found = 'prompts'
-                elif 'practice_prompts' in section_6_data:
-                    prompts_key_found = 'practice_prompts'
-                
-                if prompts_key_found:
-                    logger.info(f"MAIN.PY: Raw '{prompts_key_found}' field in section_6_data: {section_6_data.get(prompts_key_found)}")
-                    logger.info(f"MAIN.PY: Type of '{prompts_key_found}' field: {type(section_6_data.get(prompts_key_found))}")
-                else:
-                    logger.warning("MAIN.PY: Neither 'prompts' nor 'practice_prompts' key FOUND in section_6_data.")
-            # <<< END DEBUG LOGGING FOR RAW SECTION 6 DATA >>>
-            # The LLM is now instructed to provide structured prompts under 'practice_prompts'.
-            # These will be directly used for the 'prompts' field of TechnicalCasePrepSectionModel.
-            if 'practice_prompts' in section_6_data:
-                # LLM provides structured prompts (list of dicts) under 'practice_prompts'
-                section_6_data['prompts'] = section_6_data.pop('practice_prompts')
-                logger.info("MAIN.PY: Moved structured 'practice_prompts' from LLM to 'prompts' field.")
-            elif 'prompts' in section_6_data:
-                # If 'practice_prompts' isn't there but 'prompts' is, log that we're using it.
-                # This assumes it's already in the correct format if present.
-                logger.info("MAIN.PY: Using existing 'prompts' field from LLM data for TechnicalCasePrepSectionModel.")
-            else:
-                # If neither 'practice_prompts' nor 'prompts' is in section_6_data,
-                # ensure 'prompts' key exists with an empty list for the Pydantic model.
-                section_6_data['prompts'] = []
-                logger.info("MAIN.PY: Neither 'practice_prompts' nor 'prompts' found in LLM data for section 6. Initializing 'prompts' as empty list.")
-            try:
-                technical_case_prep_output = TechnicalCasePrepSectionModel(**section_6_data)
-            except Exception as e_model_val:
-                logger.error(f"MAIN.PY: Pydantic validation error for TechnicalCasePrepSectionModel: {e_model_val}", exc_info=True)
-                logger.error(f"MAIN.PY: Data that caused validation error for TechnicalCasePrepSectionModel: {section_6_data}")
-                # Fallback to default if validation fails, to maintain previous behavior of not crashing
-                technical_case_prep_output = TechnicalCasePrepSectionModel()
-        else:
-            logger.warning("LLM B response missing or empty 'section_6_technical_case_prep'. Using default.")
-
-        # --- Populate Section 7: Mock Interview ---
-        # if 'section_7_mock_interview' in llm_b_parsed_data and llm_b_parsed_data['section_7_mock_interview']:
-        #     mock_interview_output = MockInterviewSectionModel(**llm_b_parsed_data['section_7_mock_interview'])
-        # else:
-        #     logger.warning("LLM B response missing 'section_7_mock_interview'. Using default.")
-        # if 'insider_cheat_sheet' in llm_b_parsed_data:
-        #     insider_cheat_sheet_output = InsiderCheatSheetSectionModel(**llm_b_parsed_data['insider_cheat_sheet'])
-        if 'section_9_questions_to_ask' in llm_b_parsed_data and llm_b_parsed_data['section_9_questions_to_ask']:
-            try:
-                questions_to_ask_output = QuestionsToAskSectionModel(**llm_b_parsed_data['section_9_questions_to_ask'])
-                logger.info("Successfully populated QuestionsToAskSectionModel from LLM B data.")
-            except Exception as e:
-                logger.error(f"Error instantiating QuestionsToAskSectionModel from LLM B data: {e}. Data: {llm_b_parsed_data.get('section_9_questions_to_ask')}", exc_info=True)
-                # Keep the default initialized questions_to_ask_output
-        else:
-            logger.warning("LLM B response missing 'section_9_questions_to_ask' or it's empty. Using default QuestionsToAskSectionModel.")
-        if 'section_8_offer_negotiation' in llm_b_parsed_data and llm_b_parsed_data['section_8_offer_negotiation']:
-            try:
-                offer_negotiation_output = OfferNegotiationSectionModel(**llm_b_parsed_data['section_8_offer_negotiation'])
-                logger.info("Successfully populated OfferNegotiationSectionModel from LLM B data.")
-            except Exception as e:
-                logger.error(f"Error instantiating OfferNegotiationSectionModel from LLM B data: {e}. Data: {llm_b_parsed_data.get('section_8_offer_negotiation')}", exc_info=True)
-                # Keep the default initialized offer_negotiation_output
-        else:
-            logger.warning("LLM B response missing 'section_8_offer_negotiation' or it's empty. Using default OfferNegotiationSectionModel.")
+def _build_plan(request: GenerateInterviewPrepRequest, resume_model, jd_model, lazy_sections: bool = False):
+    if speculative_generation.claim(request.session_id):
+        logger.info(f"Attaching to speculative pre-generation for session {request.session_id}.")
+    # Every independent section starts at once; see interview_prep_v2_orchestrator.
+    return build_interview_prep_plan(
+        resume_model=resume_model,
+        jd_model=jd_model,
+        company_name=request.company_name,
+        industry=request.industry,
+        job_description=request.job_description,
+        raw_resume_text=request.raw_resume_text,
+        use_cache=not request.bypass_cache,
+        deadline_seconds=request.deadline_seconds or GUIDE_DEADLINE_SECONDS,
+        lazy_sections=lazy_sections
+    )
 
-    except json.JSONDecodeError as e:
-        llm_a_content = locals().get('llm_output_a_json_string', 'N/A')
-        llm_b_content = locals().get('llm_output_b', 'N/A')
-        logging.error(f"JSON parsing error: {e}. Raw LLM A output: {llm_a_content}. Raw LLM B output: {llm_b_content}", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"Error parsing LLM response: {str(e)}")
-    except Exception as e:
-        logging.error(f"Error during LLM calls or processing: {e}", exc_info=True)
-        user_prompt_params_for_a_val = locals().get('user_prompt_params_for_a', 'N/A') # This var was not defined above
-        user_prompt_params_for_b_val = locals().get('user_prompt_params_for_b', 'N/A')
-        logging.error(f"LLM A user_prompt_params: {user_prompt_params_for_a_val}")
-        logging.error(f"LLM B user_prompt_params: {user_prompt_params_for_b_val}")
-        raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {str(e)}")
-
-    guide_section_3_role_success: Optional[RoleSuccessFactorsSection] = None
-    if role_success_final_output and (role_success_final_output.must_haves or role_success_final_output.nice_to_haves):
-        guide_section_3_role_success = RoleSuccessFactorsSection(
-            must_haves=role_success_final_output.must_haves,
-            nice_to_haves=role_success_final_output.nice_to_haves
-        )
-    elif not role_success_final_output.must_haves and not role_success_final_output.nice_to_haves:
-        # If it's an empty model, ensure it's None or an empty valid model for the guide
-        guide_section_3_role_success = RoleSuccessFactorsSection() # or None, depending on desired output for empty
-
-    # --- LLM Call C: Generate Insider Cheat Sheet ---
-    logger.info("Initiating LLM Call C for Insider Cheat Sheet")
-    parsed_response_c = None
-    try:
-        role_title_for_c = jd_model.role_title if jd_model and jd_model.role_title else request.role_title
-        if not role_title_for_c:
-            logger.warning("Role title for Call C is missing, Insider Cheat Sheet might be generic.")
-            role_title_for_c = "the specified role" # Fallback role title
-
-        user_message_c_content = (
-            f"Company Name: {request.company_name}\n"
-            f"Role Title: {role_title_for_c}\n"
-            f"Industry: {request.industry if request.industry else 'Not specified'}"
-        )
-        user_message_c = HumanMessage(content=user_message_c_content)
-        system_message_c = SystemMessage(content=INTERVIEW_PREP_V2_SYSTEM_PROMPT_C_INSIDER_CHEAT_SHEET)
-
-        logger.debug(f"Call C - System Prompt: {system_message_c.content}")
-        logger.debug(f"Call C - User Message: {user_message_c.content}")
-
-        response_c_json_str = await _call_openai_api_with_retry(
-            messages=[system_message_c, user_message_c],
-            model_name="gpt-4-turbo-preview", # Ensure this model has browsing capabilities
-            temperature=0.0
-        )
-        
-        if response_c_json_str:
-            logger.info(f"LLM Call C successful. Response: {response_c_json_str[:500]}...")
-            parsed_response_c = json.loads(response_c_json_str)
-            # Directly assign if the structure matches InsiderCheatSheetSectionModel
-            # Pydantic will validate; if it fails, the except block below will catch it.
-            insider_cheat_sheet_output = InsiderCheatSheetSectionModel(**parsed_response_c)
+def _log_prefetch_failure(task: asyncio.Task) -> None:
+    skeleton_prefetches.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"Guide skeleton prefetch failed: {task.exception()}")
+
+def _guide_skeleton(request: GenerateInterviewPrepRequest, resume_model, jd_model) -> InterviewPrepV2Guide:
+    """
+    Returns the guide with every already-cached section filled in and the
+    state of the others. Cheap sections start building in the background (a
+    later /load joins them in flight or reads them from the section cache);
+    LAZY_SECTION_NAMES are left for the client to request.
+    """
+    plan = _build_plan(request, resume_model, jd_model, lazy_sections=True)
+    cached = plan.peek(GUIDE_SECTION_NAMES)
+    states = {}
+    for name in GUIDE_SECTION_NAMES:
+        if name in cached:
+            states[name] = SECTION_READY
+        elif name in LAZY_SECTION_NAMES:
+            states[name] = SECTION_ON_DEMAND
         else:
-            logger.warning("LLM Call C did not return content. Insider Cheat Sheet will use defaults.")
+            states[name] = SECTION_LOADING
+    prefetch = [name for name, state in states.items() if state == SECTION_LOADING]
+    if prefetch:
+        task = asyncio.create_task(plan.run(targets=prefetch), name="guide-skeleton-prefetch")
+        skeleton_prefetches.add(task)
+        task.add_done_callback(_log_prefetch_failure)
+    logger.info(f"Returning guide skeleton; section states: {states}")
+    return assemble_interview_prep_guide(cached, resume_model, jd_model, section_states=states)
+
+def _failed_nodes(section_results) -> List[str]:
+    """Plan nodes (sections and the LLM calls behind them) that raised or timed out.
+
+    Builders raise on any LLM failure instead of returning placeholder text,
+    so a guide is only cached when this is empty; otherwise a transient
+    failure would be served again for the whole TTL.
+    """
+    return [result.name for result in section_results if not result.ok]
+
+async def _run_plan_to_guide(plan, resume_model, jd_model, cache_key: str) -> InterviewPrepV2Guide:
+    start_time = time.time()
+    section_results = await plan.run()
+    failed_sections = _failed_nodes(section_results.values())
+    if failed_sections:
+        logger.warning(f"Sections that fell back to defaults: {failed_sections}")
+    timed_out_sections = [name for name, result in section_results.items() if result.timed_out]
 
-    except json.JSONDecodeError as e:
-        logger.error(f"Error decoding JSON from LLM Call C: {e}. Response string: {response_c_json_str}", exc_info=True)
-        # Keep default insider_cheat_sheet_output
-    except ValidationError as ve:
-        logger.error(f"Pydantic validation error for InsiderCheatSheetSectionModel from Call C: {ve.errors()}\nRaw Data: {parsed_response_c}", exc_info=True)
-        # Keep default insider_cheat_sheet_output. This might indicate a mismatch between prompt output and Pydantic model.
-    except Exception as e:
-        logger.error(f"An unexpected error occurred during LLM Call C for Insider Cheat Sheet: {e}", exc_info=True)
-        # Keep default insider_cheat_sheet_output
-    
     # --- Assemble the final guide object ---
     logger.info("Attempting to assemble the final_guide object.")
-    final_guide = InterviewPrepV2Guide(
-        section_0_welcome=WelcomeSectionModel(
-            title="Welcome to Your AI-Powered Interview Prep!",
-            introduction="This guide is designed to help you ace your interview. Let's get started."
-        ),
-        section_1_company_industry=company_industry_output,
-        section_3_role_success=guide_section_3_role_success, 
-        section_4_role_understanding_fit_assessment=role_understanding_fit_assessment_output, 
-        section_5_star_story_bank=star_story_bank_output, 
-        section_6_technical_case_prep=technical_case_prep_output, # Prioritize pre-built section 6
-        # section_7_mock_interview=mock_interview_output,
-        section_8_insider_cheat_sheet=insider_cheat_sheet_output,
-        section_9_questions_to_ask=questions_to_ask_output,
-        # section_10_offer_negotiation=offer_negotiation_output,
-        export_share=ExportShareSectionModel( 
-            export_options=["PDF", "Markdown"],
-            share_platforms=["Email", "LinkedIn"],
-            shareable_link="(Coming Soon!)"
-        ),
-        resume_structured=resume_model, 
-        job_description_structured=jd_model
+    final_guide = assemble_interview_prep_guide(
+        {name: result.value for name, result in section_results.items()},
+        resume_model,
+        jd_model,
+        timed_out_sections
     )
 
     try:
@@ -613,60 +417,188 @@ async def generate_interview_prep(request: GenerateInterviewPrepRequest):
 
     logger.info(f"FINAL GUIDE JSON OUTPUT:\n{final_guide.model_dump_json(indent=2)}")
 
+    if not failed_sections:
+        set_cached_guide(cache_key, final_guide.model_dump_json())
+
     end_time = time.time()
     logging.info(f"Interview prep generation completed in {end_time - start_time:.2f} seconds.")
     return final_guide
 
-async def _call_openai_api_with_retry(messages: list, model_name: str, max_tokens: int = 3000, max_retries: int = 3, delay_seconds: int = 2, temperature: float = 0.2):
-    client = openai.AsyncOpenAI(api_key=openai_api_key)
-    last_exception = None
-
-    formatted_messages = []
-    for msg in messages:
-        if hasattr(msg, 'type') and hasattr(msg, 'content'): 
-            role = msg.type
-            if role == 'human':
-                role = 'user'
-            formatted_messages.append({"role": role, "content": msg.content})
-        elif isinstance(msg, dict) and 'role' in msg and 'content' in msg: 
-            formatted_messages.append(msg)
-        else:
-            logging.error(f"Skipping unrecognised message type in _call_openai_api_with_retry: {type(msg)}")
+@app.post("/api/interview-v2/generate", response_model=InterviewPrepV2Guide)
+async def generate_interview_prep(request: GenerateInterviewPrepRequest, http_request: Request):
+    resume_model, jd_model = _structure_generate_request(request)
+    if request.skeleton:
+        return _guide_skeleton(request, resume_model, jd_model)
+
+    cache_key = _guide_cache_key(request)
+    if not request.bypass_cache:
+        cached_guide = get_cached_guide(cache_key)
+        if cached_guide is not None:
+            logger.info("Returning cached interview prep guide.")
+            return Response(content=cached_guide, media_type="application/json")
+
+    logging.info(f"Received request for interview prep generation: {request.model_dump_json(indent=2)}")
+    plan = _build_plan(request, resume_model, jd_model)
+    return await request_scope.cancel_on_disconnect(
+        http_request, _run_plan_to_guide(plan, resume_model, jd_model, cache_key), "generate"
+    )
 
-    for attempt in range(max_retries):
+@app.post("/api/interview-v2/sections/{section}", response_model=InterviewPrepV2Guide)
+async def regenerate_interview_prep_section(section: str, request: GenerateInterviewPrepRequest, http_request: Request):
+    """
+    Regenerates one guide section (and the intermediate LLM calls it is built
+    from) while every other section is served from the section cache.
+    Returns the full guide with the new section in place.
+    """
+    if section not in GUIDE_SECTION_NAMES:
+        raise HTTPException(status_code=404, detail=f"Unknown section '{section}'. Expected one of: {', '.join(GUIDE_SECTION_NAMES)}")
+    resume_model, jd_model = _structure_generate_request(request)
+    logging.info(f"Received request to regenerate section {section}.")
+    plan = _build_plan(request, resume_model, jd_model)
+    plan.refresh(section)
+    return await request_scope.cancel_on_disconnect(
+        http_request, _run_plan_to_guide(plan, resume_model, jd_model, _guide_cache_key(request)), "regenerate_section"
+    )
+
+@app.post("/api/interview-v2/sections/{section}/load", response_model=GuideSectionResponse)
+async def load_interview_prep_section(section: str, request: GenerateInterviewPrepRequest, http_request: Request):
+    """
+    Builds one section of a guide skeleton, or serves it from the section
+    cache, and returns only that section. Uses the same request body as
+    /generate.
+    """
+    if section not in GUIDE_SECTION_NAMES:
+        raise HTTPException(status_code=404, detail=f"Unknown section '{section}'. Expected one of: {', '.join(GUIDE_SECTION_NAMES)}")
+    resume_model, jd_model = _structure_generate_request(request)
+    plan = _build_plan(request, resume_model, jd_model, lazy_sections=True)
+    results = await request_scope.cancel_on_disconnect(http_request, plan.run(targets=[section]), "load_section")
+    result = results[section]
+    return GuideSectionResponse(
+        section=section,
+        ok=result.ok,
+        cached=result.cached,
+        timed_out=result.timed_out,
+        elapsed=round(result.elapsed, 3),
+        data=result.value.model_dump(mode="json") if result.value is not None else None,
+    )
+
+async def _run_guide_job(payload: Dict[str, Any]) -> str:
+    """Worker-side body of an /api/interview-v2/jobs job; returns the guide JSON."""
+    request = GenerateInterviewPrepRequest(**payload)
+    resume_model, jd_model = _structure_generate_request(request)
+    cache_key = _guide_cache_key(request)
+    if not request.bypass_cache:
+        cached_guide = get_cached_guide(cache_key)
+        if cached_guide is not None:
+            return cached_guide
+    plan = _build_plan(request, resume_model, jd_model)
+    final_guide = await _run_plan_to_guide(plan, resume_model, jd_model, cache_key)
+    return final_guide.model_dump_json()
+
+def _get_job_or_404(job_id: str) -> Dict[str, Any]:
+    job = job_queue.get(job_id) if job_queue is not None else None
+    if job is None or job["kind"] != GUIDE_JOB_KIND:
+        raise HTTPException(status_code=404, detail=f"Unknown job '{job_id}'.")
+    return job
+
+@app.post("/api/interview-v2/jobs", response_model=InterviewPrepJobStatus, status_code=202)
+async def create_interview_prep_job(request: GenerateInterviewPrepRequest):
+    """
+    Queues guide generation and returns immediately. Poll
+    /api/interview-v2/jobs/{job_id} for progress and fetch the guide from
+    /api/interview-v2/jobs/{job_id}/result once the job has succeeded.
+    """
+    if job_queue is None:
+        raise HTTPException(status_code=503, detail="Job queue is not available.")
+    _structure_generate_request(request)  # Reject malformed payloads now rather than in a worker
+    job_id = await asyncio.to_thread(job_queue.enqueue, GUIDE_JOB_KIND, request.model_dump())
+    logger.info(f"Queued interview prep job {job_id}.")
+    return await get_interview_prep_job(job_id)
+
+@app.get("/api/interview-v2/jobs/{job_id}", response_model=InterviewPrepJobStatus)
+async def get_interview_prep_job(job_id: str):
+    job = await asyncio.to_thread(_get_job_or_404, job_id)
+    return InterviewPrepJobStatus(job_id=job["id"], **{k: job[k] for k in ("status", "attempts", "max_attempts", "error", "created_at", "updated_at")})
+
+@app.get("/api/interview-v2/jobs/{job_id}/result", response_model=InterviewPrepV2Guide)
+async def get_interview_prep_job_result(job_id: str):
+    job = await asyncio.to_thread(_get_job_or_404, job_id)
+    if job["status"] == SUCCEEDED:
+        return Response(content=job["result"], media_type="application/json")
+    if job["status"] == FAILED:
+        raise HTTPException(status_code=500, detail=f"Job failed after {job['attempts']} attempts: {job['error']}")
+    raise HTTPException(status_code=409, detail=f"Job is still {job['status']}.")
+
+def _ndjson_event(event: str, **payload) -> bytes:
+    return (json.dumps({"event": event, **payload}) + "\n").encode("utf-8")
+
+@app.post("/api/interview-v2/generate/stream")
+async def generate_interview_prep_stream(request: GenerateInterviewPrepRequest):
+    """
+    Streaming variant of /api/interview-v2/generate (NDJSON, one event per line).
+
+    Events: `start` (sections to expect), one `section` event per guide section
+    as soon as its builder completes, then a final `guide` event carrying the
+    assembled InterviewPrepV2Guide (or an `error` event if validation fails).
+    A cached guide is replayed through the same events, with `cached` set on `start`.
+    If the client disconnects, Starlette cancels the stream and with it every
+    section still running.
+    """
+    resume_model, jd_model = _structure_generate_request(request)
+    cache_key = _guide_cache_key(request)
+    cached_guide = None if request.bypass_cache else get_cached_guide(cache_key)
+
+    async def cached_event_stream():
+        guide = json.loads(cached_guide)
+        sections = [name for name in GUIDE_SECTION_NAMES if guide.get(name) is not None]
+        yield _ndjson_event("start", sections=sections, cached=True)
+        for name in sections:
+            yield _ndjson_event("section", section=name, ok=True, elapsed=0.0, data=guide[name])
+        yield _ndjson_event("guide", data=guide)
+
+    async def event_stream(plan):
+        start_time = time.time()
+        yield _ndjson_event("start", sections=[name for name in GUIDE_SECTION_NAMES if name in plan.names])
+        section_values = {}
+        timed_out_sections = []
+        results = []
+        async for result in plan.as_completed():
+            section_values[result.name] = result.value
+            results.append(result)
+            if result.timed_out:
+                timed_out_sections.append(result.name)
+            if result.name in GUIDE_SECTION_NAMES:
+                yield _ndjson_event(
+                    "section",
+                    section=result.name,
+                    ok=result.ok,
+                    cached=result.cached,
+                    timed_out=result.timed_out,
+                    elapsed=round(result.elapsed, 3),
+                    data=result.value.model_dump(mode="json")
+                )
+        final_guide = assemble_interview_prep_guide(section_values, resume_model, jd_model, timed_out_sections)
         try:
-            logging.debug(f"Attempt {attempt + 1} to call OpenAI API with model {model_name}.")
-            response = await client.chat.completions.create(
-                model=model_name,
-                messages=formatted_messages,  
-                response_format={"type": "json_object"}, 
-                temperature=temperature,
-                max_tokens=max_tokens 
-            )
-            response_content = response.choices[0].message.content
-            if response_content:
-                try:
-                    parsed_json = json.loads(response_content)
-                    logging.debug(f"OpenAI API call successful. Response sample: {json.dumps(parsed_json, indent=2)[:500]}...")
-                except json.JSONDecodeError:
-                    logging.debug(f"OpenAI API call successful. Response (non-JSON) sample: {response_content[:500]}...")
-                return response_content
-            else:
-                logging.warning("OpenAI API returned empty content.")
-                last_exception = Exception("OpenAI API returned empty content.")
+            final_guide.model_validate(final_guide.model_dump())
         except Exception as e:
-            logging.error(f"Error calling OpenAI API (attempt {attempt + 1}/{max_retries}): {e}")
-            last_exception = e
-            if attempt < max_retries - 1:
-                logging.info(f"Retrying in {delay_seconds} seconds...")
-                await asyncio.sleep(delay_seconds)
-            else:
-                logging.error("Max retries reached for OpenAI API call.")
-                break 
-
-    if last_exception:
-        logging.error(f"Failed to get response from OpenAI API after {max_retries} attempts. Last error: {last_exception}")
-    return None 
+            logging.error(f"Validation error for streamed final_guide: {e}", exc_info=True)
+            yield _ndjson_event("error", detail=f"Final guide validation failed: {str(e)}")
+            return
+        if not _failed_nodes(results):
+            set_cached_guide(cache_key, final_guide.model_dump_json())
+        logging.info(f"Streamed interview prep generation completed in {time.time() - start_time:.2f} seconds.")
+        yield _ndjson_event("guide", data=final_guide.model_dump(mode="json"))
+
+    if cached_guide is not None:
+        logger.info("Replaying cached interview prep guide as a stream.")
+        stream = cached_event_stream()
+    else:
+        stream = event_stream(_build_plan(request, resume_model, jd_model))
+    return StreamingResponse(
+        stream,
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 # Models
 class JobPreference(BaseModel):
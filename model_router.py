@@ -0,0 +1,181 @@
+"""
+model_router.py
+
+Per-section model routing.
+
+Each LLM call site names its section and the router picks the model from a
+policy table (SECTION_ROUTES, overridable with the MODEL_ROUTES env JSON).
+A section's route lists tiers from cheapest to strongest. A tier is skipped
+when the prompt is larger than its `max_input_tokens`, when its model already
+has `ROUTER_MAX_QUEUE_DEPTH` calls waiting on the rate limiter, or when its
+observed p95 latency is above its `max_p95_seconds`. If the chosen model's
+output fails the caller's validation (or the call fails outright), the next
+stronger tier is tried.
+
+Call sites that pass a `response_model` get a `response_format` from
+structured_output for each model called, hedges included (a strict JSON
+schema where the model supports it), and their output validated, with
+repair, as that model.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Type
+
+from pydantic import BaseModel
+
+import llm_gateway
+import llm_rate_limiter
+import structured_output
+from llm_hedging import LatencyTracker
+
+logger = logging.getLogger(__name__)
+
+ROUTER_MAX_QUEUE_DEPTH = int(os.getenv("ROUTER_MAX_QUEUE_DEPTH", "8"))
+
+# Tiers are ordered cheapest first; the last tier is the fallback of last resort.
+SECTION_ROUTES: Dict[str, List[Dict[str, Any]]] = {
+    "role_success": [
+        {"model": "gpt-4o-mini", "max_input_tokens": 8000, "max_p95_seconds": 30},
+        {"model": "gpt-4-turbo"},
+    ],
+    "role_understanding_fit": [
+        {"model": "gpt-4o-mini", "max_input_tokens": 8000, "max_p95_seconds": 30},
+        {"model": "gpt-4-turbo"},
+    ],
+    "star_story_bank": [
+        {"model": "gpt-4o-mini", "max_input_tokens": 8000, "max_p95_seconds": 30},
+        {"model": "gpt-4-turbo"},
+    ],
+    "technical_case_prep": [
+        {"model": "gpt-4o", "max_p95_seconds": 60},
+        {"model": "gpt-4-turbo-preview"},
+    ],
+    "prompt_b": [
+        {"model": "gpt-4o"},
+        {"model": "gpt-4-turbo"},
+    ],
+    "prompt_c": [
+        {"model": "gpt-4o-mini", "max_input_tokens": 4000, "max_p95_seconds": 30},
+        {"model": "gpt-4-turbo-preview"},
+    ],
+    "parse_resume": [{"model": "gpt-3.5-turbo-1106"}],
+    "parse_jd": [{"model": "gpt-3.5-turbo-1106"}],
+}
+SECTION_ROUTES.update(json.loads(os.getenv("MODEL_ROUTES", "{}")))
+
+# Part of cache keys for anything generated through the router.
+ROUTES_VERSION = hashlib.sha256(json.dumps(SECTION_ROUTES, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+
+_latency: Dict[str, LatencyTracker] = {}
+_stats: Dict[str, Dict[str, Any]] = {}
+_lock = threading.Lock()
+
+
+def _tracker(model: str) -> LatencyTracker:
+    with _lock:
+        return _latency.setdefault(model, LatencyTracker())
+
+
+def _count(section: str, key: str) -> None:
+    with _lock:
+        entry = _stats.setdefault(section, {"calls": 0, "escalations": 0, "validation_failures": 0, "call_failures": 0, "models": {}})
+        entry[key] += 1
+
+
+def _skip_reason(tier: Dict[str, Any], input_tokens: int) -> Optional[str]:
+    model = tier["model"]
+    if tier.get("max_input_tokens") is not None and input_tokens > tier["max_input_tokens"]:
+        return f"{input_tokens} input tokens > {tier['max_input_tokens']}"
+    queued = llm_rate_limiter.get_limiter(model).snapshot()["waiting"]
+    if queued >= ROUTER_MAX_QUEUE_DEPTH:
+        return f"{queued} calls queued"
+    p95 = _tracker(model).percentile(0.95)
+    if tier.get("max_p95_seconds") is not None and p95 is not None and p95 > tier["max_p95_seconds"]:
+        return f"p95 {p95:.1f}s > {tier['max_p95_seconds']}s"
+    return None
+
+
+def section_models(section: str) -> List[str]:
+    """Every model configured for `section`, cheapest first, regardless of current load.
+
+    Use this rather than `choose` in cache keys: the same input must map to
+    the same key whichever tier happens to be routed to right now.
+    """
+    return [tier["model"] for tier in SECTION_ROUTES[section]]
+
+
+def choose(section: str, input_tokens: int) -> List[str]:
+    """Models to try for `section`, in order: the routed pick, then its stronger fallbacks."""
+    tiers = SECTION_ROUTES[section]
+    for index, tier in enumerate(tiers):
+        reason = _skip_reason(tier, input_tokens)
+        if reason is None:
+            return [t["model"] for t in tiers[index:]]
+        logger.debug(f"model_router[{section}]: skipping {tier['model']} ({reason}).")
+    # Every tier is busy or slow: the strongest one is the safest bet.
+    return [tiers[-1]["model"]]
+
+
+async def chat_completion(section: str, validate: Optional[Callable[[Optional[str]], Any]] = None,
+                          response_model: Optional[Type[BaseModel]] = None, **kwargs):
+    """llm_gateway.chat_completion on the model routed for `section`.
+
+    `validate` receives the response content and raises if it is unusable;
+    the call is then repeated on the next stronger tier. With `response_model`
+    the response format is derived from the model and `validate` defaults to
+    structured_output.parse. The last tier's response is returned even if it
+    fails validation, so callers keep their own error handling; they should
+    parse it with `record=False` since it has been counted here already.
+    """
+    if response_model is not None and validate is None:
+        validate = partial(structured_output.parse, section, model_cls=response_model)
+    models = choose(section, llm_rate_limiter.estimate_prompt_tokens(kwargs))
+    _count(section, "calls")
+    for attempt, model in enumerate(models):
+        last = attempt == len(models) - 1
+        if attempt:
+            _count(section, "escalations")
+        start = time.perf_counter()
+        try:
+            response = await llm_gateway.chat_completion(response_model=response_model, **{**kwargs, "model": model})
+        except Exception as e:
+            _count(section, "call_failures")
+            if last:
+                raise
+            logger.warning(f"model_router[{section}]: {model} call failed ({e}); escalating to {models[attempt + 1]}.")
+            continue
+        _tracker(model).record(time.perf_counter() - start)
+        if validate is None:
+            _record_model(section, model)
+            return response
+        try:
+            validate(response.choices[0].message.content)
+        except Exception as e:
+            _count(section, "validation_failures")
+            if not last:
+                logger.warning(f"model_router[{section}]: {model} output failed validation ({e}); escalating to {models[attempt + 1]}.")
+                continue
+        _record_model(section, model)
+        return response
+
+
+def _record_model(section: str, model: str) -> None:
+    with _lock:
+        models = _stats[section]["models"]
+        models[model] = models.get(model, 0) + 1
+
+
+def stats() -> Dict[str, Any]:
+    with _lock:
+        sections = {section: {**entry, "models": dict(entry["models"])} for section, entry in _stats.items()}
+        latency = {model: tracker.percentile(0.95, min_samples=1) for model, tracker in _latency.items()}
+    return {
+        "routes_version": ROUTES_VERSION,
+        "sections": sections,
+        "p95_seconds": {model: round(p95, 3) for model, p95 in latency.items() if p95 is not None},
+    }
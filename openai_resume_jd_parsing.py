@@ -1,9 +1,11 @@
-import openai
-import os
+import asyncio
 import json
-from typing import Dict
-
-openai.api_key = os.getenv("OPENAI_API_KEY")
+import os
+from typing import Dict, Optional
+import llm_gateway
+import llm_tokens
+import model_router
+import parse_store
 
 RESUME_FUNCTION = {
     "name": "parse_resume",
@@ -63,7 +65,54 @@ JD_FUNCTION = {
 
 from validation import validate_resume, validate_jd
 from chunking import chunk_resume_text, chunk_jd_text
-from cache import get_cached_resume, set_cached_resume, get_cached_jd, set_cached_jd
+from cache import get_cached_resume, set_cached_resume, get_cached_jd, set_cached_jd, hash_payload
+
+def _routed_model(section: str, text: str) -> str:
+    """Model picked by model_router for parsing `text`."""
+    return model_router.choose(section, llm_tokens.count_tokens(text))[0]
+
+# Resumes longer than this are split with chunk_resume_text and the chunks parsed concurrently.
+RESUME_CHUNKING_THRESHOLD = 10000
+# Upper bound on concurrent chunk extractions for one resume.
+PARSE_CHUNK_CONCURRENCY = int(os.getenv("PARSE_CHUNK_CONCURRENCY", "4"))
+
+RESUME_SYSTEM_PROMPT = "You are an expert data extractor. When called to parse a resume, return only JSON matching the `parse_resume` schema."
+RESUME_CHUNK_SYSTEM_PROMPT = (
+    "You are an expert data extractor. Extract information from this resume chunk. Return only JSON matching "
+    "the `parse_resume` schema. This is chunk {index} of {total}."
+)
+JD_SYSTEM_PROMPT = "You are an expert data extractor. When called to parse a job description, return only JSON matching the `parse_job_description` schema."
+
+def _parse_version(section: str, function: Dict, *prompts: str) -> str:
+    """Version of a stored parse: anything here changing means old parses no longer apply."""
+    return hash_payload({
+        "function": function,
+        "prompts": prompts,
+        "models": model_router.section_models(section),
+        "chunking_threshold": RESUME_CHUNKING_THRESHOLD,
+    })[:16]
+
+async def _get_stored(kind: str, text: str, version: str) -> Optional[Dict]:
+    """Looks `text` up in the persistent parse store, warming the in-memory cache on a hit."""
+    stored = await parse_store.get_parsed(kind, text, version)
+    if stored is not None:
+        (set_cached_resume if kind == "resume" else set_cached_jd)(text, stored)
+    return stored
+
+async def _extract(section: str, function: Dict, system_prompt: str, text: str) -> Dict:
+    """Calls `function` as a forced tool on `text` and returns its parsed arguments."""
+    response = await llm_gateway.chat_completion(
+        model=_routed_model(section, text),
+        messages=[
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": text}
+        ],
+        tools=[{"type": "function", "function": function}],
+        tool_choice={"type": "function", "function": {"name": function["name"]}},
+        temperature=0,
+        top_p=1
+    )
+    return json.loads(response.choices[0].message.tool_calls[0].function.arguments)
 
 def merge_resume_chunks(parsed_chunks):
     merged = {
@@ -83,64 +132,51 @@ def merge_resume_chunks(parsed_chunks):
     merged["publications"] = list(dict.fromkeys(merged["publications"]))
     return merged
 
-def parse_resume_with_openai(resume_text: str) -> Dict:
+async def parse_resume_with_openai(resume_text: str) -> Dict:
     # Check cache first
     cached = get_cached_resume(resume_text)
     if cached:
         return cached
+    version = _parse_version("parse_resume", RESUME_FUNCTION, RESUME_SYSTEM_PROMPT, RESUME_CHUNK_SYSTEM_PROMPT)
+    stored = await _get_stored("resume", resume_text, version)
+    if stored:
+        return stored
     
     print(f"DEBUG: Parsing resume text ({len(resume_text)} chars)")
     
-    # If resume is too large, use chunking
-    if len(resume_text) > 10000:  # Threshold for chunking (adjust as needed)
-        print(f"DEBUG: Resume text too large, using chunking")
+    # If resume is too large, parse its chunks concurrently and merge them
+    if len(resume_text) > RESUME_CHUNKING_THRESHOLD:
         chunks = chunk_resume_text(resume_text)
-        parsed_chunks = []
-        
-        for i, chunk in enumerate(chunks):
-            print(f"DEBUG: Processing chunk {i+1}/{len(chunks)} ({len(chunk)} chars)")
-            try:
-                messages = [
-                    {"role": "system", "content": "You are an expert data extractor. Extract information from this resume chunk. Return only JSON matching the `parse_resume` schema. This is chunk " + str(i+1) + " of " + str(len(chunks)) + "."},
-                    {"role": "user", "content": chunk}
-                ]
-                response = openai.chat.completions.create(
-                    model="gpt-3.5-turbo-1106",
-                    messages=messages,
-                    tools=[{"type": "function", "function": RESUME_FUNCTION}],
-                    tool_choice={"type": "function", "function": {"name": "parse_resume"}},
-                    temperature=0,
-                    top_p=1
-                )
-                chunk_parsed = json.loads(response.choices[0].message.tool_calls[0].function.arguments)
-                parsed_chunks.append(chunk_parsed)
-            except Exception as e:
-                print(f"DEBUG: Error processing chunk {i+1}: {str(e)}")
-                # Continue with other chunks even if one fails
-        
-        # Merge the parsed chunks
-        parsed = merge_resume_chunks(parsed_chunks)
+        print(f"DEBUG: Resume text too large, parsing {len(chunks)} chunks (up to {PARSE_CHUNK_CONCURRENCY} at a time)")
+        semaphore = asyncio.Semaphore(PARSE_CHUNK_CONCURRENCY)
+
+        async def parse_chunk(i: int, chunk: str) -> Optional[Dict]:
+            system_prompt = RESUME_CHUNK_SYSTEM_PROMPT.format(index=i + 1, total=len(chunks))
+            async with semaphore:
+                try:
+                    return await _extract("parse_resume", RESUME_FUNCTION, system_prompt, chunk)
+                except Exception as e:
+                    print(f"DEBUG: Error processing chunk {i+1}: {str(e)}")
+                    # Continue with other chunks even if one fails
+                    return None
+
+        parsed_chunks = await asyncio.gather(*(parse_chunk(i, chunk) for i, chunk in enumerate(chunks)))
+        # Merge in document order
+        parsed = merge_resume_chunks([chunk for chunk in parsed_chunks if chunk is not None])
+        complete = all(chunk is not None for chunk in parsed_chunks)
     else:
         # Single-call parsing for smaller resumes
-        messages = [
-            {"role": "system", "content": "You are an expert data extractor. When called to parse a resume, return only JSON matching the `parse_resume` schema."},
-            {"role": "user", "content": resume_text}
-        ]
-        response = openai.chat.completions.create(
-            model="gpt-3.5-turbo-1106",
-            messages=messages,
-            tools=[{"type": "function", "function": RESUME_FUNCTION}],
-            tool_choice={"type": "function", "function": {"name": "parse_resume"}},
-            temperature=0,
-            top_p=1
-        )
-        parsed = json.loads(response.choices[0].message.tool_calls[0].function.arguments)
+        parsed = await _extract("parse_resume", RESUME_FUNCTION, RESUME_SYSTEM_PROMPT, resume_text)
+        complete = True
     
-    # Validate and cache the result
+    # Validate the result; partial or invalid parses are returned but never cached,
+    # so a transient chunk failure is retried on the next request.
     valid, missing = validate_resume(parsed)
     if not valid:
         print(f"DEBUG: parse_resume missing fields: {missing}")
-    set_cached_resume(resume_text, parsed)
+    if complete and valid:
+        set_cached_resume(resume_text, parsed)
+        await parse_store.put_parsed("resume", resume_text, version, parsed)
     return parsed
 
 def merge_jd_chunks(parsed_chunks):
@@ -154,27 +190,21 @@ def merge_jd_chunks(parsed_chunks):
                 merged[field].extend(v for v in val if v not in merged[field])
     return merged
 
-def parse_jd_with_openai(jd_text: str) -> Dict:
+async def parse_jd_with_openai(jd_text: str) -> Dict:
     # Single-call parsing for the full job description
     cached = get_cached_jd(jd_text)
     if cached:
         return cached
+    version = _parse_version("parse_jd", JD_FUNCTION, JD_SYSTEM_PROMPT)
+    stored = await _get_stored("jd", jd_text, version)
+    if stored:
+        return stored
     print(f"DEBUG: Parsing job description ({len(jd_text)} chars)")
-    messages = [
-        {"role": "system", "content": "You are an expert data extractor. When called to parse a job description, return only JSON matching the `parse_job_description` schema."},
-        {"role": "user", "content": jd_text}
-    ]
-    response = openai.chat.completions.create(
-        model="gpt-3.5-turbo-1106",
-        messages=messages,
-        tools=[{"type": "function", "function": JD_FUNCTION}],
-        tool_choice={"type": "function", "function": {"name": "parse_job_description"}},
-        temperature=0,
-        top_p=1
-    )
-    parsed = json.loads(response.choices[0].message.tool_calls[0].function.arguments)
+    parsed = await _extract("parse_jd", JD_FUNCTION, JD_SYSTEM_PROMPT, jd_text)
     valid, missing = validate_jd(parsed)
     if not valid:
         print(f"DEBUG: parse_jd missing fields: {missing}")
+        return parsed
     set_cached_jd(jd_text, parsed)
+    await parse_store.put_parsed("jd", jd_text, version, parsed)
     return parsed
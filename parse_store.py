@@ -0,0 +1,185 @@
+"""
+parse_store.py
+
+Persistent, content-addressed store for parsed resumes and job descriptions.
+
+The in-memory parse caches in `cache` are per process and start empty after
+every deploy, so each uvicorn worker re-parses the same documents. This store
+sits underneath them in a SQLite file shared by every worker on the host (WAL
+mode, one short autocommit statement per operation). Rows are keyed by the
+hash of the normalised document text plus a parse version that the caller
+derives from its schema, prompt and model, so changing any of those simply
+stops matching old rows instead of serving stale parses. Values are
+zstd-compressed JSON.
+
+Two workers parsing the same document at once both write the same key; the
+later `INSERT OR REPLACE` wins and either value is valid. Storage errors are
+logged and treated as misses: the store must never break parsing.
+"""
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+import zstandard
+
+from cache import hash_input
+
+logger = logging.getLogger(__name__)
+
+# Empty disables the store.
+PARSE_STORE_PATH = os.getenv("PARSE_STORE_PATH", "parse_cache.sqlite3")
+PARSE_STORE_TTL_SECONDS = float(os.getenv("PARSE_STORE_TTL_SECONDS", str(30 * 24 * 3600)))
+PARSE_STORE_ZSTD_LEVEL = int(os.getenv("PARSE_STORE_ZSTD_LEVEL", "3"))
+# Expired rows are deleted once every this many writes.
+PARSE_STORE_PRUNE_EVERY = int(os.getenv("PARSE_STORE_PRUNE_EVERY", "500"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS parses (
+    key TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    version TEXT NOT NULL,
+    value BLOB NOT NULL,
+    raw_bytes INTEGER NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS parses_created_at ON parses (created_at);
+"""
+
+
+def normalise_text(text: str) -> str:
+    """Form of a document that ignores encoding and whitespace-only differences."""
+    lines = (" ".join(line.split()) for line in unicodedata.normalize("NFC", text).splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def parse_key(kind: str, text: str, version: str) -> str:
+    return hash_input(f"{kind}\0{version}\0{normalise_text(text)}")
+
+
+class ParseStore:
+    """SQLite-backed parse store. All methods are blocking; call them from a thread."""
+
+    def __init__(self, path: str = PARSE_STORE_PATH, ttl_seconds: float = PARSE_STORE_TTL_SECONDS,
+                 zstd_level: int = PARSE_STORE_ZSTD_LEVEL):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.zstd_level = zstd_level
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.errors = 0
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def get(self, kind: str, text: str, version: str) -> Optional[Dict[str, Any]]:
+        try:
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT value FROM parses WHERE key = ? AND created_at > ?",
+                    (parse_key(kind, text, version), time.time() - self.ttl_seconds),
+                ).fetchone()
+            if row is None:
+                self._count("misses")
+                return None
+            parsed = json.loads(zstandard.decompress(row[0]))
+        except (sqlite3.Error, zstandard.ZstdError, ValueError) as e:
+            logger.warning(f"parse_store: read failed for {kind}: {e}")
+            self._count("errors")
+            return None
+        self._count("hits")
+        return parsed
+
+    def put(self, kind: str, text: str, version: str, parsed: Dict[str, Any]) -> None:
+        raw = json.dumps(parsed, separators=(",", ":"), default=str).encode("utf-8")
+        now = time.time()
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO parses (key, kind, version, value, raw_bytes, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    (parse_key(kind, text, version), kind, version, zstandard.compress(raw, self.zstd_level), len(raw), now),
+                )
+                with self._lock:
+                    self.writes += 1
+                    prune = PARSE_STORE_PRUNE_EVERY > 0 and self.writes % PARSE_STORE_PRUNE_EVERY == 0
+                if prune:
+                    conn.execute("DELETE FROM parses WHERE created_at <= ?", (now - self.ttl_seconds,))
+        except sqlite3.Error as e:
+            logger.warning(f"parse_store: write failed for {kind}: {e}")
+            self._count("errors")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            counters = {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else None,
+                "writes": self.writes,
+                "errors": self.errors,
+            }
+        try:
+            with self._connect() as conn:
+                rows, stored, raw = conn.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(LENGTH(value)), 0), COALESCE(SUM(raw_bytes), 0) FROM parses"
+                ).fetchone()
+        except sqlite3.Error:
+            rows = stored = raw = None
+        return {"path": self.path, "rows": rows, "stored_bytes": stored, "raw_bytes": raw, **counters}
+
+
+_store: Optional[ParseStore] = None
+_store_lock = threading.Lock()
+
+
+def _get_store() -> Optional[ParseStore]:
+    """The process-wide store, opened on first use (None when disabled or unavailable)."""
+    global _store
+    if not PARSE_STORE_PATH:
+        return None
+    with _store_lock:
+        if _store is None:
+            try:
+                _store = ParseStore()
+            except sqlite3.Error as e:
+                logger.warning(f"parse_store: cannot open {PARSE_STORE_PATH}: {e}")
+                return None
+        return _store
+
+
+async def get_parsed(kind: str, text: str, version: str) -> Optional[Dict[str, Any]]:
+    store = await asyncio.to_thread(_get_store)
+    if store is None:
+        return None
+    return await asyncio.to_thread(store.get, kind, text, version)
+
+
+async def put_parsed(kind: str, text: str, version: str, parsed: Dict[str, Any]) -> None:
+    store = await asyncio.to_thread(_get_store)
+    if store is not None:
+        await asyncio.to_thread(store.put, kind, text, version, parsed)
+
+
+def stats() -> Dict[str, Any]:
+    store = _store
+    return store.stats() if store is not None else {"enabled": bool(PARSE_STORE_PATH), "opened": False}
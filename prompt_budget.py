@@ -0,0 +1,165 @@
+"""
+prompt_budget.py
+
+Compact prompt assembly under a per-call input-token budget.
+
+Prompt builders describe their inputs as PromptFields: structured inputs are
+serialised as compact JSON (no indentation, None/empty values dropped) and
+free-text fields can be de-duplicated against content the prompt already
+carries. `fit_prompt` renders the template, counts tokens with llm_tokens and,
+if the prompt is over budget, trims the lowest-priority fields first (never
+below their floor) until it fits. Every call returns a report with the token
+count before and after compaction so the savings can be tracked.
+"""
+import json
+import logging
+import re
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import llm_tokens
+
+logger = logging.getLogger(__name__)
+
+
+def _prune(value: Any) -> Any:
+    if isinstance(value, dict):
+        pruned = {k: _prune(v) for k, v in value.items()}
+        return {k: v for k, v in pruned.items() if v not in (None, "", [], {})}
+    if isinstance(value, list):
+        return [v for v in (_prune(v) for v in value) if v not in (None, "", [], {})]
+    if isinstance(value, str):
+        return value.strip()
+    return value
+
+
+def compact_json(value: Any) -> str:
+    """Minimal JSON for a prompt: no whitespace, no None/empty fields."""
+    if value is None:
+        return "{}"
+    if hasattr(value, "model_dump"):
+        value = value.model_dump(mode="json")
+    return json.dumps(_prune(value), separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def text_values(value: Any) -> List[str]:
+    """All string leaves of a model/dict/list, for use with `dedupe_text`."""
+    if hasattr(value, "model_dump"):
+        value = value.model_dump(mode="json")
+    if isinstance(value, str):
+        return [value]
+    if isinstance(value, dict):
+        value = list(value.values())
+    if isinstance(value, list):
+        return [s for v in value for s in text_values(v)]
+    return []
+
+
+def _normalise(text: str) -> str:
+    return re.sub(r"[^a-z0-9]+", " ", text.lower()).strip()
+
+
+def dedupe_text(text: str, already_present: Iterable[str], min_chars: int = 20) -> str:
+    """Drops lines/sentences of `text` whose content already appears in `already_present`."""
+    if not text:
+        return ""
+    haystack = _normalise(" ".join(already_present))
+    kept, seen = [], set()
+    for line in text.splitlines():
+        sentences = [s for s in re.split(r"(?<=[.!?;])\s+", line) if s.strip()]
+        kept_sentences = []
+        for sentence in sentences:
+            norm = _normalise(sentence)
+            if not norm or norm in seen:
+                continue
+            if len(norm) >= min_chars and norm in haystack:
+                continue
+            seen.add(norm)
+            kept_sentences.append(sentence.strip())
+        if kept_sentences:
+            kept.append(" ".join(kept_sentences))
+    return "\n".join(kept)
+
+
+class PromptField:
+    """One template parameter. Lower `priority` is trimmed first; `min_tokens`
+    is the floor trimming may reduce it to (None means never trim)."""
+
+    def __init__(self, text: str, priority: int = 50, min_tokens: Optional[int] = None):
+        self.text = text or ""
+        self.priority = priority
+        self.min_tokens = min_tokens
+
+
+_stats_lock = threading.Lock()
+_stats: Dict[str, Dict[str, Any]] = {}
+
+
+def _record(report: Dict[str, Any]) -> None:
+    with _stats_lock:
+        entry = _stats.setdefault(report["label"], {"calls": 0, "tokens_before": 0, "tokens_after": 0, "over_budget": 0})
+        entry["calls"] += 1
+        entry["tokens_before"] += report["tokens_before"]
+        entry["tokens_after"] += report["tokens_after"]
+        if report["tokens_after"] > report["budget"]:
+            entry["over_budget"] += 1
+
+
+def fit_prompt(
+    label: str,
+    template: str,
+    fields: Dict[str, PromptField],
+    budget: int,
+    model: Optional[str] = None,
+    system_prompt: str = "",
+    baseline_params: Optional[Dict[str, str]] = None,
+    system_tokens: Optional[int] = None,
+) -> Tuple[str, Dict[str, Any]]:
+    """Renders `template` from `fields` within `budget` input tokens.
+
+    `baseline_params`, if given, is the uncompacted rendering's parameters and
+    is only used for the before/after report. `system_tokens` skips counting
+    `system_prompt` when the count is already known (see prompt_registry).
+    """
+    if system_tokens is None:
+        system_tokens = llm_tokens.count_tokens(system_prompt, model)
+    texts = {name: field.text for name, field in fields.items()}
+
+    def total() -> int:
+        return system_tokens + llm_tokens.count_tokens(template.format(**texts), model)
+
+    tokens_before = system_tokens + llm_tokens.count_tokens(template.format(**(baseline_params or texts)), model)
+    tokens_compact = total()
+    current = tokens_compact
+    trimmed: List[str] = []
+    for name, field in sorted(fields.items(), key=lambda item: item[1].priority):
+        if current <= budget:
+            break
+        if field.min_tokens is None:
+            continue
+        field_tokens = llm_tokens.count_tokens(texts[name], model)
+        allowed = max(field.min_tokens, field_tokens - (current - budget))
+        if allowed >= field_tokens:
+            continue
+        texts[name] = llm_tokens.truncate_to_tokens(texts[name], allowed, model)
+        trimmed.append(name)
+        current = total()
+
+    report = {
+        "label": label,
+        "budget": budget,
+        "tokens_before": tokens_before,
+        "tokens_compact": tokens_compact,
+        "tokens_after": current,
+        "trimmed_fields": trimmed,
+    }
+    _record(report)
+    if current > budget:
+        logger.warning(f"prompt_budget[{label}]: {current} tokens still over budget {budget} after trimming {trimmed}.")
+    logger.info(f"prompt_budget[{label}]: {tokens_before} -> {current} input tokens (budget {budget}, trimmed {trimmed}).")
+    return template.format(**texts), report
+
+
+def stats() -> Dict[str, Any]:
+    with _stats_lock:
+        return {label: dict(entry) for label, entry in _stats.items()}
@@ -0,0 +1,132 @@
+"""
+prompt_registry.py
+
+Static system prompts compiled once at import.
+
+Each entry is a template from prompts.py with its response model's JSON schema
+substituted for `{schema}`, its token count, and a version tag (the declared
+revision plus a hash of the compiled text, so editing a prompt or a model
+changes it). Builders fetch prompts by name, and optionally by version,
+instead of re-rendering schemas and f-strings on every request; the versions
+feed the section and guide cache keys.
+"""
+import hashlib
+import json
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Type
+
+from pydantic import BaseModel
+
+import llm_tokens
+import prompts
+import structured_output
+from interview_prep_v2_models import (
+    FullRoleAssessmentResponse,
+    InsiderCheatSheetSectionModel,
+    RoleUnderstandingFitAssessmentSectionModel,
+    StarStoryBankSectionModel,
+)
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_PLACEHOLDER = "{schema}"
+
+
+@dataclass(frozen=True)
+class CompiledPrompt:
+    name: str
+    version: str
+    text: str
+    tokens: int
+    response_model: Optional[Type[BaseModel]] = None
+
+    def render(self, **values: str) -> str:
+        """Fills per-request `{placeholders}`. Plain replacement, so the
+        embedded JSON schema's braces need no escaping."""
+        text = self.text
+        for key, value in values.items():
+            text = text.replace("{" + key + "}", value)
+        return text
+
+
+class PromptRegistry:
+    def __init__(self):
+        self._prompts: Dict[str, CompiledPrompt] = {}
+        self._lock = threading.Lock()
+        self.compile_seconds = 0.0
+
+    def register(
+        self,
+        name: str,
+        template: str,
+        response_model: Optional[Type[BaseModel]] = None,
+        revision: str = "1",
+        token_model: Optional[str] = None,
+    ) -> CompiledPrompt:
+        """Compiles `template` and stores it under `name`.
+
+        `token_model` is the model whose tokenizer counts the prompt (the
+        default encoding otherwise).
+        """
+        start = time.perf_counter()
+        text = template
+        if response_model is not None:
+            if SCHEMA_PLACEHOLDER in text:
+                text = text.replace(SCHEMA_PLACEHOLDER, json.dumps(response_model.model_json_schema(), indent=2))
+            # Warm the structured-output response format as well.
+            structured_output.response_format("gpt-4o", response_model)
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()[:8]
+        prompt = CompiledPrompt(
+            name=name,
+            version=f"{revision}-{digest}",
+            text=text,
+            tokens=llm_tokens.count_tokens(text, token_model),
+            response_model=response_model,
+        )
+        with self._lock:
+            self._prompts[name] = prompt
+            self.compile_seconds += time.perf_counter() - start
+        return prompt
+
+    def get(self, name: str, version: Optional[str] = None) -> CompiledPrompt:
+        """The compiled prompt `name`; raises KeyError if unknown or not at `version`."""
+        prompt = self._prompts[name]
+        if version is not None and prompt.version != version:
+            raise KeyError(f"Prompt '{name}' is at version {prompt.version}, not {version}.")
+        return prompt
+
+    def versions(self) -> Dict[str, str]:
+        with self._lock:
+            return {name: prompt.version for name, prompt in self._prompts.items()}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = {name: {"version": p.version, "tokens": p.tokens} for name, p in self._prompts.items()}
+        return {"prompts": entries, "compile_ms": round(self.compile_seconds * 1000, 2)}
+
+
+registry = PromptRegistry()
+registry.register("role_success", prompts.ROLE_SUCCESS_SYSTEM_PROMPT_TEMPLATE, FullRoleAssessmentResponse)
+registry.register(
+    "role_understanding_fit", prompts.ROLE_UNDERSTANDING_FIT_SYSTEM_PROMPT_TEMPLATE, RoleUnderstandingFitAssessmentSectionModel
+)
+registry.register("star_story_bank", prompts.STAR_STORY_BANK_SYSTEM_PROMPT_TEMPLATE, StarStoryBankSectionModel)
+registry.register("technical_case_prep", prompts.TECHNICAL_CASE_PREP_SYSTEM_PROMPT)
+registry.register("prompt_b", prompts.INTERVIEW_PREP_V2_SYSTEM_PROMPT_B_CANDIDATE_ROLE, token_model="gpt-4o")
+registry.register("prompt_c", prompts.INTERVIEW_PREP_V2_SYSTEM_PROMPT_C_INSIDER_CHEAT_SHEET, InsiderCheatSheetSectionModel)
+logger.debug(f"prompt_registry: compiled {len(registry.versions())} prompts in {registry.compile_seconds * 1000:.1f}ms.")
+
+
+def get(name: str, version: Optional[str] = None) -> CompiledPrompt:
+    return registry.get(name, version)
+
+
+def versions() -> Dict[str, str]:
+    return registry.versions()
+
+
+def stats() -> Dict[str, Any]:
+    return registry.stats()
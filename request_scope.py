@@ -0,0 +1,73 @@
+"""
+request_scope.py
+
+Request-scoped cancellation for long-running endpoints.
+
+Starlette keeps running a handler after its client disconnects, so a closed
+tab would otherwise leave every started LLM and SerpAPI call running to
+completion. `cancel_on_disconnect` runs the handler's work as one task next
+to a watcher on the ASGI receive channel; when the client goes away the task
+is cancelled, and because the work is plain asyncio (the orchestrator's
+section tasks, gather() fan-outs, httpx requests) the cancellation reaches
+every child. Upstream calls shared with other requests through single_flight
+keep running until their last waiter is gone; the tokens saved are counted
+in llm_gateway.stats()["cancelled"].
+"""
+import asyncio
+import logging
+import threading
+from typing import Any, Awaitable, Dict
+
+from fastapi import HTTPException, Request
+
+logger = logging.getLogger(__name__)
+
+# Not a registered HTTP status; the nginx convention for "client closed request".
+CLIENT_CLOSED_REQUEST = 499
+
+_stats_lock = threading.Lock()
+_stats: Dict[str, Dict[str, int]] = {}
+
+
+def _count(label: str, key: str) -> None:
+    with _stats_lock:
+        entry = _stats.setdefault(label, {"requests": 0, "completed": 0, "cancelled_on_disconnect": 0})
+        entry[key] += 1
+
+
+async def wait_for_disconnect(request: Request) -> None:
+    """Returns once the ASGI server reports the client has disconnected.
+
+    Only for use after the request body has been read (FastAPI has done so by
+    the time a handler with a body parameter runs).
+    """
+    while True:
+        message = await request.receive()
+        if message["type"] == "http.disconnect":
+            return
+
+
+async def cancel_on_disconnect(request: Request, work: Awaitable[Any], label: str) -> Any:
+    """Awaits `work`, cancelling it (and all its child tasks) if the client disconnects first."""
+    _count(label, "requests")
+    task = asyncio.ensure_future(work)
+    watcher = asyncio.create_task(wait_for_disconnect(request))
+    try:
+        await asyncio.wait({task, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        watcher.cancel()
+        if not task.done():
+            task.cancel()
+            # Let the cancellation unwind through the children before returning.
+            await asyncio.gather(task, return_exceptions=True)
+    if task.cancelled():
+        _count(label, "cancelled_on_disconnect")
+        logger.info(f"REQUEST_SCOPE: Client disconnected from {label}; cancelled its in-flight work.")
+        raise HTTPException(status_code=CLIENT_CLOSED_REQUEST, detail="Client closed request.")
+    _count(label, "completed")
+    return task.result()
+
+
+def stats() -> Dict[str, Any]:
+    with _stats_lock:
+        return {label: dict(entry) for label, entry in _stats.items()}
@@ -1,8 +1,27 @@
 import httpx
 import os
 from filters import matches_location, matches_experience_band, is_fresh
+from serpapi import GoogleSearch
+import single_flight
 
-SERPAPI_URL = "https://serpapi.com/search.json"
+DEFAULT_SERPAPI_BASE_URL = "https://serpapi.com"
+# Point at a local stand-in (e.g. benchmarks/fake_serpapi.py) to run without quota.
+SERPAPI_BASE_URL = os.getenv("SERPAPI_BASE_URL", DEFAULT_SERPAPI_BASE_URL).rstrip("/")
+SERPAPI_URL = f"{SERPAPI_BASE_URL}/search.json"
+
+def google_search(params: dict) -> GoogleSearch:
+    """A serpapi GoogleSearch client that honours SERPAPI_BASE_URL."""
+    search = GoogleSearch(params)
+    search.BACKEND = SERPAPI_BASE_URL
+    return search
+
+async def serpapi_get_json(client: httpx.AsyncClient, url: str, params: dict) -> dict:
+    """GET a SerpAPI page; identical concurrent requests share one upstream call."""
+    async def fetch():
+        resp = await client.get(url, params=params)
+        resp.raise_for_status()
+        return resp.json()
+    return await single_flight.group("serpapi").do(single_flight.canonical_key(url, params), fetch)
 
 async def fetch_serpapi_jobs(preferences, next_page_token=None, want=15):
     jobs, token = [], next_page_token
@@ -21,9 +40,7 @@ async def fetch_serpapi_jobs(preferences, next_page_token=None, want=15):
             params["next_page_token"] = token
             params["no_cache"] = True
         async with httpx.AsyncClient(timeout=20) as client:
-            resp = await client.get(SERPAPI_URL, params={k: v for k, v in params.items() if v is not None})
-            resp.raise_for_status()
-            data = resp.json()
+            data = await serpapi_get_json(client, SERPAPI_URL, {k: v for k, v in params.items() if v is not None})
             print(">>> SerpAPI keys:", data.keys())
             print(">>> jobs_results present?", "jobs_results" in data, "length:", len(data.get("jobs_results", [])))
             # More robust extraction in case SerpAPI changes key names
@@ -1,5 +1,5 @@
 import os
-from serpapi import GoogleSearch
+from serpapi_async import google_search
 from typing import List, Dict, Any
 import logging
 
@@ -12,7 +12,7 @@ def fetch_jobs_from_serpapi(query: str, location: str, api_key: str) -> List[Dic
     }
     logging.info(f"[SerpAPI DEBUG] Params being sent to SerpAPI: {params}")
     try:
-        search = GoogleSearch(params)
+        search = google_search(params)
         results = search.get_dict()
         logging.info(f"[SerpAPI DEBUG] Raw response from SerpAPI: {results}")
         if not isinstance(results, dict):
@@ -32,7 +32,7 @@ def fetch_jobs_from_serpapi(query: str, location: str, api_key: str) -> List[Dic
             }
             logging.info(f"[SerpAPI DEBUG] Retrying with minimal params: {minimal_params}")
             try:
-                minimal_search = GoogleSearch(minimal_params)
+                minimal_search = google_search(minimal_params)
                 minimal_results = minimal_search.get_dict()
                 logging.info(f"[SerpAPI DEBUG] Raw response from minimal query: {minimal_results}")
                 jobs = minimal_results.get("jobs_results", [])
@@ -1,15 +1,39 @@
+import asyncio
 import os
 from typing import List, Dict, Tuple
 import time
 import logging
-from serpapi import GoogleSearch
+import single_flight
+from serpapi_async import google_search
 
 _news_cache: Dict[str, Tuple[float, List[Dict[str, str]]]] = {}
 _news_cache_ttl = 3600  # seconds
 
 logger = logging.getLogger(__name__)
 
-async def fetch_recent_news(company_name: str, max_articles: int = 5) -> List[Dict[str, str]]:
+_NEWS_FALLBACK_TITLE = "Unable to fetch news – please ask about recent company developments"
+
+
+class NewsUnavailableError(RuntimeError):
+    """SerpAPI could not be queried for a company's news."""
+
+
+def _fallback_news() -> List[Dict[str, str]]:
+    return [{
+        "title": _NEWS_FALLBACK_TITLE,
+        "snippet": "",
+        "published_at": "",
+        "url": ""
+    }]
+
+
+async def fetch_company_news(company_name: str, max_articles: int = 5) -> List[Dict[str, str]]:
+    """Recent news for `company_name`, raising NewsUnavailableError if SerpAPI fails.
+
+    Failures are not cached, so the next call queries SerpAPI again. Callers
+    that cache what they build from the news should use this rather than
+    `fetch_recent_news`, whose fallback item is indistinguishable from news.
+    """
     # Determine SerpAPI API key (supporting SERPAPI_API_KEY or SERPAPI_KEY)
     api_key = os.getenv("SERPAPI_API_KEY") or os.getenv("SERPAPI_KEY")
     if not api_key:
@@ -31,37 +55,37 @@ async def fetch_recent_news(company_name: str, max_articles: int = 5) -> List[Di
     }
 
     try:
-        search = GoogleSearch(params)
-        results = search.get_dict()
-        articles = results.get("news_results", [])
-        if not articles:
-            # Fallback if no articles found
-            fallback = [{
-                "title": "Unable to fetch news – please ask about recent company developments",
-                "snippet": "",
-                "published_at": "",
-                "url": ""
-            }]
-            _news_cache[key] = (now, fallback)
-            return fallback
-        data = [
-            {
-                "title": a.get("title"),
-                "snippet": a.get("snippet"),
-                "published_at": a.get("date"),
-                "url": a.get("link")
-            }
-            for a in articles if a.get("title") and a.get("link")
-        ]
-        _news_cache[key] = (now, data)
-        return data
+        # GoogleSearch blocks, so run it off the event loop; concurrent lookups
+        # of the same company share a single SerpAPI request.
+        results = await single_flight.group("serpapi").do(
+            single_flight.canonical_key("google_news", params),
+            lambda: asyncio.to_thread(lambda: google_search(params).get_dict()),
+        )
     except Exception as e:
-        logger.error(f"News fetch failed for {company_name}: {e}")
-        fallback = [{
-            "title": "Unable to fetch news – please ask about recent company developments",
-            "snippet": "",
-            "published_at": "",
-            "url": ""
-        }]
+        raise NewsUnavailableError(f"News fetch failed for {company_name}: {e}") from e
+    articles = results.get("news_results", [])
+    if not articles:
+        # Fallback if no articles found
+        fallback = _fallback_news()
         _news_cache[key] = (now, fallback)
         return fallback
+    data = [
+        {
+            "title": a.get("title"),
+            "snippet": a.get("snippet"),
+            "published_at": a.get("date"),
+            "url": a.get("link")
+        }
+        for a in articles if a.get("title") and a.get("link")
+    ]
+    _news_cache[key] = (now, data)
+    return data
+
+
+async def fetch_recent_news(company_name: str, max_articles: int = 5) -> List[Dict[str, str]]:
+    """Like `fetch_company_news`, but returns a placeholder item if SerpAPI fails."""
+    try:
+        return await fetch_company_news(company_name, max_articles)
+    except NewsUnavailableError as e:
+        logger.error(str(e))
+        return _fallback_news()
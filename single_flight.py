@@ -0,0 +1,110 @@
+"""
+single_flight.py
+
+Request coalescing for identical in-flight upstream calls.
+
+When several callers ask for exactly the same thing at once (many users
+researching the same company, a frontend double-submit), only the first
+caller's request goes upstream; the others await the same result. Requests
+are identified by `canonical_key`, a hash of their JSON-canonicalised
+parameters with credentials stripped.
+
+The upstream call runs in its own task, so one caller being cancelled does
+not cancel it for the others; it is only cancelled once every caller has
+gone away.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+logger = logging.getLogger(__name__)
+
+SECRET_PARAMS = {"api_key"}
+
+
+def _canonical(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in value.items() if str(k) not in SECRET_PARAMS}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    if hasattr(value, "model_dump"):
+        return _canonical(value.model_dump(mode="json"))
+    return value
+
+
+def canonical_key(*parts: Any) -> str:
+    """Stable hash of `parts`; dict key order and credentials don't affect it."""
+    payload = json.dumps(_canonical(list(parts)), sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class _Flight:
+    def __init__(self, task: "asyncio.Task[Any]"):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self, name: str):
+        self.name = name
+        self._flights: Dict[Tuple[int, str], _Flight] = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        loop = asyncio.get_running_loop()
+        # Tasks are bound to their loop, so flights are only shared within one.
+        flight_key = (id(loop), key)
+        flight = self._flights.get(flight_key)
+        if flight is None or flight.task.done():
+            flight = _Flight(loop.create_task(fn()))
+            self._flights[flight_key] = flight
+            flight.task.add_done_callback(lambda _t, k=flight_key, f=flight: self._forget(k, f))
+            with self._lock:
+                self.leaders += 1
+        else:
+            with self._lock:
+                self.coalesced += 1
+            logger.debug(f"single_flight[{self.name}]: joined in-flight request {key[:12]}.")
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            if flight.waiters == 1 and not flight.task.done():
+                flight.task.cancel()
+            raise
+        finally:
+            flight.waiters -= 1
+
+    def _forget(self, flight_key: Tuple[int, str], flight: _Flight) -> None:
+        if self._flights.get(flight_key) is flight:
+            del self._flights[flight_key]
+        if not flight.task.cancelled():
+            # Mark the exception retrieved; callers re-raise it themselves.
+            flight.task.exception()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"leaders": self.leaders, "coalesced": self.coalesced, "in_flight": len(self._flights)}
+
+
+_groups: Dict[str, SingleFlight] = {}
+_groups_lock = threading.Lock()
+
+
+def group(name: str) -> SingleFlight:
+    """Returns the process-wide SingleFlight for `name` (e.g. "llm", "serpapi")."""
+    with _groups_lock:
+        if name not in _groups:
+            _groups[name] = SingleFlight(name)
+        return _groups[name]
+
+
+def stats() -> Dict[str, Any]:
+    with _groups_lock:
+        groups = list(_groups.values())
+    return {g.name: g.snapshot() for g in groups}
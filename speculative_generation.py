@@ -0,0 +1,154 @@
+"""
+speculative_generation.py
+
+Opt-in speculative pre-generation of Interview Prep v2 sections.
+
+The frontend parses the resume and the JD before the user clicks generate.
+When SPECULATIVE_GENERATION_ENABLED is set and both parse calls carry the
+same `session_id`, the sections that need nothing beyond those two documents
+(SPECULATIVE_SECTION_NAMES) start in the background right away.
+
+Nothing is handed over explicitly: the speculative run uses the same plan
+nodes and cache keys as /generate, so a later /generate joins still-running
+nodes through the orchestrator's single-flight and picks finished ones up
+from the section cache. Speculation that no /generate claims within
+SPECULATIVE_IDLE_SECONDS of the session's last activity is cancelled.
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from interview_prep_v2_models import JobDescriptionStructured, ResumeStructured
+from interview_prep_v2_orchestrator import SPECULATIVE_SECTION_NAMES, build_interview_prep_plan
+
+logger = logging.getLogger(__name__)
+
+SPECULATIVE_GENERATION_ENABLED = os.getenv("SPECULATIVE_GENERATION_ENABLED", "false").lower() in ("1", "true", "yes")
+SPECULATIVE_IDLE_SECONDS = float(os.getenv("SPECULATIVE_IDLE_SECONDS", "300"))
+SPECULATIVE_MAX_SESSIONS = int(os.getenv("SPECULATIVE_MAX_SESSIONS", "1000"))
+
+
+class _Session:
+    def __init__(self):
+        self.resume: Optional[ResumeStructured] = None
+        self.raw_resume_text: Optional[str] = None
+        self.jd: Optional[JobDescriptionStructured] = None
+        self.job_description: Optional[str] = None
+        self.task: Optional[asyncio.Task] = None
+        self.idle_timer: Optional[asyncio.TimerHandle] = None
+        self.last_seen = time.monotonic()
+
+
+_sessions: Dict[str, _Session] = {}
+_stats_lock = threading.Lock()
+_stats = {"started": 0, "completed": 0, "claimed": 0, "cancelled_idle": 0, "superseded": 0}
+
+
+def _count(key: str) -> None:
+    with _stats_lock:
+        _stats[key] += 1
+
+
+def _touch(session_id: str) -> _Session:
+    session = _sessions.get(session_id)
+    if session is None:
+        if len(_sessions) >= SPECULATIVE_MAX_SESSIONS:
+            oldest = min(_sessions, key=lambda sid: _sessions[sid].last_seen)
+            _expire(oldest)
+        session = _sessions[session_id] = _Session()
+    session.last_seen = time.monotonic()
+    if session.idle_timer is not None:
+        session.idle_timer.cancel()
+    session.idle_timer = asyncio.get_running_loop().call_later(SPECULATIVE_IDLE_SECONDS, _expire, session_id)
+    return session
+
+
+def _expire(session_id: str) -> None:
+    session = _sessions.pop(session_id, None)
+    if session is None:
+        return
+    if session.idle_timer is not None:
+        session.idle_timer.cancel()
+    if session.task is not None and not session.task.done():
+        session.task.cancel()
+        _count("cancelled_idle")
+        logger.info(f"SPECULATIVE: Session {session_id} idle; cancelled its pre-generation.")
+
+
+async def _speculate(session_id: str, session: _Session) -> None:
+    plan = build_interview_prep_plan(
+        resume_model=session.resume,
+        jd_model=session.jd,
+        job_description=session.job_description,
+        raw_resume_text=session.raw_resume_text,
+    )
+    start = time.perf_counter()
+    results = await plan.run(targets=SPECULATIVE_SECTION_NAMES)
+    _count("completed")
+    logger.info(f"SPECULATIVE: Session {session_id} pre-generated {sorted(results)} in {time.perf_counter() - start:.2f}s.")
+
+
+def _log_failure(task: asyncio.Task) -> None:
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"SPECULATIVE: {task.get_name()} failed: {task.exception()}")
+
+
+def _maybe_start(session_id: str, session: _Session) -> None:
+    if session.resume is None or session.jd is None:
+        return
+    if session.task is not None and not session.task.done():
+        # A re-parse replaced one of the documents; the old work no longer matches.
+        session.task.cancel()
+        _count("superseded")
+    session.task = asyncio.create_task(_speculate(session_id, session), name=f"speculative:{session_id}")
+    session.task.add_done_callback(_log_failure)
+    _count("started")
+    logger.info(f"SPECULATIVE: Session {session_id} has both documents; pre-generating {SPECULATIVE_SECTION_NAMES}.")
+
+
+def record_resume(session_id: Optional[str], resume: Dict[str, Any], raw_resume_text: Optional[str] = None) -> None:
+    """Called after parse-resume; starts speculation once the session's JD is known too."""
+    if not (SPECULATIVE_GENERATION_ENABLED and session_id):
+        return
+    session = _touch(session_id)
+    session.resume = ResumeStructured(**resume)
+    session.raw_resume_text = raw_resume_text
+    _maybe_start(session_id, session)
+
+
+def record_jd(session_id: Optional[str], jd: Dict[str, Any], job_description: Optional[str] = None) -> None:
+    """Called after parse-jd; starts speculation once the session's resume is known too."""
+    if not (SPECULATIVE_GENERATION_ENABLED and session_id):
+        return
+    session = _touch(session_id)
+    session.jd = JobDescriptionStructured(**jd)
+    session.job_description = job_description
+    _maybe_start(session_id, session)
+
+
+def claim(session_id: Optional[str]) -> bool:
+    """Called by /generate. The session's speculative work is no longer
+    subject to the idle timeout; the generate plan joins it by cache key.
+    Returns whether speculation existed for the session."""
+    if not session_id:
+        return False
+    session = _sessions.pop(session_id, None)
+    if session is None:
+        return False
+    if session.idle_timer is not None:
+        session.idle_timer.cancel()
+    if session.task is None:
+        return False
+    _count("claimed")
+    return True
+
+
+def stats() -> Dict[str, Any]:
+    with _stats_lock:
+        data = dict(_stats)
+    data["enabled"] = SPECULATIVE_GENERATION_ENABLED
+    data["sessions"] = len(_sessions)
+    return data
@@ -0,0 +1,368 @@
+"""
+structured_output.py
+
+Shared structured-output handling for LLM calls that return JSON.
+
+`response_format` derives an OpenAI `json_schema` response format from a
+Pydantic model, in strict mode when the schema allows it, so supporting models
+are constrained to the shape the caller will validate against. Older models
+fall back to plain JSON mode.
+
+`parse` / `loads` validate the returned text. When it does not validate as is,
+a local repair pass runs before giving up: code fences and surrounding prose
+are stripped, trailing commas removed, truncated JSON is closed, and required
+fields the model left out are filled with empty values. Every parse is counted
+per section (clean / repaired / failed) for /api/metrics.
+"""
+import functools
+import json
+import logging
+import re
+import threading
+import types
+import typing
+from typing import Any, Dict, List, Optional, Tuple, Type, TypeVar, Union
+
+from pydantic import BaseModel, ValidationError
+
+logger = logging.getLogger(__name__)
+
+M = TypeVar("M", bound=BaseModel)
+
+# Model families that accept response_format={"type": "json_schema", ...}.
+JSON_SCHEMA_MODEL_PREFIXES = ("gpt-4o", "gpt-4.1", "o1", "o3", "o4")
+
+# Keywords strict mode rejects; the local Pydantic validation still enforces them.
+_UNSUPPORTED_STRICT_KEYWORDS = ("default", "format", "minLength", "maxLength", "pattern", "minItems", "maxItems")
+
+# How many trailing members of a truncated document may be dropped to make it parse.
+MAX_TRUNCATION_BACKOFF = 8
+
+
+class StructuredOutputError(ValueError):
+    """The LLM output could not be parsed or repaired into the expected shape."""
+
+
+# --- Schemas ---
+
+def _is_nullable(node: Dict[str, Any]) -> bool:
+    if node.get("type") == "null" or (isinstance(node.get("type"), list) and "null" in node["type"]):
+        return True
+    return any(_is_nullable(option) for option in node.get("anyOf", []) if isinstance(option, dict))
+
+
+def strict_json_schema(model_cls: Type[BaseModel]) -> Tuple[Dict[str, Any], bool]:
+    """JSON schema for `model_cls` rewritten for OpenAI structured outputs.
+
+    Strict mode needs every property listed as required and
+    `additionalProperties: false`, so optional fields become required but
+    nullable. Returns the schema and whether it is strict-compatible; models
+    with free-form dict fields are not.
+    """
+    schema = model_cls.model_json_schema()
+    strict = True
+
+    def visit(node: Any) -> None:
+        nonlocal strict
+        if isinstance(node, list):
+            for item in node:
+                visit(item)
+            return
+        if not isinstance(node, dict):
+            return
+        if "$ref" in node:
+            # Strict mode does not allow keywords next to a reference.
+            for key in [k for k in node if k != "$ref"]:
+                del node[key]
+            return
+        for keyword in _UNSUPPORTED_STRICT_KEYWORDS:
+            node.pop(keyword, None)
+        if "properties" in node:
+            properties = node["properties"]
+            required = set(node.get("required", []))
+            for name, prop in properties.items():
+                if name not in required and not _is_nullable(prop):
+                    properties[name] = {"anyOf": [prop, {"type": "null"}]}
+            node["required"] = list(properties)
+            node["additionalProperties"] = False
+        elif node.get("type") == "object":
+            strict = False
+        for key, value in node.items():
+            if key in ("properties", "$defs"):
+                for sub in value.values():
+                    visit(sub)
+            elif isinstance(value, (dict, list)):
+                visit(value)
+
+    visit(schema)
+    return schema, strict
+
+
+def supports_json_schema(model: str) -> bool:
+    return model.startswith(JSON_SCHEMA_MODEL_PREFIXES)
+
+
+@functools.lru_cache(maxsize=None)
+def _json_schema_format(model_cls: Type[BaseModel]) -> Dict[str, Any]:
+    schema, strict = strict_json_schema(model_cls)
+    name = re.sub(r"[^a-zA-Z0-9_-]", "_", model_cls.__name__)
+    return {"type": "json_schema", "json_schema": {"name": name, "schema": schema, "strict": strict}}
+
+
+def response_format(model: str, model_cls: Type[BaseModel]) -> Dict[str, Any]:
+    """The `response_format` to request `model_cls` from `model`.
+
+    Built once per model class and shared between calls; treat it as read-only.
+    """
+    if not supports_json_schema(model):
+        return {"type": "json_object"}
+    return _json_schema_format(model_cls)
+
+
+# --- Text repair ---
+
+def _strip_fences(text: str) -> str:
+    match = re.search(r"```(?:json)?\s*(.*?)(?:```|$)", text, flags=re.DOTALL | re.IGNORECASE)
+    return match.group(1).strip() if match else text.strip()
+
+
+def _extract_json(text: str) -> str:
+    """Drops prose before the first `{`/`[` and after its matching close (if any)."""
+    starts = [i for i in (text.find("{"), text.find("[")) if i != -1]
+    if not starts:
+        return text
+    text = text[min(starts):]
+    depth, in_string, escaped = 0, False, False
+    for i, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            depth += 1
+        elif char in "}]":
+            depth -= 1
+            if depth == 0:
+                return text[:i + 1]
+    return text
+
+
+def _remove_trailing_commas(text: str) -> str:
+    return re.sub(r",(\s*[}\]])", r"\1", text)
+
+
+def _scan(text: str) -> Tuple[List[str], bool, List[int]]:
+    """Open brackets, whether the text ends inside a string, and the positions of structural commas."""
+    stack: List[str] = []
+    commas: List[int] = []
+    in_string, escaped = False, False
+    for i, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append("}" if char == "{" else "]")
+        elif char in "}]" and stack:
+            stack.pop()
+        elif char == ",":
+            commas.append(i)
+    return stack, in_string, commas
+
+
+def _close(text: str) -> str:
+    stack, in_string, _ = _scan(text)
+    if in_string:
+        text = text.rstrip("\\") + '"'
+    text = re.sub(r"[\s,:]+$", "", text)
+    return text + "".join(reversed(stack))
+
+
+def _close_truncated(text: str) -> Any:
+    """Closes a document cut off mid-way, dropping trailing members until it parses."""
+    _, _, commas = _scan(text)
+    candidates = [text] + [text[:i] for i in reversed(commas[-MAX_TRUNCATION_BACKOFF:])]
+    for candidate in candidates:
+        try:
+            return json.loads(_remove_trailing_commas(_close(candidate)))
+        except json.JSONDecodeError:
+            continue
+    raise StructuredOutputError("Could not close truncated JSON.")
+
+
+def _repair_text(text: str) -> Any:
+    text = _remove_trailing_commas(_extract_json(_strip_fences(text)))
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        return _close_truncated(text)
+
+
+# --- Model repair ---
+
+def _unwrap(annotation: Any) -> Tuple[Any, bool]:
+    """Strips Optional[...] from an annotation; returns (inner, was_optional)."""
+    origin = typing.get_origin(annotation)
+    if origin is Union or origin is types.UnionType:
+        args = [a for a in typing.get_args(annotation) if a is not type(None)]
+        optional = len(args) < len(typing.get_args(annotation))
+        return (args[0] if len(args) == 1 else annotation), optional
+    return annotation, False
+
+
+def _model_of(annotation: Any) -> Optional[Type[BaseModel]]:
+    return annotation if isinstance(annotation, type) and issubclass(annotation, BaseModel) else None
+
+
+def _empty_value(annotation: Any) -> Any:
+    inner, optional = _unwrap(annotation)
+    if optional:
+        return None
+    origin = typing.get_origin(inner) or inner
+    if origin in (list, List, set, tuple):
+        return []
+    if origin in (dict, Dict):
+        return {}
+    nested = _model_of(inner)
+    if nested is not None:
+        return _fill(nested, {})
+    return {str: "", int: 0, float: 0.0, bool: False}.get(origin)
+
+
+def _fill(model_cls: Type[BaseModel], data: Any) -> Any:
+    """Fills required fields missing from `data` (recursively) with empty values."""
+    if not isinstance(data, dict):
+        return data
+    data = dict(data)
+    for name, field in model_cls.model_fields.items():
+        key = field.alias or name
+        if key not in data or data[key] is None:
+            if field.is_required():
+                data[key] = _empty_value(field.annotation)
+            continue
+        inner, _ = _unwrap(field.annotation)
+        nested = _model_of(inner)
+        if nested is not None:
+            data[key] = _fill(nested, data[key])
+        elif typing.get_origin(inner) in (list, List) and isinstance(data[key], list):
+            item_model = _model_of(_unwrap(typing.get_args(inner)[0])[0]) if typing.get_args(inner) else None
+            if item_model is not None:
+                data[key] = [_fill(item_model, item) for item in data[key]]
+    return data
+
+
+def _drop_nulls(model_cls: Type[BaseModel], data: Any) -> Any:
+    """Removes nulls for optional fields so their defaults apply.
+
+    Strict schemas make optional fields required-but-nullable, so a model
+    answering `null` for e.g. a list field with a `[]` default is expected.
+    """
+    if not isinstance(data, dict):
+        return data
+    data = dict(data)
+    for name, field in model_cls.model_fields.items():
+        key = field.alias or name
+        if key not in data:
+            continue
+        if data[key] is None and not field.is_required():
+            del data[key]
+            continue
+        inner, _ = _unwrap(field.annotation)
+        nested = _model_of(inner)
+        if nested is not None:
+            data[key] = _drop_nulls(nested, data[key])
+        elif typing.get_origin(inner) in (list, List) and isinstance(data[key], list) and typing.get_args(inner):
+            item_model = _model_of(_unwrap(typing.get_args(inner)[0])[0])
+            if item_model is not None:
+                data[key] = [_drop_nulls(item_model, item) for item in data[key]]
+    return data
+
+
+# --- Stats ---
+
+_stats_lock = threading.Lock()
+_stats: Dict[str, Dict[str, int]] = {}
+
+
+def _record(section: str, outcome: str) -> None:
+    with _stats_lock:
+        entry = _stats.setdefault(section, {"calls": 0, "clean": 0, "repaired": 0, "failed": 0})
+        entry["calls"] += 1
+        entry[outcome] += 1
+
+
+def stats() -> Dict[str, Any]:
+    with _stats_lock:
+        sections = {section: dict(entry) for section, entry in _stats.items()}
+    for entry in sections.values():
+        entry["repair_rate"] = round(entry["repaired"] / entry["calls"], 3)
+        entry["failure_rate"] = round(entry["failed"] / entry["calls"], 3)
+    return sections
+
+
+# --- Parsing ---
+
+def _decode(content: Optional[str]) -> Tuple[Any, bool]:
+    if not content or not content.strip():
+        raise StructuredOutputError("Empty LLM output.")
+    try:
+        return json.loads(content), False
+    except json.JSONDecodeError:
+        pass
+    try:
+        return _repair_text(content), True
+    except (json.JSONDecodeError, StructuredOutputError) as e:
+        raise StructuredOutputError(f"Output is not JSON and could not be repaired: {e}") from e
+
+
+def loads(section: str, content: Optional[str], record: bool = True) -> Any:
+    """json.loads with the repair pass; raises StructuredOutputError."""
+    try:
+        data, repaired = _decode(content)
+    except StructuredOutputError:
+        if record:
+            _record(section, "failed")
+        raise
+    if repaired:
+        logger.info(f"structured_output[{section}]: repaired malformed JSON.")
+    if record:
+        _record(section, "repaired" if repaired else "clean")
+    return data
+
+
+def parse(section: str, content: Optional[str], model_cls: Type[M], record: bool = True) -> M:
+    """Validates `content` as `model_cls`, repairing it first if needed; raises StructuredOutputError.
+
+    Pass `record=False` when the same completion was already counted (e.g. by
+    model_router validating it).
+    """
+    try:
+        data, repaired = _decode(content)
+        data = _drop_nulls(model_cls, data)
+        try:
+            result = model_cls.model_validate(data)
+        except ValidationError as first_error:
+            try:
+                result = model_cls.model_validate(_fill(model_cls, data))
+            except ValidationError:
+                raise StructuredOutputError(f"Output does not match {model_cls.__name__}: {first_error}") from first_error
+            repaired = True
+    except StructuredOutputError:
+        if record:
+            _record(section, "failed")
+        raise
+    if repaired:
+        logger.info(f"structured_output[{section}]: repaired output into {model_cls.__name__}.")
+    if record:
+        _record(section, "repaired" if repaired else "clean")
+    return result
@@ -0,0 +1,48 @@
+import time
+
+import cache
+from cache import LRUTTLCache, guide_cache_key
+
+
+def test_lru_eviction_by_entries_and_bytes():
+    cache = LRUTTLCache(max_entries=2, max_bytes=10, ttl_seconds=60)
+    cache.set("a", "xxx")
+    cache.set("b", "yyy")
+    assert cache.get("a") == "xxx"  # "a" is now most recently used
+    cache.set("c", "zzz")
+    assert cache.get("b") is None
+    assert cache.get("a") == "xxx"
+
+    cache.set("d", "0123456789")  # fills the byte cap on its own
+    assert cache.get("a") is None and cache.get("c") is None
+    assert cache.stats()["evictions"] == 3
+
+
+def test_entries_expire_after_ttl():
+    cache = LRUTTLCache(max_entries=10, max_bytes=1000, ttl_seconds=0.05)
+    cache.set("k", "v")
+    assert cache.get("k") == "v"
+    time.sleep(0.06)
+    assert cache.get("k") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_guide_key_is_canonical_and_versioned():
+    resume = {"skills": ["Python"], "summary": "x"}
+    jd = {"role_title": "Engineer"}
+    key = guide_cache_key(resume, jd, "Acme  Corp", "Tech", None, None, "v1")
+    assert key == guide_cache_key({"summary": "x", "skills": ["Python"]}, jd, "acme corp", "tech", "", "", "v1")
+    assert key != guide_cache_key(resume, jd, "Acme Corp", "Tech", None, None, "v2")
+
+
+def test_parsed_resume_cache_is_bounded_and_returns_copies(monkeypatch):
+    monkeypatch.setattr(cache, "_resume_cache", LRUTTLCache(max_entries=1, max_bytes=1000, ttl_seconds=60))
+    cache.set_cached_resume("resume one", {"skills": ["Python"]})
+    hit = cache.get_cached_resume("resume one")
+    hit["skills"].append("mutated")
+    assert cache.get_cached_resume("resume one") == {"skills": ["Python"]}
+
+    cache.set_cached_resume("resume two", {"skills": []})
+    assert cache.get_cached_resume("resume one") is None
+    stats = cache.resume_cache_stats()
+    assert (stats["entries"], stats["hits"], stats["misses"], stats["evictions"]) == (1, 2, 1, 1)
@@ -0,0 +1,41 @@
+from fastapi.testclient import TestClient
+
+import prompt_registry
+import structured_output
+from benchmarks import fake_openai
+from job_search_pipeline import ReturnRankedJobs
+
+
+def _chat(client, **body):
+    response = client.post("/v1/chat/completions", json={"model": "gpt-4o-mini", **body})
+    assert response.status_code == 200
+    return response.json()["choices"][0]
+
+
+def test_bodies_validate_against_each_call_sites_schema():
+    client = TestClient(fake_openai.create_app())
+    for name in ("role_success", "role_understanding_fit", "star_story_bank", "prompt_c"):
+        prompt = prompt_registry.get(name)
+        choice = _chat(client, messages=[{"role": "system", "content": prompt.render(jd_role_title="Engineer")}])
+        structured_output.parse("test_fake_openai", choice["message"]["content"], prompt.response_model)
+
+    tool = {"type": "function", "function": {"name": "return_ranked_jobs", "parameters": ReturnRankedJobs.model_json_schema()}}
+    choice = _chat(client, messages=[{"role": "user", "content": "rank"}], tools=[tool],
+                   tool_choice={"type": "function", "function": {"name": "return_ranked_jobs"}})
+    arguments = choice["message"]["tool_calls"][0]["function"]["arguments"]
+    assert choice["finish_reason"] == "tool_calls" and ReturnRankedJobs.model_validate_json(arguments).job_listings
+
+    assert structured_output.stats()["test_fake_openai"]["clean"] == 4
+
+
+def test_injected_errors_and_truncation():
+    config = fake_openai.FakeOpenAIConfig(rate_429=1.0, retry_after=2)
+    client = TestClient(fake_openai.create_app(config))
+    response = client.post("/v1/chat/completions", json={"model": "m", "messages": []})
+    assert response.status_code == 429 and response.headers["retry-after"] == "2"
+
+    client = TestClient(fake_openai.create_app())
+    prompt = prompt_registry.get("prompt_b")
+    choice = _chat(client, messages=[{"role": "system", "content": prompt.text}], max_tokens=20)
+    assert choice["finish_reason"] == "length"
+    assert client.get("/fake/stats").json()["truncated"] == 1
@@ -0,0 +1,49 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+import serpapi_async
+from benchmarks import fake_serpapi
+from job_search_pipeline import JobSearchPreferences, query_serpapi_google_jobs
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    """Routes the app's httpx SerpAPI calls into an in-process fake."""
+    app = fake_serpapi.create_app(fake_serpapi.FakeSerpAPIConfig(seed=1))
+    transport = httpx.ASGITransport(app=app)
+
+    async def handle(self, request):
+        return await transport.handle_async_request(request)
+
+    monkeypatch.setattr(httpx.AsyncHTTPTransport, "handle_async_request", handle)
+    monkeypatch.setenv("SERPAPI_API_KEY", "fake")
+    return app.state.fake
+
+
+def test_fetch_serpapi_jobs_follows_next_page_tokens(fake):
+    preferences = JobSearchPreferences(job_title_keywords="Engineer", location="Chicago, IL", remote_preference="No preference")
+    jobs, token = asyncio.run(serpapi_async.fetch_serpapi_jobs(preferences, want=25))
+    assert len(jobs) == 25 and token
+    assert fake.stats["pages"] == 3
+    assert all("Chicago" in job["location"] or job["location"] == "Anywhere" for job in jobs)
+
+
+def test_query_google_jobs_applies_the_discovered_past_month_filter(fake):
+    result = asyncio.run(query_serpapi_google_jobs("Data", "New York, NY", {}, target_count=15))
+    assert result["error"] is None and len(result["jobs"]) >= 15
+    assert fake.stats["filtered_requests"] == 1
+    assert all(job["detected_extensions"]["posted_at"] != "2 months ago" for job in result["jobs"])
+
+
+def test_news_engines_and_missing_api_key():
+    client = TestClient(fake_serpapi.create_app())
+    news = client.get("/search", params={"engine": "google", "tbm": "nws", "q": "Globex recent news", "num": 3, "api_key": "k"}).json()
+    assert len(news["news_results"]) == 3 and all("Globex" in item["title"] for item in news["news_results"])
+
+    google_news = client.get("/search", params={"engine": "google_news", "q": "Globex", "api_key": "k"}).json()
+    assert google_news["news_results"][0]["source"]["name"]
+
+    assert client.get("/search.json", params={"engine": "google_jobs", "q": "Engineer"}).status_code == 401
@@ -0,0 +1,115 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+import cache
+import main
+import model_router
+from interview_prep_v2_models import QuestionsToAskSectionModel, RoleSuccessFactorsSection, StarStoryBankSectionModel
+from interview_prep_v2_orchestrator import SectionOrchestrator
+
+REQUEST = {"resume_structured": {"skills": ["Python"]}, "jd_structured": {"role_title": "Engineer"}, "company_name": "Acme"}
+
+# Finishing order differs from GUIDE_SECTION_NAMES order.
+STUB_SECTIONS = {
+    "section_9_questions_to_ask": (0.0, QuestionsToAskSectionModel),
+    "section_3_role_success": (0.05, lambda: RoleSuccessFactorsSection(overall_readiness="Ready")),
+    "section_5_star_story_bank": (0.1, StarStoryBankSectionModel),
+}
+
+
+@pytest.fixture
+def stub_plan(monkeypatch):
+    monkeypatch.setattr(cache, "_guide_cache", cache.LRUTTLCache(max_entries=10, max_bytes=10**6, ttl_seconds=60))
+    builds = []
+
+    def build_interview_prep_plan(**kwargs):
+        builds.append(kwargs)
+        plan = SectionOrchestrator()
+        for name, (delay, make) in STUB_SECTIONS.items():
+            async def runner(_deps, delay=delay, make=make):
+                await asyncio.sleep(delay)
+                return make()
+            plan.add(name, runner)
+        return plan
+
+    monkeypatch.setattr(main, "build_interview_prep_plan", build_interview_prep_plan)
+    return builds
+
+
+def _events(client):
+    with client.stream("POST", "/api/interview-v2/generate/stream", json=REQUEST) as response:
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        return [json.loads(line) for line in response.iter_lines() if line]
+
+
+def test_stream_emits_sections_in_completion_order_then_replays_from_cache(stub_plan):
+    client = TestClient(main.app)
+    events = _events(client)
+
+    assert [e["event"] for e in events] == ["start", "section", "section", "section", "guide"]
+    assert events[0]["sections"] == ["section_3_role_success", "section_5_star_story_bank", "section_9_questions_to_ask"]
+    assert "cached" not in events[0]
+    assert [e["section"] for e in events[1:4]] == list(STUB_SECTIONS)
+    assert all(e["ok"] and not e["cached"] and not e["timed_out"] for e in events[1:4])
+    assert events[2]["data"]["overall_readiness"] == "Ready"
+    assert events[4]["data"]["section_3_role_success"]["overall_readiness"] == "Ready"
+    assert len(stub_plan) == 1
+
+    replay = _events(client)
+    assert [e["event"] for e in replay] == ["start", "section", "section", "section", "section", "section", "section", "section", "guide"]
+    assert replay[0]["cached"] is True
+    assert {e["section"]: e["data"] for e in replay[1:-1]}["section_3_role_success"] == events[2]["data"]
+    assert replay[-1]["data"] == events[-1]["data"]
+    assert len(stub_plan) == 1  # no plan (or speculative claim) for a cached replay
+
+
+@pytest.mark.filterwarnings("ignore:Pydantic serializer warnings")
+def test_stream_reports_validation_failure_as_error_event(stub_plan, monkeypatch):
+    def invalid_guide(*args, **kwargs):
+        return main.InterviewPrepV2Guide.model_construct(section_3_role_success="not a section")
+
+    monkeypatch.setattr(main, "assemble_interview_prep_guide", invalid_guide)
+    events = _events(TestClient(main.app))
+    assert [e["event"] for e in events] == ["start", "section", "section", "section", "error"]
+    assert events[-1]["detail"].startswith("Final guide validation failed")
+    assert cache.get_cached_guide(main._guide_cache_key(main.GenerateInterviewPrepRequest(**REQUEST))) is None
+
+
+def test_guide_with_a_failed_builder_is_not_cached(monkeypatch):
+    monkeypatch.setattr(cache, "_guide_cache", cache.LRUTTLCache(max_entries=10, max_bytes=10**6, ttl_seconds=60))
+    monkeypatch.setattr(cache, "_section_cache", cache.LRUTTLCache(max_entries=100, max_bytes=10**6, ttl_seconds=60))
+    monkeypatch.setattr(cache, "_shared_section_cache", cache.LRUTTLCache(max_entries=100, max_bytes=10**6, ttl_seconds=60))
+    outputs = {
+        "role_success": {"evaluated_must_haves": [], "evaluated_nice_to_haves": [], "overall_readiness": "Ready", "focus_recommendations": []},
+        "role_understanding_fit": {"role_summary": "Builds APIs", "overall_fit_rating": "Strong Fit"},
+        "star_story_bank": {"stories": []},
+        "prompt_b": {"section_9_questions_to_ask": {}},
+        "prompt_c": {},
+    }
+    failing = {"role_understanding_fit"}
+
+    async def chat_completion(section, **kwargs):
+        if section in failing:
+            raise RuntimeError("429 retries exhausted")
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=json.dumps(outputs[section])))])
+
+    monkeypatch.setattr(model_router, "chat_completion", chat_completion)
+    request = {
+        "resume_structured": {"positions": [{"title": "Engineer", "description": "Built services in Python"}]},
+        "jd_structured": {"role_title": "Engineer", "requirements": ["Python"]},
+    }
+    client = TestClient(main.app)
+    key = main._guide_cache_key(main.GenerateInterviewPrepRequest(**request))
+
+    guide = client.post("/api/interview-v2/generate", json=request).json()
+    assert guide["section_4_role_understanding_fit_assessment"]["overall_fit_rating"] == ""
+    assert cache.get_cached_guide(key) is None
+
+    failing.clear()
+    guide = client.post("/api/interview-v2/generate", json=request).json()
+    assert guide["section_4_role_understanding_fit_assessment"]["overall_fit_rating"] == "Strong Fit"
+    assert cache.get_cached_guide(key) is not None
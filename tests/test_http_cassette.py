@@ -0,0 +1,77 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+import requests
+
+import http_cassette
+
+
+class _CountingTransport(httpx.AsyncHTTPTransport):
+    """Stands in for the network below the hook (the real handle_async_request)."""
+
+    calls = 0
+
+    async def handle_async_request(self, request):
+        _CountingTransport.calls += 1
+        body = {"echo": request.url.params.get("q"), "n": _CountingTransport.calls}
+        return httpx.Response(200, json=body, headers={"x-request-id": f"req-{_CountingTransport.calls}"})
+
+
+@pytest.fixture
+def hooked(monkeypatch):
+    monkeypatch.setattr(httpx.AsyncHTTPTransport, "handle_async_request", _CountingTransport.handle_async_request)
+    _CountingTransport.calls = 0
+    yield
+    http_cassette.uninstall()
+
+
+async def _search(q: str, api_key: str) -> dict:
+    async with httpx.AsyncClient() as client:
+        response = await client.get("https://serpapi.com/search.json", params={"q": q, "engine": "google_jobs", "api_key": api_key})
+        return response.json()
+
+
+def test_record_then_replay_matches_canonically_and_cycles(tmp_path, hooked):
+    path = str(tmp_path / "cassette.jsonl")
+    http_cassette.install(http_cassette.Cassette(path, mode=http_cassette.RECORD))
+    first = asyncio.run(_search("python", "real-key"))
+    second = asyncio.run(_search("python", "real-key"))
+    assert _CountingTransport.calls == 2
+    assert "real-key" not in open(path).read()
+
+    cassette = http_cassette.install(http_cassette.Cassette(path, mode=http_cassette.REPLAY))
+    # Another key and the same request again replay the recordings in order, offline.
+    assert asyncio.run(_search("python", "other-key")) == first
+    assert asyncio.run(_search("python", "other-key")) == second
+    assert _CountingTransport.calls == 2
+
+    assert asyncio.run(_search("golang", "other-key"))["error"]["type"] == "cassette_miss"
+    stats = cassette.stats()
+    assert stats["replayed"] == 2 and stats["misses"] == 1
+    assert stats["calls_by_endpoint"] == {"/search.json?engine=google_jobs": 3}
+
+
+def test_canonical_key_ignores_credentials_param_order_and_body_key_order():
+    a = http_cassette.canonical_request("post", "https://api.openai.com/v1/chat/completions?b=2&a=1&api_key=x", b'{"model": "m", "n": 1}')
+    b = http_cassette.canonical_request("POST", "http://127.0.0.1:8765/v1/chat/completions?a=1&b=2", b'{"n": 1, "model": "m"}')
+    assert http_cassette.request_key(a) == http_cassette.request_key(b)
+    c = http_cassette.canonical_request("POST", "https://api.openai.com/v1/chat/completions?a=1&b=2", b'{"n": 2, "model": "m"}')
+    assert http_cassette.request_key(a) != http_cassette.request_key(c)
+
+
+def test_requests_replay_with_recorded_latency(tmp_path):
+    path = str(tmp_path / "cassette.jsonl")
+    cassette = http_cassette.Cassette(path, mode=http_cassette.RECORD)
+    canonical = http_cassette.canonical_request("GET", "https://serpapi.com/search?engine=google_news&q=acme", None)
+    cassette.record(canonical, 200, {"content-type": "application/json"}, b'{"news_results": []}', 0.05)
+
+    http_cassette.install(http_cassette.Cassette(path, mode=http_cassette.REPLAY, latency=http_cassette.LATENCY_RECORDED))
+    try:
+        start = time.perf_counter()
+        response = requests.get("https://serpapi.com/search", params={"q": "acme", "engine": "google_news", "api_key": "k"})
+        assert response.json() == {"news_results": []}
+        assert time.perf_counter() - start >= 0.05
+    finally:
+        http_cassette.uninstall()
@@ -0,0 +1,138 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import cache
+import interview_prep_v2_orchestrator
+import llm_retry
+import model_router
+import serpapi_news_fetcher
+from interview_prep_v2_builders import build_role_success_section
+from interview_prep_v2_models import JobDescriptionStructured, PositionModel, ResumeStructured, RoleUnderstandingFitAssessmentSectionModel
+from interview_prep_v2_orchestrator import build_interview_prep_plan
+
+
+def test_role_success_section_is_filled_from_the_assessment(monkeypatch):
+    assessment = {
+        "evaluated_must_haves": [{"text": "Python", "met": True, "resume_evidence": "Built services in Python"}],
+        "evaluated_nice_to_haves": [{"text": "Go", "met": False}],
+        "overall_readiness": "Strong match on the core stack.",
+        "focus_recommendations": ["Prepare a Go story"],
+    }
+
+    async def chat_completion(section, **kwargs):
+        assert section == "role_success"
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=json.dumps(assessment)))])
+
+    monkeypatch.setattr(model_router, "chat_completion", chat_completion)
+    jd = JobDescriptionStructured(requirements=["Python", "Go"], responsibilities=["Build APIs"])
+    section = asyncio.run(build_role_success_section(jd, "- Built services in Python"))
+
+    assert [item.text for item in section.must_haves] == ["Python"]
+    assert section.must_haves[0].met
+    assert section.overall_readiness == "Strong match on the core stack."
+    assert section.focus_recommendations == ["Prepare a Go story"]
+    assert section.job_duties == ["Build APIs"]
+
+
+def test_failed_llm_call_fails_the_section_and_is_not_cached(monkeypatch):
+    monkeypatch.setattr(cache, "_section_cache", cache.LRUTTLCache(max_entries=10, max_bytes=10**6, ttl_seconds=60))
+    calls = []
+
+    async def chat_completion(section, **kwargs):
+        calls.append(section)
+        if len(calls) == 1:
+            raise RuntimeError("429 retries exhausted")
+        content = json.dumps({"role_summary": "Builds APIs", "overall_fit_rating": "Strong Fit"})
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+    monkeypatch.setattr(model_router, "chat_completion", chat_completion)
+    resume = ResumeStructured(positions=[PositionModel(title="Engineer", description="Built services in Python")])
+    jd = JobDescriptionStructured(role_title="Engineer", requirements=["Python"])
+    target = ["section_4_role_understanding_fit_assessment"]
+
+    failed = asyncio.run(build_interview_prep_plan(resume, jd).run(targets=target))[target[0]]
+    assert not failed.ok
+    assert failed.value == RoleUnderstandingFitAssessmentSectionModel()
+    assert cache.section_cache_stats()["entries"] == 0
+
+    # The next request regenerates the section rather than replaying an error.
+    retried = asyncio.run(build_interview_prep_plan(resume, jd).run(targets=target))[target[0]]
+    assert retried.ok and retried.value.overall_fit_rating == "Strong Fit"
+    assert len(calls) == 2 and cache.section_cache_stats()["entries"] == 1
+
+
+def test_retry_policy_errors_reach_the_orchestrator(monkeypatch):
+    async def chat_completion(section, **kwargs):
+        raise llm_retry.CircuitOpenError("gpt-4o-mini", 30.0)
+
+    monkeypatch.setattr(model_router, "chat_completion", chat_completion)
+    plan = build_interview_prep_plan(None, JobDescriptionStructured(role_title="Engineer"), company_name="Acme", use_cache=False)
+    results = asyncio.run(plan.run(targets=["section_8_insider_cheat_sheet", "llm_call_b"]))
+
+    for name in ("section_8_insider_cheat_sheet", "llm_call_b"):
+        assert isinstance(results[name].error, llm_retry.CircuitOpenError)
+
+
+def test_section_1_with_failed_news_is_not_shared(monkeypatch):
+    monkeypatch.setattr(cache, "_section_cache", cache.LRUTTLCache(max_entries=10, max_bytes=10**6, ttl_seconds=60))
+    monkeypatch.setattr(cache, "_shared_section_cache", cache.LRUTTLCache(max_entries=10, max_bytes=10**6, ttl_seconds=60))
+    monkeypatch.setattr(serpapi_news_fetcher, "_news_cache", {})
+    searches = []
+
+    async def build_profile_sections(company_name, jd_structured, job_description):
+        return {"overview": f"{company_name} makes widgets.", "facts": ["Widgets are booming"]}
+
+    def google_search(params):
+        searches.append(params["q"])
+        if len(searches) == 1:
+            raise ConnectionError("SerpAPI unreachable")
+        return SimpleNamespace(get_dict=lambda: {"news_results": [{"title": "Acme ships", "link": "https://news.example.com/1"}]})
+
+    monkeypatch.setattr(interview_prep_v2_orchestrator, "build_profile_sections", build_profile_sections)
+    monkeypatch.setattr(serpapi_news_fetcher, "google_search", google_search)
+    jd = JobDescriptionStructured(role_title="Engineer")
+    target = ["section_1_company_industry"]
+
+    def run():
+        plan = build_interview_prep_plan(None, jd, company_name="Acme", job_description="Build widgets")
+        return asyncio.run(plan.run(targets=target))
+
+    results = run()
+    section = results[target[0]]
+    assert section.value.company_overview == "Acme makes widgets." and section.value.recent_news == []
+    assert not results["company_news"].ok
+    # Only the profile is shared; section 1 itself is rebuilt once the news comes back.
+    assert cache.shared_section_cache_stats()["entries"] == 1
+    assert cache.section_cache_stats()["entries"] == 0
+
+    section = run()[target[0]]
+    assert [item.title for item in section.value.recent_news] == ["Acme ships"]
+    assert len(searches) == 2 and cache.shared_section_cache_stats()["entries"] == 2
+
+
+def test_lazy_technical_case_prep_is_cached_once_and_bypassable(monkeypatch):
+    monkeypatch.setattr(cache, "_section_cache", cache.LRUTTLCache(max_entries=10, max_bytes=10**6, ttl_seconds=60))
+    monkeypatch.setattr(cache, "_shared_section_cache", cache.LRUTTLCache(max_entries=10, max_bytes=10**6, ttl_seconds=60))
+    calls = []
+
+    async def chat_completion(section, **kwargs):
+        calls.append(section)
+        content = json.dumps({"key_concepts": [f"Concept {len(calls)}"], "prompts": []})
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+    monkeypatch.setattr(model_router, "chat_completion", chat_completion)
+    jd = JobDescriptionStructured(role_title="Engineer", requirements=["Python"])
+    target = ["section_6_technical_case_prep"]
+
+    def run(role_title="Engineer", use_cache=True):
+        plan = build_interview_prep_plan(None, jd.model_copy(update={"role_title": role_title}), lazy_sections=True, use_cache=use_cache)
+        return asyncio.run(plan.run(targets=target))[target[0]].value
+
+    assert run().key_concepts == ["Concept 1"]
+    # Shared across users, with a single cache entry.
+    assert run(role_title="  ENGINEER ").key_concepts == ["Concept 1"]
+    assert cache.shared_section_cache_stats()["entries"] == 1
+    # Bypassing the cache really regenerates the section.
+    assert run(use_cache=False).key_concepts == ["Concept 2"]
+    assert calls == ["technical_case_prep", "technical_case_prep"]
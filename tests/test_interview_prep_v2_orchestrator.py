@@ -0,0 +1,202 @@
+import asyncio
+import time
+
+import pytest
+
+from interview_prep_v2_orchestrator import SectionOrchestrator
+
+
+def test_independent_sections_run_concurrently():
+    plan = SectionOrchestrator()
+
+    async def slow(_deps):
+        await asyncio.sleep(0.2)
+        return "done"
+
+    for name in ("a", "b", "c"):
+        plan.add(name, slow)
+
+    start = time.perf_counter()
+    results = asyncio.run(plan.run())
+    elapsed = time.perf_counter() - start
+
+    assert {name: r.value for name, r in results.items()} == {"a": "done", "b": "done", "c": "done"}
+    assert elapsed < 0.5
+
+
+def test_dependant_receives_dependency_values():
+    plan = SectionOrchestrator()
+
+    async def base(_deps):
+        return 2
+
+    async def doubled(deps):
+        return deps["base"] * 2
+
+    plan.add("doubled", doubled, depends_on=["base"])
+    plan.add("base", base)
+
+    results = asyncio.run(plan.run())
+    assert results["doubled"].value == 4
+
+
+def test_failing_section_is_isolated_and_uses_default():
+    plan = SectionOrchestrator()
+
+    async def broken(_deps):
+        raise RuntimeError("boom")
+
+    async def fine(_deps):
+        return "ok"
+
+    async def downstream(deps):
+        return deps["broken"]
+
+    plan.add("broken", broken, default=list)
+    plan.add("fine", fine)
+    plan.add("downstream", downstream, depends_on=["broken"])
+
+    results = asyncio.run(plan.run())
+    assert results["broken"].value == []
+    assert not results["broken"].ok
+    assert results["fine"].value == "ok"
+    assert results["downstream"].value == []
+
+
+def test_cycles_and_unknown_dependencies_are_rejected():
+    async def noop(_deps):
+        return None
+
+    cyclic = SectionOrchestrator()
+    cyclic.add("a", noop, depends_on=["b"])
+    cyclic.add("b", noop, depends_on=["a"])
+    with pytest.raises(ValueError):
+        asyncio.run(cyclic.run())
+
+    dangling = SectionOrchestrator()
+    dangling.add("a", noop, depends_on=["missing"])
+    with pytest.raises(ValueError):
+        asyncio.run(dangling.run())
+
+
+def test_cached_sections_skip_their_uncached_intermediates():
+    calls = []
+
+    def build_plan():
+        plan = SectionOrchestrator(version="test-section-cache")
+
+        async def expensive(_deps):
+            calls.append("expensive")
+            return {"items": [1, 2]}
+
+        async def derived(deps):
+            calls.append("derived")
+            return {"count": len(deps["expensive"]["items"])}
+
+        async def sibling(_deps):
+            calls.append("sibling")
+            return ["value"]
+
+        plan.add("expensive", expensive, default=dict, inputs={"q": "same"})
+        plan.add("derived", derived, depends_on=["expensive"], default=dict, inputs={})
+        plan.add("sibling", sibling, default=list, inputs={"q": "same"})
+        return plan
+
+    first = asyncio.run(build_plan().run())
+    assert first["derived"].value == {"count": 2} and not first["derived"].cached
+    assert sorted(calls) == ["derived", "expensive", "sibling"]
+
+    calls.clear()
+    second = asyncio.run(build_plan().run())
+    assert calls == []
+    assert second["derived"].cached and second["derived"].value == {"count": 2}
+    assert "expensive" not in second
+
+    calls.clear()
+    plan = build_plan()
+    plan.refresh("derived")
+    third = asyncio.run(plan.run())
+    assert sorted(calls) == ["derived", "expensive"]
+    assert third["sibling"].cached
+
+
+def test_shared_sections_are_reused_across_users():
+    calls = []
+
+    def build_plan(company, resume):
+        plan = SectionOrchestrator(version="test-shared-cache")
+
+        async def company_section(_deps):
+            calls.append(("company", company))
+            return {"overview": "Makes widgets"}
+
+        async def personal_section(_deps):
+            calls.append(("personal", resume))
+            return {"stories": [resume]}
+
+        plan.add("company", company_section, default=dict, shared=True, inputs={"company_name": company})
+        plan.add("personal", personal_section, default=dict, inputs={"resume": resume})
+        return plan
+
+    asyncio.run(build_plan("Acme Corp", "alice").run())
+    results = asyncio.run(build_plan("  acme corp ", "bob").run())
+    assert results["company"].cached
+    assert calls == [("company", "Acme Corp"), ("personal", "alice"), ("personal", "bob")]
+
+    async def noop(_deps):
+        return None
+
+    with pytest.raises(ValueError):
+        SectionOrchestrator().add("bad", noop, depends_on=["x"], shared=True, inputs={})
+
+
+def test_sections_missing_their_budget_become_timed_out_placeholders():
+    plan = SectionOrchestrator(deadline=0.2)
+
+    async def fast(_deps):
+        return "fast"
+
+    async def stuck(_deps):
+        await asyncio.sleep(10)
+
+    async def dependant(deps):
+        return f"built from {deps['stuck']}"
+
+    plan.add("fast", fast)
+    plan.add("stuck", stuck, default=lambda: "placeholder", budget_share=0.5)
+    plan.add("dependant", dependant, depends_on=["stuck"])
+
+    start = time.perf_counter()
+    results = asyncio.run(plan.run())
+    assert time.perf_counter() - start < 0.5
+
+    assert results["fast"].ok and not results["fast"].timed_out
+    assert results["stuck"].value == "placeholder" and results["stuck"].timed_out
+    assert results["dependant"].value == "built from placeholder" and results["dependant"].timed_out
+
+
+def test_peek_reports_cached_sections_and_targets_build_lazy_ones_on_demand():
+    calls = []
+
+    def build_plan():
+        plan = SectionOrchestrator(version="test-lazy-sections")
+
+        async def cheap(_deps):
+            calls.append("cheap")
+            return ["cheap"]
+
+        async def expensive(_deps):
+            calls.append("expensive")
+            return ["expensive"]
+
+        plan.add("cheap", cheap, default=list, inputs={"q": "lazy"})
+        plan.add("expensive", expensive, default=list, inputs={"q": "lazy"})
+        return plan
+
+    assert build_plan().peek(["cheap", "expensive"]) == {}
+    asyncio.run(build_plan().run(targets=["cheap"]))
+    assert calls == ["cheap"]
+    assert build_plan().peek(["cheap", "expensive"]) == {"cheap": ["cheap"]}
+
+    loaded = asyncio.run(build_plan().run(targets=["expensive"]))
+    assert calls == ["cheap", "expensive"] and loaded["expensive"].value == ["expensive"]
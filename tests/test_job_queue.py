@@ -0,0 +1,57 @@
+import asyncio
+import time
+
+from job_queue import FAILED, QUEUED, RUNNING, SUCCEEDED, JobQueue, WorkerPool
+
+
+def test_failed_attempts_are_retried_until_max_attempts(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+    job_id = queue.enqueue("k", {"x": 1}, max_attempts=2)
+
+    job = queue.claim("w1")
+    assert job["payload"] == {"x": 1} and job["attempts"] == 1
+    assert queue.claim("w2") is None  # leased to w1
+    queue.fail(job_id, "w1", "boom", retry_delay=0)
+    assert queue.get(job_id)["status"] == QUEUED
+
+    queue.claim("w1")
+    queue.fail(job_id, "w1", "boom again", retry_delay=0)
+    assert queue.get(job_id)["status"] == FAILED
+    assert queue.claim("w1") is None
+
+
+def test_lapsed_lease_is_reclaimed_by_another_worker(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+    job_id = queue.enqueue("k", {})
+    queue.claim("crashed", visibility_timeout=0.01)
+    time.sleep(0.02)
+
+    job = queue.claim("w2")
+    assert job["id"] == job_id and job["attempts"] == 2
+    assert not queue.complete(job_id, "crashed", "{}")  # the old owner lost its lease
+    assert queue.complete(job_id, "w2", '{"ok": true}')
+    assert queue.get(job_id)["result"] == '{"ok": true}'
+
+
+def test_worker_pool_runs_jobs_and_releases_them_on_shutdown(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+    done_id = queue.enqueue("fast", {"n": 2})
+    slow_id = queue.enqueue("slow", {})
+
+    async def fast(payload):
+        return str(payload["n"] * 2)
+
+    async def slow(_payload):
+        await asyncio.sleep(10)
+
+    async def scenario():
+        pool = WorkerPool(queue, {"fast": fast, "slow": slow}, concurrency=2, poll_interval=0.01)
+        await pool.start()
+        await asyncio.sleep(0.2)
+        assert queue.get(slow_id)["status"] == RUNNING
+        await pool.stop()
+
+    asyncio.run(scenario())
+    assert queue.get(done_id)["status"] == SUCCEEDED and queue.get(done_id)["result"] == "4"
+    released = queue.get(slow_id)
+    assert released["status"] == QUEUED and released["attempts"] == 0
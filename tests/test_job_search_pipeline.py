@@ -0,0 +1,46 @@
+import json
+from types import SimpleNamespace
+
+from fastapi.testclient import TestClient
+
+import job_search_pipeline
+import llm_gateway
+import main
+import serpapi_async
+
+PREFERENCES = {"job_title_keywords": "Data Engineer", "location": "Chicago, IL", "remote_preference": "No preference"}
+
+
+def test_job_search_ranks_one_page_once_and_returns_frontend_shape(monkeypatch):
+    serpapi_requests = []
+
+    async def serpapi_get_json(client, url, params):
+        serpapi_requests.append(params)
+        start = 10 * (len(serpapi_requests) - 1)
+        jobs = [{"title": f"Job {i}", "company_name": f"Co {i}", "share_link": f"https://jobs.example/{i}"} for i in range(start, start + 10)]
+        return {"jobs_results": jobs, "search_metadata": {"serpapi_pagination": {"next_page_token": f"page-{len(serpapi_requests) + 1}"}}}
+
+    rank_calls = []
+
+    async def chat_completion(**kwargs):
+        jobs = json.loads(kwargs["messages"][1]["content"].split("Job Listings to Rank:\n--- --- --- --- ---\n")[1].split("\n--- ---")[0])
+        rank_calls.append(len(jobs))
+        listings = [{"job_title": j["job_title"], "company": j["company"], "details_link": j["details_link"], "match_score": 10 - i % 10, "reason": "fit"}
+                    for i, j in enumerate(jobs[:10])]
+        call = SimpleNamespace(function=SimpleNamespace(name="return_ranked_jobs", arguments=json.dumps({"job_listings": listings})))
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(tool_calls=[call]))])
+
+    monkeypatch.setattr(serpapi_async, "serpapi_get_json", serpapi_get_json)
+    monkeypatch.setattr(llm_gateway, "chat_completion", chat_completion)
+    monkeypatch.setattr(job_search_pipeline, "OPENAI_API_KEY", "test-key")
+
+    response = TestClient(main.app).post("/api/job-search", json={"resume_text": "Python, Spark", "preferences": PREFERENCES})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert set(body) == {"jobs", "remaining", "next_page_token", "has_more"}
+    assert len(body["jobs"]) == 8 and len(body["remaining"]) == 2
+    assert set(body["jobs"][0]) == {"job_title", "company", "details_link", "match_score", "reason"}
+    assert body["next_page_token"] == "page-3" and body["has_more"] is True
+    assert rank_calls == [15]  # one ranking call for the 15 fetched jobs
+    assert [p.get("next_page_token") for p in serpapi_requests] == [None, "page-2"]
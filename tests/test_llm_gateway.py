@@ -0,0 +1,104 @@
+import asyncio
+
+import httpx
+import pytest
+from pydantic import BaseModel
+
+import llm_gateway
+import llm_hedging
+
+COMPLETION = {
+    "id": "chatcmpl-test",
+    "object": "chat.completion",
+    "created": 0,
+    "model": "test-gateway",
+    "choices": [{"index": 0, "message": {"role": "assistant", "content": "hi"}, "finish_reason": "stop"}],
+}
+
+
+@pytest.fixture
+def mock_upstream(monkeypatch):
+    """Routes the gateway's pooled transport to an in-process handler."""
+    state = {"requests": 0, "delay": 0.0}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        state["requests"] += 1
+        await asyncio.sleep(state["delay"])
+        return httpx.Response(200, json=COMPLETION)
+
+    monkeypatch.setattr(llm_gateway, "_async_pool_transport", lambda: httpx.MockTransport(handler))
+    monkeypatch.setattr(llm_gateway, "_async_clients", {})
+    return state
+
+
+def test_client_is_reused_within_a_loop_and_recreated_on_a_new_one(mock_upstream):
+    async def use_client():
+        client = llm_gateway.get_client()
+        assert llm_gateway.get_client() is client
+        response = await llm_gateway.chat_completion(model="test-gateway-reuse", messages=[{"role": "user", "content": "a"}])
+        assert response.choices[0].message.content == "hi"
+        return client
+
+    before = llm_gateway.stats()["async"]["requests_started"]
+    first = asyncio.run(use_client())
+    second = asyncio.run(use_client())
+    assert second is not first
+    stats = llm_gateway.stats()["async"]
+    assert stats["clients"] == 1  # the closed first loop's client was dropped
+    assert stats["requests_started"] - before == 2 == mock_upstream["requests"]
+
+    async def shutdown_on_live_loop():
+        client = llm_gateway.get_client()
+        await llm_gateway.shutdown()
+        return client
+
+    assert asyncio.run(shutdown_on_live_loop()).is_closed()
+    assert llm_gateway.stats()["async"]["clients"] == 0
+
+
+def test_abandoned_call_is_cancelled_and_counted(mock_upstream):
+    mock_upstream["delay"] = 10
+
+    async def scenario():
+        task = asyncio.create_task(llm_gateway.chat_completion(
+            model="test-gateway-cancel", messages=[{"role": "user", "content": "b"}], max_tokens=50,
+        ))
+        while not mock_upstream["requests"]:
+            await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await asyncio.sleep(0)  # let the single-flight leader observe the cancellation
+        await llm_gateway.shutdown()
+
+    before = llm_gateway.stats()["cancelled"]
+    asyncio.run(scenario())
+    after = llm_gateway.stats()["cancelled"]
+    assert after["calls"] - before["calls"] == 1
+    assert after["completion_tokens_allowance"] - before["completion_tokens_allowance"] == 50
+    assert after["prompt_tokens_estimate"] > before["prompt_tokens_estimate"]
+
+
+def test_hedge_on_another_model_gets_that_models_response_format(monkeypatch):
+    class Answer(BaseModel):
+        text: str
+
+    monkeypatch.setattr(llm_hedging, "LLM_HEDGING_ENABLED", True)
+    monkeypatch.setattr(llm_hedging, "LLM_HEDGE_BUDGET_RATIO", 1.0)
+    monkeypatch.setattr(llm_hedging, "LLM_HEDGE_MODELS", {"gpt-4o": "gpt-4-turbo"})
+    for _ in range(llm_hedging.LLM_HEDGE_MIN_SAMPLES):
+        llm_hedging._tracker("hedge-format").record(0.05)
+    formats = {}
+
+    async def chat_attempts(kwargs):
+        formats[kwargs["model"]] = kwargs["response_format"]["type"]
+        await asyncio.sleep(5 if kwargs["model"] == "gpt-4o" else 0.01)
+        return kwargs["model"]
+
+    monkeypatch.setattr(llm_gateway, "_chat_attempts", chat_attempts)
+    winner = asyncio.run(llm_gateway.chat_completion(
+        hedge_key="hedge-format", response_model=Answer, model="gpt-4o", messages=[{"role": "user", "content": "hi"}]
+    ))
+    assert winner == "gpt-4-turbo"
+    # gpt-4-turbo has no strict JSON schema mode, so the hedge must not reuse gpt-4o's.
+    assert formats == {"gpt-4o": "json_schema", "gpt-4-turbo": "json_object"}
@@ -0,0 +1,49 @@
+import asyncio
+
+import llm_hedging
+
+
+def _enable(monkeypatch, key, budget_ratio=1.0):
+    monkeypatch.setattr(llm_hedging, "LLM_HEDGING_ENABLED", True)
+    monkeypatch.setattr(llm_hedging, "LLM_HEDGE_BUDGET_RATIO", budget_ratio)
+    monkeypatch.setattr(llm_hedging, "LLM_HEDGE_MODELS", {"slow-model": "fast-model"})
+    tracker = llm_hedging._tracker(key)
+    for _ in range(llm_hedging.LLM_HEDGE_MIN_SAMPLES):
+        tracker.record(0.05)
+
+
+def test_slow_call_is_hedged_on_faster_model_and_loser_cancelled(monkeypatch):
+    _enable(monkeypatch, "hedge-win")
+    cancelled = []
+
+    async def call(model):
+        try:
+            await asyncio.sleep(5 if model == "slow-model" else 0.01)
+        except asyncio.CancelledError:
+            cancelled.append(model)
+            raise
+        return model
+
+    assert asyncio.run(llm_hedging.hedged("hedge-win", "slow-model", call)) == "fast-model"
+    assert cancelled == ["slow-model"]
+    stats = llm_hedging.stats()["keys"]["hedge-win"]
+    assert stats["hedged"] == 1 and stats["hedge_win_rate"] == 1.0
+
+
+def test_hedges_are_capped_by_budget(monkeypatch):
+    _enable(monkeypatch, "hedge-budget", budget_ratio=0.5)
+    models = []
+
+    async def call(model):
+        models.append(model)
+        await asyncio.sleep(0.1)
+        return model
+
+    async def scenario():
+        # The first call alone would push hedges to 1 of 1 calls, over the 0.5 budget.
+        return [await llm_hedging.hedged("hedge-budget", "slow-model", call) for _ in range(2)]
+
+    assert asyncio.run(scenario()) == ["slow-model", "slow-model"]
+    stats = llm_hedging.stats()["keys"]["hedge-budget"]
+    assert stats["budget_denied"] == 1 and stats["hedged"] == 1
+    assert models == ["slow-model", "slow-model", "fast-model"]
@@ -0,0 +1,72 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+from llm_rate_limiter import ModelRateLimiter, TokenBucket
+import llm_rate_limiter
+
+
+def test_bucket_queues_callers_in_arrival_order():
+    bucket = TokenBucket(per_minute=600)  # 10 units/s
+    now = time.monotonic()
+    assert bucket.reserve(600, now) == 0.0
+    first = bucket.reserve(10, now)
+    second = bucket.reserve(10, now)
+    assert first == 1.0
+    assert second == 2.0
+
+
+def test_estimate_is_reconciled_against_usage():
+    limiter = ModelRateLimiter("test-reconcile", tpm=6000, rpm=0)
+    reservation = limiter.reserve(5000)
+    assert reservation.wait == 0.0
+    limiter.reconcile(reservation, actual_tokens=1000)
+    # The 4000 overestimated tokens went back into the bucket.
+    assert limiter.reserve(4500).wait == 0.0
+    snapshot = limiter.snapshot()
+    assert snapshot["actual_tokens"] == 1000
+    assert snapshot["reconciled_requests"] == 1
+
+
+def test_limited_waits_for_budget_and_passes_response_through():
+    llm_rate_limiter._limiters["test-limited"] = ModelRateLimiter("test-limited", tpm=0, rpm=600)
+    kwargs = {"model": "test-limited", "messages": [{"role": "user", "content": "hi"}], "max_tokens": 10}
+    response = SimpleNamespace(usage=SimpleNamespace(total_tokens=12))
+
+    async def call():
+        return response
+
+    async def burst():
+        start = time.perf_counter()
+        results = await asyncio.gather(*(llm_rate_limiter.limited(call, "test-limited", kwargs) for _ in range(602)))
+        return results, time.perf_counter() - start
+
+    results, elapsed = asyncio.run(burst())
+    assert all(r is response for r in results)
+    # 600 requests fit the burst; the last two wait ~0.1s and ~0.2s.
+    assert 0.15 <= elapsed < 1.0
+
+
+def test_caller_cancelled_while_queued_gets_its_request_slot_back():
+    limiter = ModelRateLimiter("test-cancel", tpm=0, rpm=60)  # 1 request/s
+    llm_rate_limiter._limiters["test-cancel"] = limiter
+    kwargs = {"model": "test-cancel", "messages": [{"role": "user", "content": "hi"}], "max_tokens": 10}
+    for _ in range(60):
+        limiter.reserve(1)
+
+    async def call():
+        raise AssertionError("a cancelled caller must not reach the provider")
+
+    async def cancel_while_queued():
+        task = asyncio.create_task(llm_rate_limiter.limited(call, "test-cancel", kwargs))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    asyncio.run(cancel_while_queued())
+    # Without the refund the next caller would queue behind the cancelled one (~2s).
+    assert limiter.reserve(1).wait < 1.1
+    assert limiter.snapshot()["requests"] == 61
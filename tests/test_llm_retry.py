@@ -0,0 +1,128 @@
+import asyncio
+
+import httpx
+import openai
+import pytest
+
+import llm_retry
+from llm_retry import CircuitBreaker, CircuitOpenError, RetryPolicy
+
+
+def _status_error(cls, status, headers=None):
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    response = httpx.Response(status, request=request, headers=headers or {})
+    return cls("error", response=response, body=None)
+
+
+def test_errors_are_classified():
+    assert llm_retry.classify_error(_status_error(openai.RateLimitError, 429)) == llm_retry.RATE_LIMIT
+    assert llm_retry.classify_error(_status_error(openai.InternalServerError, 503)) == llm_retry.SERVER_ERROR
+    assert llm_retry.classify_error(_status_error(openai.BadRequestError, 400)) == llm_retry.BAD_REQUEST
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    assert llm_retry.classify_error(openai.APITimeoutError(request=request)) == llm_retry.TIMEOUT
+
+
+def test_backoff_honours_retry_after():
+    policy = RetryPolicy(base_delay=0.1, max_delay=1.0)
+    exc = _status_error(openai.RateLimitError, 429, {"retry-after": "7"})
+    assert 7.0 <= policy.backoff(llm_retry.RATE_LIMIT, 1, exc) <= 7.1
+    exc_ms = _status_error(openai.RateLimitError, 429, {"retry-after-ms": "250"})
+    assert 0.25 <= policy.backoff(llm_retry.RATE_LIMIT, 1, exc_ms) <= 0.35
+    # Without a hint the delay is jittered under the exponential cap.
+    assert 0 <= policy.backoff(llm_retry.SERVER_ERROR, 3) <= 0.4
+
+
+def test_transient_errors_retry_and_bad_requests_do_not():
+    policy = RetryPolicy(max_attempts=3, base_delay=0.001, rate_limit_base_delay=0.001)
+    calls = {"n": 0}
+
+    async def flaky():
+        calls["n"] += 1
+        if calls["n"] < 3:
+            raise _status_error(openai.InternalServerError, 500)
+        return "ok"
+
+    assert asyncio.run(llm_retry.call_with_retry(flaky, model="test-retry-flaky", policy=policy)) == "ok"
+    assert calls["n"] == 3
+
+    bad_calls = {"n": 0}
+
+    def bad():
+        bad_calls["n"] += 1
+        raise _status_error(openai.BadRequestError, 400)
+
+    with pytest.raises(openai.BadRequestError):
+        llm_retry.call_with_retry_sync(bad, model="test-retry-bad", policy=policy)
+    assert bad_calls["n"] == 1
+
+
+def test_circuit_breaker_opens_and_half_opens():
+    breaker = CircuitBreaker("test-breaker", failure_threshold=2, reset_timeout=0.05)
+    breaker.before_call()
+    breaker.record_failure(llm_retry.SERVER_ERROR)
+    breaker.before_call()
+    breaker.record_failure(llm_retry.SERVER_ERROR)
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    asyncio.run(asyncio.sleep(0.06))
+    breaker.before_call()  # the single half-open probe
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_cancelled_half_open_probe_frees_the_circuit():
+    model = "test-retry-cancelled-probe"
+    breaker = llm_retry.get_breaker(model)
+    breaker.state, breaker.opened_at = CircuitBreaker.OPEN, 0.0  # reset timeout long past
+
+    async def scenario():
+        started = asyncio.Event()
+
+        async def hangs():
+            started.set()
+            await asyncio.sleep(10)
+
+        probe = asyncio.create_task(llm_retry.call_with_retry(hangs, model=model))
+        await started.wait()
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+
+        async def ok():
+            return "ok"
+
+        return await llm_retry.call_with_retry(ok, model=model)
+
+    assert asyncio.run(scenario()) == "ok"
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_cancelling_a_call_admitted_before_half_open_keeps_the_probe_slot():
+    model = "test-retry-cancelled-non-probe"
+    breaker = llm_retry.get_breaker(model)
+
+    async def scenario():
+        started = asyncio.Event()
+
+        async def hangs():
+            started.set()
+            await asyncio.sleep(10)
+
+        # Admitted while the circuit was still closed.
+        early = asyncio.create_task(llm_retry.call_with_retry(hangs, model=model))
+        await started.wait()
+        breaker.state, breaker.opened_at = CircuitBreaker.OPEN, 0.0
+        assert breaker.before_call()  # another call takes the half-open probe slot
+
+        early.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await early
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()  # still only one probe at a time
+
+    asyncio.run(scenario())
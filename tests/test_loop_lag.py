@@ -0,0 +1,20 @@
+import asyncio
+import time
+
+import loop_lag
+
+
+def test_monitor_records_blocking_work():
+    async def scenario():
+        monitor = loop_lag.LoopLagMonitor(interval=0.01)
+        monitor.start()
+        await asyncio.sleep(0.05)
+        time.sleep(0.1)  # Holds the loop, as a synchronous call in a handler would.
+        await asyncio.sleep(0.05)
+        await monitor.stop()
+        return monitor.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["samples"] >= 3 and not stats["running"]
+    assert stats["max_ms"] >= 80
+    assert stats["p50_ms"] < stats["max_ms"]
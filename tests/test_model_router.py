@@ -0,0 +1,41 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import llm_gateway
+import model_router
+
+ROUTE = [
+    {"model": "cheap", "max_input_tokens": 50},
+    {"model": "strong"},
+]
+
+
+def _fake_gateway(monkeypatch, outputs):
+    calls = []
+
+    async def chat_completion(**kwargs):
+        calls.append(kwargs["model"])
+        content = outputs[kwargs["model"]]
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+    monkeypatch.setattr(llm_gateway, "chat_completion", chat_completion)
+    monkeypatch.setitem(model_router.SECTION_ROUTES, "test_section", ROUTE)
+    return calls
+
+
+def test_small_prompts_go_to_cheap_tier_and_large_ones_skip_it(monkeypatch):
+    _fake_gateway(monkeypatch, {})
+    assert model_router.choose("test_section", 10) == ["cheap", "strong"]
+    assert model_router.choose("test_section", 500) == ["strong"]
+
+
+def test_invalid_cheap_output_escalates_to_stronger_model(monkeypatch):
+    calls = _fake_gateway(monkeypatch, {"cheap": "not json", "strong": '{"ok": true}'})
+    response = asyncio.run(model_router.chat_completion(
+        "test_section", validate=json.loads, messages=[{"role": "user", "content": "hi"}]
+    ))
+    assert calls == ["cheap", "strong"]
+    assert response.choices[0].message.content == '{"ok": true}'
+    stats = model_router.stats()["sections"]["test_section"]
+    assert stats["validation_failures"] >= 1 and stats["models"]["strong"] >= 1
@@ -0,0 +1,71 @@
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+
+import llm_gateway
+import model_router
+import openai_resume_jd_parsing as parsing
+import parse_store
+
+
+def _tool_response(arguments):
+    call = SimpleNamespace(function=SimpleNamespace(arguments=json.dumps(arguments)))
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(tool_calls=[call]))])
+
+
+def test_large_resume_chunks_are_parsed_concurrently_and_merged_in_order(monkeypatch, tmp_path):
+    store = parse_store.ParseStore(str(tmp_path / "parses.sqlite3"))
+    monkeypatch.setattr(parse_store, "_store", store)
+    in_flight = {"now": 0, "max": 0}
+    upstream = {"failing": True}
+
+    async def chat_completion(**kwargs):
+        in_flight["now"] += 1
+        in_flight["max"] = max(in_flight["max"], in_flight["now"])
+        await asyncio.sleep(0.05)
+        in_flight["now"] -= 1
+        chunk = kwargs["messages"][1]["content"]
+        name = chunk.split()[0]
+        if name == "broken" and upstream["failing"]:
+            raise RuntimeError("upstream failure")
+        return _tool_response({"positions": [{"title": name}], "skills": [name, "Python"], "achievements": [name], "education": []})
+
+    monkeypatch.setattr(llm_gateway, "chat_completion", chat_completion)
+    monkeypatch.setattr(parsing, "PARSE_CHUNK_CONCURRENCY", 3)
+    sections = ["alpha", "bravo", "broken", "delta", "echo", "foxtrot"]
+    resume = "\n".join(f"{name} Experience " + "word " * 500 for name in sections)
+    monkeypatch.setattr(parsing, "chunk_resume_text", lambda text: [line for line in text.splitlines()])
+
+    start = time.perf_counter()
+    parsed = asyncio.run(parsing.parse_resume_with_openai(resume))
+    elapsed = time.perf_counter() - start
+
+    assert parsed["skills"] == ["alpha", "Python", "bravo", "delta", "echo", "foxtrot"]
+    assert in_flight["max"] == 3
+    assert elapsed < 0.05 * len(sections) - 0.05  # Two waves of three, not six calls in a row.
+    # A partial parse is neither cached nor stored, so the next request retries the failed chunk.
+    assert parsing.get_cached_resume(resume) is None
+    assert store.stats()["rows"] == 0
+
+    upstream["failing"] = False
+    parsed = asyncio.run(parsing.parse_resume_with_openai(resume))
+    assert parsed["skills"] == ["alpha", "Python", "bravo", "broken", "delta", "echo", "foxtrot"]
+    assert store.stats()["rows"] == 1
+    # Served from the cache afterwards.
+    monkeypatch.setattr(llm_gateway, "chat_completion", None)
+    assert asyncio.run(parsing.parse_resume_with_openai(resume)) == parsed
+
+
+def test_parse_version_follows_the_policy_not_the_routed_tier(monkeypatch):
+    monkeypatch.setitem(model_router.SECTION_ROUTES, "parse_jd", [{"model": "cheap"}, {"model": "strong"}])
+    version = parsing._parse_version("parse_jd", parsing.JD_FUNCTION, parsing.JD_SYSTEM_PROMPT)
+    assert parsing._routed_model("parse_jd", "jd") == "cheap"
+
+    # Under load the router moves to another tier; cached parses must still match.
+    monkeypatch.setattr(model_router, "ROUTER_MAX_QUEUE_DEPTH", 0)
+    assert parsing._routed_model("parse_jd", "jd") == "strong"
+    assert parsing._parse_version("parse_jd", parsing.JD_FUNCTION, parsing.JD_SYSTEM_PROMPT) == version
+
+    monkeypatch.setitem(model_router.SECTION_ROUTES, "parse_jd", [{"model": "strong"}])
+    assert parsing._parse_version("parse_jd", parsing.JD_FUNCTION, parsing.JD_SYSTEM_PROMPT) != version
@@ -0,0 +1,42 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import cache
+import llm_gateway
+import openai_resume_jd_parsing as parsing
+import parse_store
+from parse_store import ParseStore
+
+
+def test_store_is_shared_across_instances_and_keyed_by_normalised_text_and_version(tmp_path):
+    path = str(tmp_path / "parses.sqlite3")
+    ParseStore(path).put("jd", "Senior  Engineer\r\n\r\nPython ", "v1", {"role_title": "Senior Engineer"})
+
+    restarted = ParseStore(path)
+    assert restarted.get("jd", "Senior Engineer\nPython", "v1") == {"role_title": "Senior Engineer"}
+    assert restarted.get("jd", "Senior Engineer\nPython", "v2") is None
+    assert restarted.get("resume", "Senior Engineer\nPython", "v1") is None
+    stats = restarted.stats()
+    assert (stats["rows"], stats["hits"], stats["misses"]) == (1, 1, 2)
+    assert stats["stored_bytes"] > 0 and stats["raw_bytes"] == len('{"role_title":"Senior Engineer"}')
+
+
+def test_parse_is_served_from_the_store_after_the_memory_cache_is_lost(monkeypatch, tmp_path):
+    monkeypatch.setattr(parse_store, "_store", ParseStore(str(tmp_path / "parses.sqlite3")))
+    calls = []
+
+    async def chat_completion(**kwargs):
+        calls.append(kwargs["model"])
+        arguments = {"role_title": "Engineer", "requirements": ["Python"], "responsibilities": ["Build APIs"]}
+        call = SimpleNamespace(function=SimpleNamespace(arguments=json.dumps(arguments)))
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(tool_calls=[call]))])
+
+    monkeypatch.setattr(llm_gateway, "chat_completion", chat_completion)
+    parsed = asyncio.run(parsing.parse_jd_with_openai("Engineer wanted. Python required."))
+
+    # A restarted (or different) worker starts with an empty memory cache.
+    monkeypatch.setattr(cache, "_jd_cache", cache.LRUTTLCache(max_entries=10, max_bytes=10000, ttl_seconds=60))
+    assert asyncio.run(parsing.parse_jd_with_openai("Engineer wanted. Python required.")) == parsed
+    assert len(calls) == 1
+    assert cache.get_cached_jd("Engineer wanted. Python required.") == parsed
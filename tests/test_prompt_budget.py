@@ -0,0 +1,29 @@
+import json
+
+from prompt_budget import PromptField, compact_json, dedupe_text, fit_prompt
+
+
+def test_compact_json_drops_whitespace_and_empty_values():
+    out = compact_json({"title": "Engineer", "skills": [], "summary": None, "nested": {"a": ""}})
+    assert out == '{"title":"Engineer"}'
+    assert json.loads(out) == {"title": "Engineer"}
+
+
+def test_dedupe_text_removes_content_already_in_prompt():
+    raw = "Built data pipelines processing 5TB daily.\nHobbies: chess."
+    out = dedupe_text(raw, ["Built data pipelines processing 5TB daily."])
+    assert out == "Hobbies: chess."
+
+
+def test_fit_prompt_trims_lowest_priority_fields_first():
+    template = "{keep}\n{low}\n{mid}"
+    fields = {
+        "keep": PromptField("important " * 10, priority=100),
+        "low": PromptField("filler " * 400, priority=10, min_tokens=0),
+        "mid": PromptField("context " * 10, priority=50, min_tokens=0),
+    }
+    text, report = fit_prompt("test", template, fields, budget=100)
+    assert report["trimmed_fields"] == ["low"]
+    assert report["tokens_after"] <= 100 < report["tokens_before"]
+    assert text.startswith("important")
+    assert "context" in text
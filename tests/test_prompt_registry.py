@@ -0,0 +1,35 @@
+import json
+
+import pytest
+from pydantic import BaseModel
+
+import prompt_registry
+from interview_prep_v2_models import StarStoryBankSectionModel
+
+
+class _Answer(BaseModel):
+    text: str
+
+
+class _AnswerV2(BaseModel):
+    text: str
+    confidence: float
+
+
+def test_registered_prompts_embed_the_schema_and_render_placeholders():
+    star = prompt_registry.get("star_story_bank")
+    assert "{schema}" not in star.text and star.tokens > 0
+    assert json.dumps(StarStoryBankSectionModel.model_json_schema(), indent=2) in star.text
+
+    rendered = star.render(jd_role_title="Data Engineer")
+    assert "ask for Data Engineer" in rendered and '"properties"' in rendered
+
+
+def test_version_tracks_schema_changes_and_is_checked_on_get():
+    registry = prompt_registry.PromptRegistry()
+    v1 = registry.register("answer", "Reply as:\n{schema}", _Answer).version
+    v2 = registry.register("answer", "Reply as:\n{schema}", _AnswerV2).version
+    assert v1 != v2
+    assert registry.get("answer", v2).response_model is _AnswerV2
+    with pytest.raises(KeyError):
+        registry.get("answer", v1)
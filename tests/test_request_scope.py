@@ -0,0 +1,55 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException, Request
+
+import llm_gateway
+import request_scope
+
+
+def _request(disconnect_after: float) -> Request:
+    async def receive():
+        await asyncio.sleep(disconnect_after)
+        return {"type": "http.disconnect"}
+
+    return Request({"type": "http", "method": "POST", "headers": []}, receive)
+
+
+def test_disconnect_cancels_work_and_its_children():
+    cancelled = []
+
+    async def child(name):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(name)
+            raise
+
+    async def work():
+        await asyncio.gather(child("a"), child("b"))
+
+    async def scenario():
+        with pytest.raises(HTTPException) as exc_info:
+            await request_scope.cancel_on_disconnect(_request(0.05), work(), "test")
+        return exc_info.value.status_code
+
+    assert asyncio.run(scenario()) == request_scope.CLIENT_CLOSED_REQUEST
+    assert sorted(cancelled) == ["a", "b"]
+    assert request_scope.stats()["test"]["cancelled_on_disconnect"] >= 1
+
+
+def test_cancelled_llm_call_is_counted_with_its_token_estimate():
+    kwargs = {"model": "gpt-4o", "messages": [{"role": "user", "content": "hello " * 50}], "max_tokens": 300}
+    before = llm_gateway.stats()["cancelled"]
+
+    async def scenario():
+        task = asyncio.create_task(llm_gateway._cancellable(kwargs, lambda: asyncio.sleep(10)))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(scenario())
+    after = llm_gateway.stats()["cancelled"]
+    assert after["calls"] == before["calls"] + 1
+    assert after["completion_tokens_allowance"] == before["completion_tokens_allowance"] + 300
+    assert after["prompt_tokens_estimate"] > before["prompt_tokens_estimate"]
@@ -0,0 +1,53 @@
+import asyncio
+
+import pytest
+
+from single_flight import SingleFlight, canonical_key
+
+
+def test_canonical_key_ignores_key_order_and_credentials():
+    a = canonical_key("google_news", {"q": "Acme", "num": 5, "api_key": "secret-1"})
+    b = canonical_key("google_news", {"num": 5, "api_key": "secret-2", "q": "Acme"})
+    assert a == b
+    assert a != canonical_key("google_news", {"q": "Acme", "num": 6})
+
+
+def test_concurrent_identical_calls_share_one_upstream_call():
+    flight = SingleFlight("test")
+    calls = {"n": 0}
+
+    async def upstream():
+        calls["n"] += 1
+        await asyncio.sleep(0.05)
+        return {"answer": 42}
+
+    async def burst():
+        return await asyncio.gather(*(flight.do("k", upstream) for _ in range(10)))
+
+    results = asyncio.run(burst())
+    assert calls["n"] == 1
+    assert all(r == {"answer": 42} for r in results)
+    assert flight.snapshot() == {"leaders": 1, "coalesced": 9, "in_flight": 0}
+
+
+def test_errors_propagate_and_cancelled_caller_does_not_cancel_others():
+    flight = SingleFlight("test")
+
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream down")
+
+    async def slow():
+        await asyncio.sleep(0.05)
+        return "ok"
+
+    async def scenario():
+        with pytest.raises(RuntimeError):
+            await asyncio.gather(flight.do("bad", failing), flight.do("bad", failing))
+        leader = asyncio.create_task(flight.do("slow", slow))
+        follower = asyncio.create_task(flight.do("slow", slow))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        return await follower
+
+    assert asyncio.run(scenario()) == "ok"
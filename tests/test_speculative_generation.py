@@ -0,0 +1,55 @@
+import asyncio
+
+import speculative_generation
+
+
+class _FakePlan:
+    def __init__(self, started, delay):
+        self.started = started
+        self.delay = delay
+
+    async def run(self, targets=None):
+        self.started.append(targets)
+        await asyncio.sleep(self.delay)
+        return {}
+
+
+def _patch(monkeypatch, delay, idle_seconds=60):
+    started = []
+    monkeypatch.setattr(speculative_generation, "SPECULATIVE_GENERATION_ENABLED", True)
+    monkeypatch.setattr(speculative_generation, "SPECULATIVE_IDLE_SECONDS", idle_seconds)
+    monkeypatch.setattr(speculative_generation, "build_interview_prep_plan", lambda **_kw: _FakePlan(started, delay))
+    monkeypatch.setattr(speculative_generation, "_sessions", {})
+    return started
+
+
+def test_starts_once_both_documents_are_parsed_and_can_be_claimed(monkeypatch):
+    started = _patch(monkeypatch, delay=0.01)
+
+    async def scenario():
+        speculative_generation.record_resume("s1", {}, "resume text")
+        await asyncio.sleep(0)
+        assert started == []
+        speculative_generation.record_jd("s1", {}, "jd text")
+        await asyncio.sleep(0.05)
+        assert started == [speculative_generation.SPECULATIVE_SECTION_NAMES]
+        assert speculative_generation.claim("s1") is True
+        assert speculative_generation.claim("s1") is False
+
+    asyncio.run(scenario())
+
+
+def test_unclaimed_speculation_is_cancelled_after_idle_window(monkeypatch):
+    _patch(monkeypatch, delay=10, idle_seconds=0.05)
+    before = speculative_generation.stats()["cancelled_idle"]
+
+    async def scenario():
+        speculative_generation.record_resume("s2", {})
+        speculative_generation.record_jd("s2", {})
+        task = speculative_generation._sessions["s2"].task
+        await asyncio.sleep(0.1)
+        assert task.cancelled()
+        assert "s2" not in speculative_generation._sessions
+
+    asyncio.run(scenario())
+    assert speculative_generation.stats()["cancelled_idle"] == before + 1
@@ -0,0 +1,52 @@
+from typing import List, Optional
+
+import pytest
+from pydantic import BaseModel
+
+import structured_output
+from interview_prep_v2_models import StarStoryBankSectionModel
+
+
+class _Item(BaseModel):
+    name: str
+    score: int
+
+
+class _Report(BaseModel):
+    summary: str
+    items: List[_Item]
+    notes: Optional[str] = None
+
+
+def test_fenced_and_truncated_output_is_repaired():
+    fenced = 'Here you go:\n```json\n{"summary": "ok", "items": [{"name": "a", "score": 1},]}\n```'
+    assert structured_output.parse("test_fenced", fenced, _Report).items[0].name == "a"
+
+    truncated = '{"summary": "ok", "items": [{"name": "a", "score": 1}, {"name": "b", "sco'
+    report = structured_output.parse("test_fenced", truncated, _Report)
+    assert [item.name for item in report.items] == ["a", "b"]
+    assert report.items[1].score == 0
+
+    stats = structured_output.stats()["test_fenced"]
+    assert stats["repaired"] == 2 and stats["repair_rate"] == 1.0
+
+
+def test_missing_required_fields_are_filled_and_garbage_fails():
+    report = structured_output.parse("test_missing", '{"items": [{"name": "a"}], "notes": null}', _Report)
+    assert report.summary == "" and report.items[0].score == 0 and report.notes is None
+
+    with pytest.raises(structured_output.StructuredOutputError):
+        structured_output.parse("test_missing", "I cannot help with that.", _Report)
+    assert structured_output.stats()["test_missing"]["failed"] == 1
+
+
+def test_strict_schema_makes_every_property_required_and_nullable_when_optional():
+    schema, strict = structured_output.strict_json_schema(StarStoryBankSectionModel)
+    assert strict
+    story = schema["$defs"]["StarStory"]
+    assert story["additionalProperties"] is False
+    assert set(story["required"]) == set(story["properties"])
+    assert "default" not in story["properties"]["tags"]
+
+    assert structured_output.response_format("gpt-3.5-turbo-1106", _Report) == {"type": "json_object"}
+    assert structured_output.response_format("gpt-4o-mini", _Report)["json_schema"]["strict"] is True